@@ -5,6 +5,9 @@ from datetime import datetime, timedelta
 import os
 from dotenv import load_dotenv
 from database import init_db
+from tenancy import init_tenancy, parse_farm_databases, farm_binds
+from replica import init_replicas, replica_binds, replica_status
+from encoding import init_compression
 
 load_dotenv()
 
@@ -12,14 +15,38 @@ app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
 app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///cattle_management.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['DEFAULT_FARM_ID'] = os.environ.get('DEFAULT_FARM_ID', 'main')
+app.config['FARM_DATABASES'] = parse_farm_databases(os.environ.get('FARM_DATABASES'))
+app.config['SQLALCHEMY_BINDS'] = farm_binds(app.config['FARM_DATABASES'])
+app.config['REPLICA_DATABASES'] = parse_farm_databases(os.environ.get('REPLICA_DATABASES'))
+app.config['SQLALCHEMY_BINDS'].update(replica_binds(app.config['REPLICA_DATABASES'], app.config['DEFAULT_FARM_ID']))
+app.config['REPLICA_MAX_LAG'] = float(os.environ.get('REPLICA_MAX_LAG', 60.0))
+app.config['REPLICA_SNAPSHOT_INTERVAL'] = float(os.environ.get('REPLICA_SNAPSHOT_INTERVAL', 15.0))
+app.config['COMPRESS_MIN_SIZE'] = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+app.config['IDEMPOTENCY_TTL_HOURS'] = float(os.environ.get('IDEMPOTENCY_TTL_HOURS', 72.0))
+app.config['EVENTS_POLL_INTERVAL'] = float(os.environ.get('EVENTS_POLL_INTERVAL', 0.5))
+app.config['EVENTS_RETENTION_HOURS'] = float(os.environ.get('EVENTS_RETENTION_HOURS', 24.0))
+app.config['EVENTS_COMMIT_GRACE'] = float(os.environ.get('EVENTS_COMMIT_GRACE', 10.0))
+app.config['COOP_FARM_TIMEOUT'] = float(os.environ.get('COOP_FARM_TIMEOUT', 10.0))
 app.config['JWT_SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY', 'jwt-secret-string')
 app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=24)
+app.config['MILK_INGEST_DIR'] = os.environ.get('MILK_INGEST_DIR', os.path.join(app.instance_path, 'ingest'))
+app.config['MILK_INGEST_BATCH_SIZE'] = int(os.environ.get('MILK_INGEST_BATCH_SIZE', 500))
+app.config['MILK_INGEST_FLUSH_INTERVAL'] = float(os.environ.get('MILK_INGEST_FLUSH_INTERVAL', 1.0))
+app.config['SNAPSHOT_DIR'] = os.environ.get('SNAPSHOT_DIR', os.path.join(app.instance_path, 'snapshots'))
+app.config['SNAPSHOT_DAYS'] = int(os.environ.get('SNAPSHOT_DAYS', 365))
+app.config['SNAPSHOT_KEEP'] = int(os.environ.get('SNAPSHOT_KEEP', 3))
+app.config['INVENTORY_RATE_DAYS'] = int(os.environ.get('INVENTORY_RATE_DAYS', 14))
 
 jwt = JWTManager(app)
-CORS(app)
+# Custom response headers are hidden from cross-origin clients unless exposed
+CORS(app, expose_headers=['X-Total-Count', 'X-Snapshot-Event-ID'])
 
 # Initialize database
 init_db(app)
+init_tenancy(app)
+init_replicas(app)
+init_compression(app)
 
 # Import and register blueprints
 from routes.cattle_routes import cattle_bp
@@ -27,16 +54,34 @@ from routes.milk_routes import milk_bp
 from routes.feeding_routes import feeding_bp
 from routes.analytics_routes import analytics_bp
 from routes.financial_routes import financial_bp
+from routes.coop_routes import coop_bp
+from routes.report_routes import reports_bp
+from routes.forecast_routes import forecast_bp
+from routes.event_routes import events_bp
+from routes.snapshot_routes import snapshots_bp
+from routes.inventory_routes import inventory_bp
+from routes.pedigree_routes import pedigree_bp
 
 app.register_blueprint(cattle_bp, url_prefix='/api/cattle')
 app.register_blueprint(milk_bp, url_prefix='/api/milk')
 app.register_blueprint(feeding_bp, url_prefix='/api/feeding')
 app.register_blueprint(analytics_bp, url_prefix='/api/analytics')
 app.register_blueprint(financial_bp, url_prefix='/api/financial')
+app.register_blueprint(coop_bp, url_prefix='/api/coop')
+app.register_blueprint(reports_bp, url_prefix='/api/reports')
+app.register_blueprint(forecast_bp, url_prefix='/api/forecast')
+app.register_blueprint(events_bp, url_prefix='/api/events')
+app.register_blueprint(snapshots_bp, url_prefix='/api/snapshots')
+app.register_blueprint(inventory_bp, url_prefix='/api/inventory')
+app.register_blueprint(pedigree_bp, url_prefix='/api/pedigree')
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
     return jsonify({'status': 'healthy', 'timestamp': datetime.utcnow().isoformat()})
 
+@app.route('/api/health/replica', methods=['GET'])
+def replica_health():
+    return jsonify(replica_status(app))
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=8080)
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Per-year archive partitions for milk production and feeding history.
+
+Closed calendar years are moved out of the hot ``milk_production`` and ``feeding``
+tables into ``<table>_y<year>`` partition tables, registered in ``archive_partitions``.
+Read paths call ``with_archive`` which only unions in the partitions that overlap the
+requested date range, so recent-data queries never touch archived history.
+
+    python archive.py --older-than-years 2
+"""
+
+import argparse
+import os
+import sys
+from datetime import date
+
+from sqlalchemy import MetaData, Table, Column, Index, select, insert, update, delete, extract, union_all
+from sqlalchemy.orm import aliased
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import db
+from models.archive_partition import ArchivePartition
+from models.milk_production import MilkProduction
+from models.feeding import Feeding
+from tenancy import farm_ids, use_farm
+from versioning import bump_table_versions
+
+ARCHIVABLE_MODELS = {model.__tablename__: model for model in (MilkProduction, Feeding)}
+
+# Kept apart from db.metadata so create_all never builds partitions
+partition_metadata = MetaData()
+
+def partition_table(source_table, year):
+    """Table object for one archived year of a hot table"""
+    name = f'{source_table.name}_y{year}'
+    if name in partition_metadata.tables:
+        return partition_metadata.tables[name]
+
+    # Same columns as the hot table but no foreign keys: archived rows are read-only
+    columns = [
+        Column(c.name, c.type, primary_key=c.primary_key, nullable=c.nullable, autoincrement=False)
+        for c in source_table.columns
+    ]
+    table = Table(name, partition_metadata, *columns)
+    Index(f'ix_{name}_date_recorded', table.c.date_recorded)
+    Index(f'ix_{name}_cattle_id', table.c.cattle_id)
+    return table
+
+def archived_years(source_table_name, start_date=None, end_date=None):
+    """Archived years of a table that overlap [start_date, end_date]"""
+    query = db.session.query(ArchivePartition.year).filter(ArchivePartition.source_table == source_table_name)
+    if start_date:
+        query = query.filter(ArchivePartition.year >= start_date.year)
+    if end_date:
+        query = query.filter(ArchivePartition.year <= end_date.year)
+    return [row.year for row in query.order_by(ArchivePartition.year)]
+
+def with_archive(model, start_date=None, end_date=None):
+    """
+    Entity to query ``model`` over a date range.
+
+    Returns the model itself when the range stays in hot storage, otherwise an
+    alias over a UNION ALL of the hot table and the overlapping partitions.
+    """
+    years = archived_years(model.__tablename__, start_date, end_date)
+    if not years:
+        return model
+
+    table = model.__table__
+    selects = [select(*table.columns)]
+    selects += [select(*partition_table(table, year).columns) for year in years]
+    return aliased(model, union_all(*selects).subquery(), name=model.__tablename__)
+
+def record_columns(entity, model):
+    """All mapped columns of an entity returned by with_archive, in table order"""
+    return [getattr(entity, column.key) for column in model.__table__.columns]
+
+def records_to_dicts(model, rows):
+    """Serialize rows selected with record_columns through the model's to_dict"""
+    return [model(**row._asdict()).to_dict() for row in rows]
+
+def drop_archive_partitions():
+    """Drop every archived partition; db.drop_all() does not know about them"""
+    connection = db.session.connection()
+    for record in ArchivePartition.query.all():
+        table = ARCHIVABLE_MODELS[record.source_table].__table__
+        partition_table(table, record.year).drop(connection, checkfirst=True)
+    db.session.commit()
+
+def delete_archived_records(connection, cattle_ids):
+    """
+    Delete archived milk and feeding rows of the given cattle (ids or a select of
+    ids). Partitions have no foreign keys, so cattle deletes must call this.
+    """
+    partitions = connection.execute(
+        select(ArchivePartition.id, ArchivePartition.source_table, ArchivePartition.year)
+    ).all()
+    changed = set()
+    for partition_id, name, year in partitions:
+        partition = partition_table(ARCHIVABLE_MODELS[name].__table__, year)
+        count = connection.execute(delete(partition).where(partition.c.cattle_id.in_(cattle_ids))).rowcount
+        if count:
+            connection.execute(
+                update(ArchivePartition.__table__)
+                .where(ArchivePartition.id == partition_id)
+                .values(row_count=ArchivePartition.row_count - count)
+            )
+            changed.add(name)
+    bump_table_versions(connection, changed)
+
+def execute_on_archive(connection, model, years, build):
+    """
+    Run a bulk UPDATE or DELETE on archived years of ``model``. ``build(partition)``
+    returns the statement for one partition table; deletes keep row_count current.
+    Returns the number of archived rows matched.
+    """
+    total = 0
+    for year in years:
+        statement = build(partition_table(model.__table__, year))
+        count = connection.execute(statement).rowcount
+        if count and statement.is_delete:
+            connection.execute(
+                update(ArchivePartition.__table__)
+                .where(ArchivePartition.source_table == model.__tablename__, ArchivePartition.year == year)
+                .values(row_count=ArchivePartition.row_count - count)
+            )
+        total += count
+    if total:
+        bump_table_versions(connection, [model.__tablename__])
+    return total
+
+def archive_closed_years(older_than_years=2, today=None):
+    """
+    Move every calendar year that ended more than ``older_than_years`` ago
+    into its partition. Returns a list of (table, year, rows moved).
+    """
+    today = today or date.today()
+    last_closed_year = today.year - older_than_years - 1
+    moved = []
+
+    for name, model in ARCHIVABLE_MODELS.items():
+        table = model.__table__
+        year_column = extract('year', table.c.date_recorded)
+        years = [
+            int(row[0]) for row in db.session.execute(
+                select(year_column).where(table.c.date_recorded <= date(last_closed_year, 12, 31)).distinct()
+            )
+        ]
+
+        for year in sorted(years):
+            connection = db.session.connection()
+            partition = partition_table(table, year)
+            partition.create(connection, checkfirst=True)
+
+            in_year = table.c.date_recorded.between(date(year, 1, 1), date(year, 12, 31))
+            count = connection.execute(
+                insert(partition).from_select(
+                    [c.name for c in table.columns], select(*table.columns).where(in_year)
+                )
+            ).rowcount
+            connection.execute(delete(table).where(in_year))
+            bump_table_versions(connection, [name])
+
+            record = ArchivePartition.query.filter_by(source_table=name, year=year).first()
+            if record is None:
+                record = ArchivePartition(source_table=name, year=year, partition_table=partition.name, row_count=0)
+                db.session.add(record)
+            record.row_count += count
+            db.session.commit()
+
+            moved.append((name, year, count))
+
+    return moved
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--older-than-years', type=int, default=2,
+                        help='archive calendar years that ended more than this many years ago')
+    args = parser.parse_args()
+
+    from app import app
+
+    with app.app_context():
+        for farm_id in farm_ids():
+            with use_farm(farm_id):
+                try:
+                    moved = archive_closed_years(args.older_than_years)
+                except Exception as e:
+                    print(f"❌ Error archiving records for farm {farm_id}: {e}")
+                    db.session.rollback()
+                    raise
+                finally:
+                    db.session.remove()
+
+            if not moved:
+                print(f"Farm {farm_id}: nothing to archive.")
+            for name, year, count in moved:
+                print(f"  - Farm {farm_id}: {name} {year}: {count} records archived")
+
+if __name__ == '__main__':
+    main()
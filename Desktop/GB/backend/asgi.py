@@ -0,0 +1,244 @@
+"""
+ASGI entry point for the cattle management API.
+
+Serves the same Flask app and blueprints behind an event loop. Request bodies
+are buffered and responses are sent on the loop, so idle or slow mobile
+connections only hold a socket, never a worker thread. Views run in a bounded
+thread pool; matplotlib chart rendering gets its own single-thread pool because
+pyplot is not thread-safe and should not starve the regular endpoints.
+
+Change event streams (``GET /api/events``) are opened by the Flask view and
+then written from the loop as events arrive, so a subscribed dashboard costs a
+socket, not a thread.
+
+Responses are sent as they are produced: small ones in one message, larger
+ones (snapshot downloads, exports) one WSGI chunk at a time, each read in the
+pool only once the previous chunk was sent, so a slow client holds neither a
+thread nor the whole body in memory.
+
+Run with:
+    uvicorn asgi:asgi_app --workers 2 --host 0.0.0.0 --port 8080
+"""
+
+import asyncio
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+
+from app import app
+from events import KEEPALIVE, KEEPALIVE_SECONDS
+from routes.event_routes import ASGI_STREAM_KEY
+
+ASGI_THREADS = int(os.environ.get('ASGI_THREADS', 8))
+ASGI_RENDER_THREADS = int(os.environ.get('ASGI_RENDER_THREADS', 1))
+RENDER_PATH_PREFIXES = (
+    '/api/analytics/milk-production-chart',
+    '/api/analytics/cattle-comparison',
+    '/api/analytics/financial-overview',
+    '/api/analytics/feeding-cost-analysis',
+)
+MAX_IN_MEMORY_BODY = 64 * 1024
+FIRST_SEND_SIZE = 64 * 1024  # response bytes gathered before the first send
+
+def build_environ(scope, body):
+    """Translate an ASGI HTTP scope and buffered body into a WSGI environ"""
+    root_path = scope.get('root_path', '')
+    path = scope['path']
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': root_path.encode('utf-8').decode('latin-1'),
+        'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    
+    server = scope.get('server') or ('localhost', 80)
+    environ['SERVER_NAME'] = server[0]
+    environ['SERVER_PORT'] = str(server[1] or 0)
+    
+    client = scope.get('client')
+    if client:
+        environ['REMOTE_ADDR'] = client[0]
+        environ['REMOTE_PORT'] = str(client[1])
+    
+    for name, value in scope['headers']:
+        name = name.decode('latin-1')
+        if name == 'content-length':
+            key = 'CONTENT_LENGTH'
+        elif name == 'content-type':
+            key = 'CONTENT_TYPE'
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if key in environ:
+            value = f'{environ[key]},{value}'
+        environ[key] = value
+    
+    return environ
+
+class FlaskASGI:
+    """Minimal ASGI adapter that runs a WSGI app in thread pools"""
+    
+    def __init__(self, wsgi_app, threads=ASGI_THREADS, render_threads=ASGI_RENDER_THREADS):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='api')
+        self.render_executor = ThreadPoolExecutor(max_workers=render_threads, thread_name_prefix='render')
+    
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.handle_http(scope, receive, send)
+        else:
+            raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+    
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                self.render_executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    
+    async def handle_http(self, scope, receive, send):
+        with SpooledTemporaryFile(max_size=MAX_IN_MEMORY_BODY) as body:
+            # Read the whole upload on the loop before a thread is involved
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    return
+                body.write(message.get('body', b''))
+                if not message.get('more_body'):
+                    break
+            body.seek(0)
+            
+            executor = self.executor
+            if scope['path'].startswith(RENDER_PATH_PREFIXES):
+                executor = self.render_executor
+            
+            environ = build_environ(scope, body)
+            environ[ASGI_STREAM_KEY] = None
+            loop = asyncio.get_running_loop()
+            status, headers, first, result = await loop.run_in_executor(executor, self.run_wsgi_app, environ)
+            
+            if environ[ASGI_STREAM_KEY] is not None:
+                await self.stream_events(environ[ASGI_STREAM_KEY], status, headers, receive, send)
+                return
+            
+            await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+            if result is None:
+                await send({'type': 'http.response.body', 'body': first})
+                return
+            await self.stream_body(executor, first, result, send)
+    
+    async def stream_body(self, executor, first, result, send):
+        """Send the rest of a WSGI response chunk by chunk, reading the next only after each send"""
+        loop = asyncio.get_running_loop()
+        try:
+            chunk = first
+            while chunk is not None:
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                chunk = await loop.run_in_executor(executor, next, result, None)
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(result, 'close'):
+                await loop.run_in_executor(executor, result.close)
+    
+    async def stream_events(self, stream, status, headers, receive, send):
+        """Write an open change event stream until the client goes away"""
+        loop = asyncio.get_running_loop()
+        arrived = asyncio.Event()
+        stream.wakeup = lambda: loop.call_soon_threadsafe(arrived.set)
+        disconnected = asyncio.ensure_future(self.wait_for_disconnect(receive))
+        headers = [(name, value) for name, value in headers if name != b'content-length']
+        try:
+            await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+            await send({'type': 'http.response.body', 'body': stream.opening + stream.pending(), 'more_body': True})
+            while True:
+                waiting = asyncio.ensure_future(arrived.wait())
+                done, _ = await asyncio.wait(
+                    {waiting, disconnected}, timeout=KEEPALIVE_SECONDS, return_when=asyncio.FIRST_COMPLETED
+                )
+                waiting.cancel()
+                if disconnected in done:
+                    return
+                arrived.clear()
+                body = stream.pending() or (b'' if waiting in done else KEEPALIVE)
+                if body:
+                    await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+        finally:
+            disconnected.cancel()
+            stream.close()
+    
+    async def wait_for_disconnect(self, receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+    
+    def run_wsgi_app(self, environ):
+        """
+        (status, headers, first bytes, rest) of a response. ``rest`` is None
+        when the whole body fit in the first bytes, otherwise the open WSGI
+        iterator, which stream_body finishes and closes.
+        """
+        response = {}
+        chunks = []
+        
+        def start_response(status, response_headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [
+                (name.lower().encode('latin-1'), value.encode('latin-1'))
+                for name, value in response_headers
+            ]
+            return chunks.append
+        
+        result = self.wsgi_app(environ, start_response)
+        iterator = iter(result)
+        try:
+            size = sum(len(chunk) for chunk in chunks)
+            for chunk in iterator:
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= FIRST_SEND_SIZE:
+                    return response['status'], response['headers'], b''.join(chunks), _Remaining(iterator, result)
+        except BaseException:
+            if hasattr(result, 'close'):
+                result.close()
+            raise
+        
+        if hasattr(result, 'close'):
+            result.close()
+        return response['status'], response['headers'], b''.join(chunks), None
+
+class _Remaining:
+    """Rest of a WSGI response: an iterator, closed through the original iterable"""
+    
+    def __init__(self, iterator, result):
+        self.iterator = iterator
+        self.result = result
+    
+    def __iter__(self):
+        return self
+    
+    def __next__(self):
+        return next(self.iterator)
+    
+    def close(self):
+        if hasattr(self.result, 'close'):
+            self.result.close()
+
+asgi_app = FlaskASGI(app)
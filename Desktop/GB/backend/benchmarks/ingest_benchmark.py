@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Benchmark buffered milk reading ingestion against one commit per reading.
+
+Sends the same number of readings through POST /api/milk/ (a commit per
+reading) and POST /api/milk/readings (write-behind buffer) from several
+client threads, then reports acknowledged throughput, sustained throughput
+until everything is in the database, and flush latency.
+
+    python benchmarks/ingest_benchmark.py --readings 20000 --threads 8
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--readings', type=int, default=5000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--readings-per-request', type=int, default=1)
+    parser.add_argument('--cattle', type=int, default=200)
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--flush-interval', type=float, default=1.0)
+    parser.add_argument('--skip-direct', action='store_true', help='only run the buffered path')
+    return parser.parse_args()
+
+def send_all(app, url, total, threads, per_request):
+    """POST readings from several threads; returns elapsed seconds and error count"""
+    errors = []
+    
+    def worker(count, offset):
+        client = app.test_client()
+        sent = 0
+        while sent < count:
+            size = min(per_request, count - sent)
+            readings = [
+                {'cattle_id': (offset + sent + i) % args.cattle + 1, 'quantity_liters': 12.5, 'notes': 'meter'}
+                for i in range(size)
+            ]
+            if url.endswith('/readings'):
+                response = client.post(url, json=readings if per_request > 1 else readings[0])
+            else:
+                response = None
+                for reading in readings:
+                    response = client.post(url, json=reading)
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+            sent += size
+    
+    share = total // threads
+    workers = [threading.Thread(target=worker, args=(share + (1 if i < total % threads else 0), i * share))
+               for i in range(threads)]
+    started = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return time.perf_counter() - started, len(errors)
+
+def milk_count(app):
+    from database import db
+    from models.milk_production import MilkProduction
+    with app.app_context():
+        count = db.session.query(MilkProduction).count()
+        db.session.remove()
+        return count
+
+def main():
+    workdir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'ingest_benchmark.db')
+    os.environ['MILK_INGEST_DIR'] = os.path.join(workdir, 'ingest')
+    os.environ['MILK_INGEST_BATCH_SIZE'] = str(args.batch_size)
+    os.environ['MILK_INGEST_FLUSH_INTERVAL'] = str(args.flush_interval)
+    sys.path.insert(0, BACKEND_DIR)
+    
+    from datetime import date
+    from app import app
+    from database import db
+    from models.cattle import Cattle
+    from ingest import get_milk_ingest_buffer
+    
+    with app.app_context():
+        db.session.add_all([
+            Cattle(tag_number=f'B{i:05d}', name=f'Cow {i}', breed='Holstein', date_of_birth=date(2020, 1, 1), gender='Female')
+            for i in range(args.cattle)
+        ])
+        db.session.commit()
+    
+    results = []
+    
+    if not args.skip_direct:
+        elapsed, errors = send_all(app, '/api/milk/', args.readings, args.threads, args.readings_per_request)
+        results.append({
+            'mode': 'commit per reading',
+            'ack_readings_per_s': round(args.readings / elapsed),
+            'sustained_readings_per_s': round(args.readings / elapsed),
+            'errors': errors,
+        })
+    
+    before = milk_count(app)
+    buffer = get_milk_ingest_buffer(app)
+    started = time.perf_counter()
+    elapsed, errors = send_all(app, '/api/milk/readings', args.readings, args.threads, args.readings_per_request)
+    while milk_count(app) - before < args.readings - errors:
+        time.sleep(0.01)
+    drained = time.perf_counter() - started
+    stats = buffer.snapshot()
+    results.append({
+        'mode': 'write-behind buffer',
+        'ack_readings_per_s': round(args.readings / elapsed),
+        'sustained_readings_per_s': round(args.readings / drained),
+        'errors': errors,
+        'flushes': stats['flushes'],
+        'p50_flush_latency_ms': stats['p50_flush_latency_ms'],
+        'p95_flush_latency_ms': stats['p95_flush_latency_ms'],
+        'max_flush_latency_ms': stats['max_flush_latency_ms'],
+    })
+    buffer.stop()
+    
+    print(json.dumps(results, indent=2))
+    shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == '__main__':
+    args = parse_args()
+    main()
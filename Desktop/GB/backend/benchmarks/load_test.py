@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Side-by-side load test of the WSGI (gunicorn sync) and ASGI (uvicorn) serving modes.
+
+For each mode the script starts the server, opens a number of idle "slow mobile"
+connections that send partial request headers and then stall, and while they are
+held open fires a batch of normal requests and records latency and failures.
+
+    python benchmarks/load_test.py --idle 500 --requests 400 --concurrency 20
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = {
+    # Plain sync workers, without the production settings of gunicorn.conf.py
+    'wsgi': ['gunicorn', 'app:app', '--config', os.devnull, '--workers', '{workers}', '--bind', '127.0.0.1:{port}'],
+    'asgi': ['uvicorn', 'asgi:asgi_app', '--workers', '{workers}', '--host', '127.0.0.1',
+             '--port', '{port}', '--log-level', 'warning'],
+}
+
+async def wait_until_ready(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            status, _ = await fetch(port, '/api/health', timeout=1)
+            if status == 200:
+                return
+        except (OSError, asyncio.TimeoutError):
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f'Server on port {port} did not start')
+
+async def fetch(port, path, timeout=10):
+    async def _fetch():
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(f'GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n'.encode())
+        await writer.drain()
+        data = await reader.read()
+        writer.close()
+        return int(data.split(b' ', 2)[1]), len(data)
+    return await asyncio.wait_for(_fetch(), timeout)
+
+async def open_idle_connection(port):
+    try:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        # Never finish the headers, like a phone on a stalled network
+        writer.write(b'GET /api/health HTTP/1.1\r\nHost: localhost\r\n')
+        await writer.drain()
+        return writer
+    except OSError:
+        return None
+
+async def run_load(port, path, total, concurrency, timeout):
+    latencies = []
+    failures = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def one():
+        nonlocal failures
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                status, _ = await fetch(port, path, timeout)
+                if status >= 500:
+                    failures += 1
+                else:
+                    latencies.append(time.perf_counter() - started)
+            except (OSError, asyncio.TimeoutError, IndexError, ValueError):
+                failures += 1
+    
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - started
+    
+    latencies.sort()
+    def percentile(p):
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 1) if latencies else None
+    
+    return {
+        'requests': total,
+        'failures': failures,
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': percentile(0.50),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+    }
+
+async def benchmark_mode(mode, args, port, env):
+    command = [part.format(workers=args.workers, port=port) for part in MODES[mode]]
+    server = subprocess.Popen(command, cwd=BACKEND_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        await wait_until_ready(port)
+        idle = [w for w in await asyncio.gather(*(open_idle_connection(port) for _ in range(args.idle))) if w]
+        await asyncio.sleep(0.5)
+        result = await run_load(port, args.path, args.requests, args.concurrency, args.timeout)
+        result.update({'mode': mode, 'workers': args.workers, 'idle_connections': len(idle)})
+        for writer in idle:
+            writer.close()
+        return result
+    finally:
+        server.terminate()
+        server.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', nargs='+', choices=sorted(MODES), default=['wsgi', 'asgi'])
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--idle', type=int, default=200, help='idle slow connections held open')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--timeout', type=float, default=5.0, help='per-request timeout in seconds')
+    parser.add_argument('--path', default='/api/cattle/')
+    parser.add_argument('--port', type=int, default=8091)
+    parser.add_argument('--database-url', help='defaults to a throw-away SQLite file')
+    args = parser.parse_args()
+    
+    env = dict(os.environ)
+    if args.database_url:
+        env['DATABASE_URL'] = args.database_url
+    else:
+        env['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'load_test.db')
+    
+    results = []
+    for offset, mode in enumerate(args.modes):
+        results.append(asyncio.run(benchmark_mode(mode, args, args.port + offset, env)))
+    
+    print(f"{'mode':<6}{'idle':>6}{'ok rps':>10}{'fail':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for r in results:
+        print(f"{r['mode']:<6}{r['idle_connections']:>6}{r['throughput_rps']:>10}{r['failures']:>6}"
+              f"{str(r['p50_ms']):>10}{str(r['p95_ms']):>10}{str(r['p99_ms']):>10}")
+    json.dump(results, sys.stderr, indent=2)
+    sys.stderr.write('\n')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Memory per worker and throughput of gunicorn's defaults versus gunicorn.conf.py.
+
+Each mode starts gunicorn with the same number of workers, runs a batch of
+requests, and then reads every worker's memory from /proc (Linux only):
+
+    rss   resident memory, counting pages shared with the master and siblings
+    pss   resident memory with each shared page split between its sharers
+    uss   pages only this worker has (what killing it would free)
+
+Modes:
+    default   gunicorn app:app, each sync worker imports the app itself
+    preload   the same with --preload, without gc.freeze()
+    tuned     gunicorn.conf.py (preload, gc.freeze(), the --profile's worker class)
+
+    python benchmarks/serving_benchmark.py --workers 4 --requests 2000 --database-url sqlite:////tmp/herd.db
+    python benchmarks/serving_benchmark.py --modes preload tuned --profile render
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from load_test import BACKEND_DIR, run_load, wait_until_ready
+
+MODES = {
+    'default': ['gunicorn', 'app:app', '--config', os.devnull],
+    'preload': ['gunicorn', 'app:app', '--config', os.devnull, '--preload'],
+    'tuned': ['gunicorn'],  # reads gunicorn.conf.py from the backend directory
+}
+
+def worker_pids(master_pid):
+    with open(f'/proc/{master_pid}/task/{master_pid}/children') as children:
+        return [int(pid) for pid in children.read().split()]
+
+def memory_mb(pid):
+    """{'rss', 'pss', 'uss'} of a process in MB"""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as smaps:
+        for line in smaps:
+            name, _, rest = line.partition(':')
+            if rest.strip().endswith('kB'):
+                values[name] = int(rest.split()[0]) / 1024
+    return {
+        'rss': values['Rss'],
+        'pss': values['Pss'],
+        'uss': values['Private_Clean'] + values['Private_Dirty'],
+    }
+
+async def benchmark_mode(mode, args, port, env):
+    command = MODES[mode] + ['--workers', str(args.workers), '--bind', f'127.0.0.1:{port}']
+    server = subprocess.Popen(command, cwd=BACKEND_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        await wait_until_ready(port)
+        await run_load(port, args.path, args.workers * 20, args.concurrency, args.timeout)  # warm up every worker
+        result = await run_load(port, args.path, args.requests, args.concurrency, args.timeout)
+        time.sleep(0.5)
+        workers = [memory_mb(pid) for pid in worker_pids(server.pid)]
+        result.update({
+            'mode': mode,
+            'workers': len(workers),
+            'master_rss_mb': round(memory_mb(server.pid)['rss'], 1),
+            **{f'worker_{key}_mb': round(sum(w[key] for w in workers) / len(workers), 1) for key in ('rss', 'pss', 'uss')},
+            'total_pss_mb': round(memory_mb(server.pid)['pss'] + sum(w['pss'] for w in workers), 1),
+        })
+        return result
+    finally:
+        server.terminate()
+        server.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES))
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--timeout', type=float, default=10.0, help='per-request timeout in seconds')
+    parser.add_argument('--path', default='/api/cattle/?limit=50')
+    parser.add_argument('--profile', choices=['api', 'render'], default='api', help='GUNICORN_PROFILE of the tuned mode')
+    parser.add_argument('--port', type=int, default=8095)
+    parser.add_argument('--database-url', help='defaults to a throw-away SQLite file')
+    args = parser.parse_args()
+
+    env = dict(os.environ, GUNICORN_PROFILE=args.profile)
+    if args.database_url:
+        env['DATABASE_URL'] = args.database_url
+    else:
+        env['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'serving_benchmark.db')
+
+    results = []
+    for offset, mode in enumerate(args.modes):
+        results.append(asyncio.run(benchmark_mode(mode, args, args.port + offset, env)))
+
+    print(f"{'mode':<9}{'ok rps':>9}{'fail':>6}{'p95 ms':>9}{'rss MB':>9}{'pss MB':>9}{'uss MB':>9}{'total pss':>11}")
+    for r in results:
+        print(f"{r['mode']:<9}{r['throughput_rps']:>9}{r['failures']:>6}{str(r['p95_ms']):>9}"
+              f"{r['worker_rss_mb']:>9}{r['worker_pss_mb']:>9}{r['worker_uss_mb']:>9}{r['total_pss_mb']:>11}")
+    json.dump(results, sys.stderr, indent=2)
+    sys.stderr.write('\n')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Helpers for the set-based bulk update and delete endpoints.
+
+A bulk request body selects records by id and/or by filter, for example:
+
+    {"ids": [1, 2, 3], "changes": {"location": "Pasture 1"}}
+    {"filter": {"location": "Barn A", "breed": ["Jersey", "Angus"]}, "changes": {...}}
+    {"filter": {"cattle_id": 4, "start_date": "2024-01-01", "end_date": "2024-01-31"}}
+"""
+
+from datetime import datetime
+
+class BulkRequestError(ValueError):
+    """Raised for a malformed bulk request; routes answer it with 400"""
+
+def _parse_date(field, value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise BulkRequestError(f"'{field}' must be a YYYY-MM-DD date")
+
+def bulk_date_range(data):
+    """(start_date, end_date) of a bulk request's filter, None where open"""
+    criteria = data.get('filter') or {}
+    return tuple(
+        _parse_date(field, criteria[field]) if criteria.get(field) is not None else None
+        for field in ('start_date', 'end_date')
+    )
+
+def bulk_conditions(model, data, filter_fields=(), date_field=None):
+    """
+    Build the WHERE clauses selecting the records of a bulk request, on a
+    model or on a table's ``.c`` columns (archive partitions)
+    """
+    conditions = []
+    
+    ids = data.get('ids')
+    if ids is not None:
+        if not isinstance(ids, list) or not ids:
+            raise BulkRequestError("'ids' must be a non-empty list")
+        conditions.append(model.id.in_(ids))
+    
+    criteria = data.get('filter') or {}
+    if not isinstance(criteria, dict):
+        raise BulkRequestError("'filter' must be an object")
+    
+    for field, value in criteria.items():
+        if date_field and field in ('start_date', 'end_date'):
+            column = getattr(model, date_field)
+            value = _parse_date(field, value)
+            conditions.append(column >= value if field == 'start_date' else column <= value)
+        elif field in filter_fields:
+            values = value if isinstance(value, list) else [value]
+            conditions.append(getattr(model, field).in_(values))
+        else:
+            raise BulkRequestError(f'Unsupported filter field: {field}')
+    
+    # Never fall through to an unfiltered UPDATE/DELETE of the whole table
+    if not conditions:
+        raise BulkRequestError("Provide 'ids' or 'filter' to select records")
+    
+    return conditions
+
+def bulk_changes(data, updatable_fields):
+    """Validate the 'changes' object of a bulk update"""
+    changes = data.get('changes')
+    if not isinstance(changes, dict) or not changes:
+        raise BulkRequestError("'changes' must be a non-empty object")
+    
+    unsupported = sorted(set(changes) - set(updatable_fields))
+    if unsupported:
+        raise BulkRequestError(f"Fields cannot be bulk updated: {', '.join(unsupported)}")
+    
+    return changes
@@ -1,6 +1,68 @@
+from contextvars import ContextVar
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from sqlalchemy import inspect, select, text
+from sqlalchemy.schema import CreateIndex, CreateColumn
 
-db = SQLAlchemy()
+# Bind key of the farm database the current request or task works on (None is the default farm)
+current_farm_bind = ContextVar('current_farm_bind', default=None)
+
+# Set by replica.replica_read: the client's last write (ms) a replica must have caught up with
+current_read_replica = ContextVar('current_read_replica', default=None)
+
+REPLICA_BIND_PREFIX = 'replica:'
+
+class FarmSession(Session):
+    """Session that sends every statement to the current farm's database (or its replica)"""
+    
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is not None:
+            return bind
+        bind_key = current_farm_bind.get()
+        
+        last_write = current_read_replica.get()
+        if last_write is not None and not self._flushing:
+            # Decide once per session so a request never mixes primary and replica reads
+            routes = self.info.setdefault('replica_routes', {})
+            if bind_key not in routes:
+                from replica import route_read
+                routes[bind_key] = route_read(self._db.engines, bind_key, last_write)
+            if routes[bind_key] is not None:
+                return routes[bind_key]
+        
+        if bind_key is not None:
+            return self._db.engines[bind_key]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+db = SQLAlchemy(session_options={'class_': FarmSession})
+
+def _add_missing_columns(connection, inspector, table_name, columns):
+    existing = {column['name'] for column in inspector.get_columns(table_name)}
+    for column in columns:
+        if column.name not in existing and column.nullable:
+            ddl = CreateColumn(column).compile(dialect=connection.dialect)
+            connection.execute(text(f'ALTER TABLE {table_name} ADD COLUMN {ddl}'))
+
+def create_schema(engine):
+    """Create missing tables on one database"""
+    db.metadata.create_all(engine)
+    
+    # create_all skips existing tables, so add nullable columns and indexes introduced since
+    with engine.begin() as connection:
+        inspector = inspect(connection)
+        for table in db.metadata.sorted_tables:
+            _add_missing_columns(connection, inspector, table.name, table.columns)
+        
+        # Archived partitions must keep the columns of their hot table
+        partitions = db.metadata.tables['archive_partitions']
+        for source_table, partition_table in connection.execute(
+            select(partitions.c.source_table, partitions.c.partition_table)
+        ):
+            _add_missing_columns(connection, inspector, partition_table, db.metadata.tables[source_table].columns)
+        
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                connection.execute(CreateIndex(index, if_not_exists=True))
 
 def init_db(app):
     """Initialize database with Flask app"""
@@ -13,7 +75,46 @@ def init_db(app):
         from models.feeding import Feeding
         from models.expenses import Expenses
         from models.revenue import Revenue
+        from models.table_version import TableVersion
+        from models.archive_partition import ArchivePartition
+        from models.ingest_segment import IngestSegment
+        from models.generated_report import GeneratedReport
+        from models.forecast_state import ForecastState
+        from models.idempotency_key import IdempotencyKey
+        from models.change_event import ChangeEvent
+        from models.snapshot import Snapshot
+        from models.feed_stock import FeedStock
+        from models.feed_stock_movement import FeedStockMovement
+        from models.feed_consumption import FeedConsumption
+        from models.retired_feeding import RetiredFeeding
+        from models.cattle_ancestry import CattleAncestry
         
-        # Create all tables
-        db.create_all()
+        # Create all tables, on the default database and every farm database (replicas are read-only)
+        for bind_key, engine in db.engines.items():
+            if bind_key is None or not bind_key.startswith(REPLICA_BIND_PREFIX):
+                create_schema(engine)
         print("Database tables created successfully!")
+        
+        # Bump per-table write versions on every flush (used for ETags)
+        from versioning import register_version_events
+        register_version_events()
+        
+        # Derive lifecycle fields whenever cattle are saved through the ORM
+        from lifecycle import register_lifecycle_events
+        register_lifecycle_events()
+        
+        # Extend the ancestry closure and inbreeding coefficients when cattle are saved
+        from pedigree import register_pedigree_events
+        register_pedigree_events()
+        
+        # Store Idempotency-Keys in the transaction of the record they created
+        from idempotency import register_idempotency_events
+        register_idempotency_events()
+        
+        # Announce record changes through the change_events outbox
+        from events import register_outbox_events
+        register_outbox_events()
+        
+        # Keep feed stock balances and daily consumption current on every feeding or stock write
+        from inventory import register_inventory_events
+        register_inventory_events()
@@ -0,0 +1,91 @@
+"""
+Time-bucketing and downsampling for chart series.
+
+``time_bucket`` groups a date column by day, ISO week (starting Monday) or
+month in SQL, so a long range costs no more rows than a short one. ``lttb``
+reduces a series that is still too long to a fixed number of points with the
+Largest-Triangle-Three-Buckets algorithm, which keeps peaks and dips that plain
+averaging would flatten.
+"""
+
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from sqlalchemy import func
+
+from database import db
+
+GRANULARITIES = ('auto', 'day', 'week', 'month')
+MAX_CHART_POINTS = 400
+
+# Longest range (days) still charted at each granularity by 'auto'
+AUTO_RANGES = [(92, 'day'), (730, 'week')]
+
+class GranularityError(ValueError):
+    """Raised for an unknown granularity; routes answer it with 400"""
+
+def resolve_granularity(granularity, days):
+    if granularity not in GRANULARITIES:
+        raise GranularityError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+    if granularity != 'auto':
+        return granularity
+    for longest, resolved in AUTO_RANGES:
+        if days <= longest:
+            return resolved
+    return 'month'
+
+def time_bucket(column, granularity):
+    """SQL expression for the first day of the bucket a date falls in"""
+    if granularity == 'day':
+        return column
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return func.date_trunc(granularity, column)
+    if granularity == 'week':
+        # Next Sunday (or the day itself), then back to that week's Monday
+        return func.date(column, 'weekday 0', '-6 days')
+    return func.date(column, 'start of month')
+
+def bucket_start(day, granularity):
+    """First day of the bucket ``day`` falls in, to start a range on a whole bucket"""
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+def as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(value)
+
+def lttb(x, y, threshold):
+    """Indices of at most ``threshold`` points of (x, y) that keep the series' shape"""
+    count = len(x)
+    if threshold >= count or threshold < 3:
+        return np.arange(count)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    # First and last points are kept; the rest is split into threshold - 2 buckets
+    edges = np.linspace(1, count - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0], selected[-1] = 0, count - 1
+
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket (the last point for the final bucket)
+        next_end = edges[i + 2] if i + 2 < len(edges) else count
+        next_x = x[end:next_end].mean()
+        next_y = y[end:next_end].mean()
+
+        # Keep the point forming the largest triangle with the previous pick and the next average
+        area = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(area.argmax())
+        selected[i + 1] = previous
+    return selected
@@ -0,0 +1,111 @@
+"""
+Response encodings for large payloads.
+
+``init_compression`` gzip- or brotli-compresses JSON, CSV and text responses
+for clients that accept it. ``list_response`` lets list endpoints answer in a
+column-oriented JSON layout (``?format=columns`` or
+``Accept: application/vnd.gb.columns+json``) where each key is sent once and
+low-cardinality strings such as breed, feed type or dates are dictionary
+encoded:
+
+    {"format": "columns", "length": 3, "columns": ["id", "feed_type"],
+     "data": {"id": [1, 2, 3],
+              "feed_type": {"dictionary": ["Hay", "Barley"], "indices": [0, 1, 0]}}}
+"""
+
+import gzip
+
+from flask import request, jsonify
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+COLUMNS_MIMETYPE = 'application/vnd.gb.columns+json'
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', COLUMNS_MIMETYPE, 'text/csv', 'text/plain', 'text/html',
+    'application/javascript', 'image/svg+xml',
+}
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # fast enough for per-request compression
+
+def wants_columns():
+    if request.args.get('format') == 'columns':
+        return True
+    return request.accept_mimetypes.best_match([COLUMNS_MIMETYPE, 'application/json']) == COLUMNS_MIMETYPE
+
+def _encode_column(values):
+    strings = [value for value in values if value is not None]
+    if strings and all(isinstance(value, str) for value in strings):
+        dictionary = list(dict.fromkeys(values))
+        # Only worth it when values repeat
+        if len(dictionary) * 2 <= len(values):
+            positions = {value: index for index, value in enumerate(dictionary)}
+            return {'dictionary': dictionary, 'indices': [positions[value] for value in values]}
+    return values
+
+def to_columns(rows):
+    """Turn a list of dicts sharing the same keys into the columns layout"""
+    columns = list(rows[0]) if rows else []
+    return {
+        'format': 'columns',
+        'length': len(rows),
+        'columns': columns,
+        'data': {name: _encode_column([row[name] for row in rows]) for name in columns},
+    }
+
+def list_response(rows):
+    """jsonify a list of records, or its columns layout when the client asked for it"""
+    if wants_columns():
+        response = jsonify(to_columns(rows))
+        response.mimetype = COLUMNS_MIMETYPE
+    else:
+        response = jsonify(rows)
+    response.vary.add('Accept')
+    return response
+
+def _choose_encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+def init_compression(app):
+    """Compress responses per request according to Accept-Encoding"""
+
+    @app.after_request
+    def compress(response):
+        if response.status_code == 304:
+            # Keep the ETag the client cached the compressed body under
+            etag, weak = response.get_etag()
+            if etag and not weak and _choose_encoding():
+                response.set_etag(etag, weak=True)
+            return response
+
+        if (response.direct_passthrough or response.is_streamed
+                or response.status_code < 200 or response.status_code == 204
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        body = response.get_data()
+        encoding = _choose_encoding()
+        if encoding is None or len(body) < app.config['COMPRESS_MIN_SIZE']:
+            return response
+
+        if encoding == 'br':
+            body = brotli.compress(body, quality=BROTLI_QUALITY)
+        else:
+            body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+        # Same data, different bytes: the ETag may no longer claim byte equality
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
@@ -0,0 +1,319 @@
+"""
+Change notifications for live dashboards.
+
+Every create, update and delete of cattle, milk, feeding, expense and revenue
+records adds a row to the ``change_events`` outbox in the same transaction, so a
+change is announced exactly when it is committed. ``GET /api/events`` streams
+these rows as server-sent events:
+
+    id: 1042
+    event: change
+    data: {"id": 1042, "table": "milk_production", "action": "create", "record_id": 9, "data": {...}}
+
+A reconnecting client sends the last id it saw (``Last-Event-ID``, which
+EventSource does automatically, or ``?last_event_id=``) and receives what it
+missed. When that is no longer in the outbox a ``reset`` event tells it to
+reload its lists. One ``EventHub`` thread per process polls each farm's outbox
+and hands new rows to every open stream of that farm.
+
+Ids are taken when a transaction flushes but become visible when it commits, so
+on PostgreSQL a lower id can appear after a higher one was sent. Events are
+therefore handed out in id order only up to the first missing id; a gap is
+skipped (as a rollback) once the event after it is ``EVENTS_COMMIT_GRACE``
+seconds old. Resume cursors and snapshot event ids never pass an open gap.
+"""
+
+import itertools
+import json
+import queue
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import event, select, insert, delete, func
+from sqlalchemy.orm import Session
+
+from models.change_event import ChangeEvent
+from tenancy import farm_engine
+
+OUTBOX_TABLES = {'cattle', 'milk_production', 'feeding', 'expenses', 'revenue'}
+PER_RECORD_LIMIT = 50  # changes of one table in one flush; more are announced as one bulk event
+BACKLOG_LIMIT = 1000  # missed events replayed on reconnect before asking for a reset
+POLL_BATCH = 500
+PRUNE_EVERY = 1000  # flushes that wrote events
+KEEPALIVE_SECONDS = 15
+RETRY_MS = 3000
+KEEPALIVE = b': keepalive\n\n'
+
+event_table = ChangeEvent.__table__
+_flushes = itertools.count(1)
+
+class EventStreamError(ValueError):
+    """Raised for an invalid stream request; routes answer it with 400"""
+
+def record_bulk_event(connection, table_name, action, data=None):
+    """Announce a change written without the ORM (e.g. the milk ingest)"""
+    connection.execute(insert(event_table).values(
+        table_name=table_name, action=action, data=json.dumps(data) if data is not None else None,
+        created_at=datetime.utcnow()
+    ))
+
+def register_outbox_events():
+    """Write change events for every ORM write to the outbox tables"""
+    if event.contains(Session, 'after_flush', _after_flush):
+        return
+    event.listen(Session, 'after_flush', _after_flush)
+    event.listen(Session, 'do_orm_execute', _do_orm_execute)
+
+def _after_flush(session, flush_context):
+    changes = defaultdict(list)
+    for state, (isdelete, listonly) in flush_context.states.items():
+        table_name = state.mapper.local_table.name
+        if listonly or table_name not in OUTBOX_TABLES:
+            continue
+        obj = state.obj()
+        action = 'delete' if isdelete else 'create' if obj in session.new else 'update'
+        changes[table_name].append((action, obj))
+    if not changes:
+        return
+
+    now = datetime.utcnow()
+    rows = []
+    for table_name, records in changes.items():
+        if len(records) > PER_RECORD_LIMIT:
+            # e.g. a cow's cascade-deleted milk history
+            counts = defaultdict(int)
+            for action, obj in records:
+                counts[action] += 1
+            rows += [
+                {'table_name': table_name, 'action': f'bulk_{action}', 'record_id': None,
+                 'data': json.dumps({'count': count}), 'created_at': now}
+                for action, count in counts.items()
+            ]
+            continue
+        for action, obj in records:
+            rows.append({
+                'table_name': table_name,
+                'action': action,
+                'record_id': obj.id,
+                'data': None if action == 'delete' else json.dumps(obj.to_dict()),
+                'created_at': now,
+            })
+
+    connection = session.connection()
+    connection.execute(insert(event_table), rows)
+    if next(_flushes) % PRUNE_EVERY == 0:
+        retention = timedelta(hours=current_app.config['EVENTS_RETENTION_HOURS'])
+        connection.execute(delete(event_table).where(event_table.c.created_at < now - retention))
+
+def _do_orm_execute(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.local_table.name in OUTBOX_TABLES:
+        action = 'bulk_update' if orm_execute_state.is_update else 'bulk_delete'
+        record_bulk_event(orm_execute_state.session.connection(), mapper.local_table.name, action)
+
+def event_payload(row):
+    return {
+        'id': row.id,
+        'table': row.table_name,
+        'action': row.action,
+        'record_id': row.record_id,
+        'data': json.loads(row.data) if row.data else None,
+        'created_at': row.created_at.isoformat() if row.created_at else None,
+    }
+
+def _settled_before():
+    """Gaps before events written earlier than this are rolled back, not in flight"""
+    return datetime.utcnow() - timedelta(seconds=current_app.config['EVENTS_COMMIT_GRACE'])
+
+def _contiguous(rows, after_id, settled_before):
+    """Leading rows (ordered by id) that leave no gap still waiting for a commit"""
+    expected = after_id + 1
+    for count, row in enumerate(rows):
+        if row.id != expected and row.created_at is not None and row.created_at >= settled_before:
+            return rows[:count]
+        expected = row.id + 1
+    return rows
+
+def latest_event_id(connection):
+    """Highest event id with no earlier event still waiting for its commit"""
+    settled_before = _settled_before()
+    settled = connection.execute(
+        select(func.max(event_table.c.id)).where(event_table.c.created_at < settled_before)
+    ).scalar() or 0
+    recent = connection.execute(
+        select(event_table.c.id, event_table.c.created_at)
+        .where(event_table.c.id > settled).order_by(event_table.c.id)
+    ).all()
+    rows = _contiguous(recent, settled, settled_before)
+    return rows[-1].id if rows else settled
+
+def oldest_event_id(connection):
+    return connection.execute(select(func.min(event_table.c.id))).scalar()
+
+def events_after(connection, after_id, limit):
+    rows = connection.execute(
+        select(event_table).where(event_table.c.id > after_id).order_by(event_table.c.id).limit(limit)
+    ).all()
+    return [event_payload(row) for row in _contiguous(rows, after_id, _settled_before())]
+
+def encode_events(events):
+    """Server-sent events wire format"""
+    return ''.join(
+        f"id: {item['id']}\nevent: change\ndata: {json.dumps(item)}\n\n" for item in events
+    ).encode('utf-8')
+
+def encode_reset(last_id):
+    return f'id: {last_id}\nevent: reset\ndata: {{}}\n\n'.encode('utf-8')
+
+class EventStream:
+    """One client's subscription; fed by the hub thread, drained by the response"""
+
+    def __init__(self, hub, farm_id, tables):
+        self.hub = hub
+        self.farm_id = farm_id
+        self.tables = tables
+        self.last_id = 0
+        self.opening = b''  # retry hint plus what the client missed
+        self.wakeup = None  # optional callback run (on the hub thread) when events arrive
+        self._queue = queue.SimpleQueue()
+
+    def deliver(self, events):
+        self._queue.put(events)
+        if self.wakeup is not None:
+            self.wakeup()
+
+    def pending(self, timeout=None):
+        """Encoded events received since the last call; waits up to ``timeout`` when given"""
+        batches = []
+        try:
+            batches.append(self._queue.get(timeout=timeout) if timeout else self._queue.get_nowait())
+            while True:
+                batches.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+
+        events = []
+        for batch in batches:
+            for item in batch:
+                # The hub may hand over events already sent in the opening backlog
+                if item['id'] > self.last_id and (not self.tables or item['table'] in self.tables):
+                    events.append(item)
+                    self.last_id = item['id']
+        return encode_events(events)
+
+    def iter_blocking(self):
+        """Body of a WSGI streaming response; holds the worker thread while open"""
+        try:
+            yield self.opening
+            while True:
+                yield self.pending(timeout=KEEPALIVE_SECONDS) or KEEPALIVE
+        finally:
+            self.close()
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+class EventHub:
+    """Polls each farm's outbox once per interval for all of that farm's streams"""
+
+    def __init__(self, app, interval):
+        self.app = app
+        self.interval = interval
+        self._streams = defaultdict(set)  # farm_id -> open streams
+        self._last_seen = {}  # farm_id -> last outbox id handed out
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def open(self, farm_id, after_id=None, tables=None):
+        """Subscribe a new stream; needs an app context bound to the farm"""
+        stream = EventStream(self, farm_id, tables)
+        with farm_engine().connect() as connection:
+            latest = latest_event_id(connection)
+            with self._lock:
+                self._last_seen.setdefault(farm_id, latest)
+                self._streams[farm_id].add(stream)
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='event-hub', daemon=True)
+                    self._thread.start()
+
+            opening = f'retry: {RETRY_MS}\n\n'.encode('utf-8')
+            if after_id is None or after_id >= latest:
+                stream.last_id = latest if after_id is None else after_id
+            else:
+                missed = events_after(connection, after_id, BACKLOG_LIMIT)
+                oldest = oldest_event_id(connection)
+                # Judged from the outbox, not the replay: ids may skip rolled-back transactions
+                if oldest is None or oldest > after_id + 1 or len(missed) == BACKLOG_LIMIT:
+                    # Pruned from the outbox, or too far behind to replay
+                    opening += encode_reset(latest)
+                    stream.last_id = latest
+                else:
+                    stream.last_id = after_id
+                    stream.deliver(missed)
+                    opening += stream.pending()
+        stream.opening = opening
+        return stream
+
+    def unsubscribe(self, stream):
+        with self._lock:
+            self._streams[stream.farm_id].discard(stream)
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(streams) for streams in self._streams.values())
+
+    def poll(self, farm_id):
+        with self._lock:
+            streams = list(self._streams[farm_id])
+            after_id = self._last_seen[farm_id]
+        if not streams:
+            return
+        with farm_engine(farm_id).connect() as connection:
+            events = events_after(connection, after_id, POLL_BATCH)
+        if not events:
+            return
+        with self._lock:
+            self._last_seen[farm_id] = events[-1]['id']
+        for stream in streams:
+            stream.deliver(events)
+
+    def _run(self):
+        while True:
+            with self.app.app_context():
+                with self._lock:
+                    farms = [farm_id for farm_id, streams in self._streams.items() if streams]
+                for farm_id in farms:
+                    try:
+                        self.poll(farm_id)
+                    except Exception as e:
+                        self.app.logger.error(f'Event poll failed for farm {farm_id}: {e}')
+            time.sleep(self.interval)
+
+_hub_lock = threading.Lock()
+
+def get_event_hub(app):
+    hub = app.extensions.get('event_hub')
+    if hub is None:
+        with _hub_lock:
+            hub = app.extensions.get('event_hub')
+            if hub is None:
+                hub = app.extensions['event_hub'] = EventHub(app, app.config['EVENTS_POLL_INTERVAL'])
+    return hub
+
+def parse_stream_request(request):
+    """(last event id or None, set of tables or None) of a stream request"""
+    last_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    if last_id is not None and not last_id.isdigit():
+        raise EventStreamError('Last-Event-ID must be an event id')
+
+    tables = request.args.get('tables')
+    tables = {table for table in tables.split(',') if table} if tables else None
+    unknown = (tables or set()) - OUTBOX_TABLES
+    if unknown:
+        raise EventStreamError(f"Unknown table: {', '.join(sorted(unknown))}")
+    return (int(last_id) if last_id is not None else None), tables
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Milk output and feed demand forecasts.
+
+Every series (herd milk, each cow's milk, each feed type's kg) is fitted with
+damped-trend exponential smoothing, run over all series at once as numpy arrays.
+The fitted state (level, trend, error variance) is stored in ``forecast_states``
+together with the last day it has seen, so the nightly refresh only folds in the
+days since then; ``--full`` refits from the whole history. Forecasts and their
+confidence bands are computed from the stored state on request.
+
+    python forecast.py            # incremental, run nightly
+    python forecast.py --full
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, update, insert
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import db
+from archive import with_archive
+from models.cattle import Cattle
+from models.feeding import Feeding
+from models.forecast_state import ForecastState
+from models.milk_production import MilkProduction
+
+# Damped-trend smoothing parameters
+ALPHA = 0.3    # level
+BETA = 0.05    # trend
+PHI = 0.98     # trend damping, keeps 90-day forecasts from running away
+VARIANCE_WEIGHT = 0.05  # of each new squared error in the running variance
+
+BAND_Z = {'80': 1.2816, '95': 1.96}
+COW_CHUNK = 2000
+
+SERIES = {
+    'herd_milk': {'model': MilkProduction, 'value': 'quantity_liters', 'key': None},
+    'cow_milk': {'model': MilkProduction, 'value': 'quantity_liters', 'key': 'cattle_id'},
+    'feed': {'model': Feeding, 'value': 'quantity_kg', 'key': 'feed_type'},
+}
+
+def smooth(values, level, trend, variance, observations):
+    """
+    Run the smoothing recursions over a (series x days) matrix, updating the
+    state arrays in place. A NaN level means the series has not started yet;
+    NaN values are days without an observation.
+    """
+    for t in range(values.shape[1]):
+        x = values[:, t]
+        observed = ~np.isnan(x)
+        starting = observed & np.isnan(level)
+        level[starting] = x[starting]
+        trend[starting] = 0.0
+
+        step = observed & ~starting
+        predicted = level[step] + PHI * trend[step]
+        error = x[step] - predicted
+        known = ~np.isnan(variance[step])
+        variance[step] = np.where(
+            known, (1 - VARIANCE_WEIGHT) * variance[step] + VARIANCE_WEIGHT * error ** 2, error ** 2
+        )
+        level[step] = predicted + ALPHA * error
+        trend[step] = PHI * trend[step] + ALPHA * BETA * error
+        observations[observed] += 1
+
+def daily_totals(spec, since, through, keys=None):
+    """DataFrame of (key, date, total) for days in (since, through]"""
+    records = with_archive(spec['model'], since, through)
+    value = func.sum(getattr(records, spec['value'])).label('total')
+    key = getattr(records, spec['key']) if spec['key'] else None
+
+    columns = [records.date_recorded, value] if key is None else [key.label('key'), records.date_recorded, value]
+    query = db.session.query(*columns).filter(records.date_recorded <= through)
+    if since is not None:
+        query = query.filter(records.date_recorded > since)
+    if keys is not None:
+        query = query.filter(key.in_(keys))
+    group = [records.date_recorded] if key is None else [key, records.date_recorded]
+
+    frame = pd.DataFrame(query.group_by(*group).all(), columns=['date_recorded', 'total'] if key is None else ['key', 'date_recorded', 'total'])
+    if key is None:
+        frame.insert(0, 'key', 'herd')
+    frame['key'] = frame['key'].astype(str)
+    frame['date_recorded'] = pd.to_datetime(frame['date_recorded'])
+    return frame
+
+def fit_series(name, frame, states, since, through):
+    """Fold the days in (since, through] into the states of one series; returns state rows"""
+    keys = sorted(set(frame['key']) | set(states))
+    if not keys:
+        return []
+
+    first_day = np.datetime64(since + timedelta(days=1)) if since else frame['date_recorded'].min().to_datetime64()
+    first_day = first_day.astype('datetime64[D]')
+    days = int((np.datetime64(through) - first_day).astype(int)) + 1
+    if days <= 0:
+        return []
+
+    # Missing days count as zero once a series has started (a dry cow gives no milk)
+    values = np.zeros((len(keys), days))
+    index = {key: i for i, key in enumerate(keys)}
+    rows = frame['key'].map(index).to_numpy()
+    cols = (frame['date_recorded'].to_numpy().astype('datetime64[D]') - first_day).astype(int)
+    values[rows, cols] = frame['total'].to_numpy(dtype=float)
+
+    level = np.full(len(keys), np.nan)
+    trend = np.full(len(keys), np.nan)
+    variance = np.full(len(keys), np.nan)
+    observations = np.zeros(len(keys), dtype=int)
+
+    # A new series starts on its first observed day; a stored one after the last day it has seen
+    start = np.full(len(keys), days)
+    first_seen = frame.groupby('key')['date_recorded'].min()
+    start[first_seen.index.map(index).to_numpy()] = (
+        first_seen.to_numpy().astype('datetime64[D]') - first_day
+    ).astype(int)
+    for key, state in states.items():
+        i = index[key]
+        level[i], trend[i], variance[i], observations[i] = state.level, state.trend, state.variance, state.observations
+        start[i] = (np.datetime64(state.fitted_through) - first_day).astype(int) + 1
+    values[np.arange(days) < start[:, None]] = np.nan
+
+    smooth(values, level, trend, variance, observations)
+
+    return [
+        {
+            'series': name,
+            'key': key,
+            'level': float(level[i]),
+            'trend': float(trend[i]),
+            'variance': float(np.nan_to_num(variance[i])),
+            'observations': int(observations[i]),
+            'fitted_through': through,
+        }
+        for key, i in index.items() if not np.isnan(level[i])
+    ]
+
+def save_states(rows, states):
+    updates, inserts = [], []
+    for row in rows:
+        state = states.get(row['key'])
+        if state is not None:
+            updates.append(dict(row, id=state.id))
+        else:
+            inserts.append(row)
+    if updates:
+        db.session.execute(update(ForecastState), updates)
+    if inserts:
+        db.session.execute(insert(ForecastState), inserts)
+
+def load_states(name):
+    return {state.key: state for state in ForecastState.query.filter_by(series=name)}
+
+def refresh_forecasts(full=False, today=None):
+    """Bring every series up to yesterday; returns {series: states saved}"""
+    through = (today or date.today()) - timedelta(days=1)
+    refreshed = {}
+
+    for name, spec in SERIES.items():
+        if full:
+            ForecastState.query.filter_by(series=name).delete()
+            states = {}
+            since = None
+        else:
+            states = load_states(name)
+            since = min((state.fitted_through for state in states.values()), default=None)
+            if since is not None and since >= through:
+                refreshed[name] = 0
+                continue
+
+        if name == 'cow_milk' and since is None:
+            # Full history for every cow does not fit in memory at once
+            ids = [row.id for row in db.session.query(Cattle.id).order_by(Cattle.id)]
+            rows = []
+            for start in range(0, len(ids), COW_CHUNK):
+                chunk = ids[start:start + COW_CHUNK]
+                frame = daily_totals(spec, None, through, chunk)
+                rows += fit_series(name, frame, {}, None, through)
+        else:
+            frame = daily_totals(spec, since, through)
+            rows = fit_series(name, frame, states, since, through)
+
+        save_states(rows, states)
+        db.session.commit()
+        refreshed[name] = len(rows)
+
+    return refreshed
+
+def project(state, horizon, start=None):
+    """Daily forecasts with 80% and 95% bands for ``horizon`` days after the state's last day"""
+    start = start or state.fitted_through + timedelta(days=1)
+    offset = (start - state.fitted_through).days
+    steps = np.arange(offset, offset + horizon)
+
+    # Damped trend: sum of PHI**1..PHI**h
+    damping = np.cumsum(PHI ** np.arange(1, steps[-1] + 1))
+    mean = state.level + damping[steps - 1] * state.trend
+
+    # Error variance of an h-step forecast for damped-trend smoothing
+    c = ALPHA * (1 + BETA * damping)
+    spread = np.concatenate([[0.0], np.cumsum(c ** 2)])
+    std = np.sqrt(state.variance * (1 + spread[steps - 1]))
+
+    daily = []
+    for i, step in enumerate(steps):
+        point = {
+            'date': (state.fitted_through + timedelta(days=int(step))).isoformat(),
+            'forecast': round(max(0.0, mean[i]), 2),
+        }
+        for band, z in BAND_Z.items():
+            point[f'lower_{band}'] = round(max(0.0, mean[i] - z * std[i]), 2)
+            point[f'upper_{band}'] = round(max(0.0, mean[i] + z * std[i]), 2)
+        daily.append(point)
+
+    # Errors of consecutive days are correlated, so the total's band adds the std devs
+    total = float(np.clip(mean, 0, None).sum())
+    total_std = float(std.sum())
+    return {
+        'series': state.series,
+        'key': state.key,
+        'fitted_through': state.fitted_through.isoformat(),
+        'horizon': horizon,
+        'daily': daily,
+        'total': {
+            'forecast': round(total, 2),
+            **{f'lower_{band}': round(max(0.0, total - z * total_std), 2) for band, z in BAND_Z.items()},
+            **{f'upper_{band}': round(total + z * total_std, 2) for band, z in BAND_Z.items()},
+        }
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--full', action='store_true', help='refit every series from the full history')
+    args = parser.parse_args()
+
+    from app import app
+    from tenancy import farm_ids, use_farm
+
+    with app.app_context():
+        for farm_id in farm_ids():
+            started = time.perf_counter()
+            with use_farm(farm_id):
+                try:
+                    refreshed = refresh_forecasts(full=args.full)
+                finally:
+                    db.session.remove()
+            counts = ', '.join(f'{name}: {count}' for name, count in refreshed.items())
+            print(f"✅ Farm {farm_id}: forecasts refreshed ({counts}) in {time.perf_counter() - started:.1f}s")
+
+if __name__ == '__main__':
+    main()
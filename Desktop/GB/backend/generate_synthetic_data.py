@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+Generate a large, statistically plausible synthetic herd for load and scale testing.
+
+Unlike populate_mock_data.py, rows are generated with numpy one batch of cows at a
+time and streamed into the database with chunked core INSERTs, so memory stays
+bounded regardless of herd size or history length.
+
+    python generate_synthetic_data.py --cattle 20000 --years 3.5 --sessions-per-day 2 --seed 7 --reset
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+from itertools import repeat
+
+import numpy as np
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import func, insert
+
+from app import app
+from database import db, create_schema
+from models.cattle import Cattle
+from models.milk_production import MilkProduction
+from models.feeding import Feeding
+from models.expenses import Expenses
+from models.revenue import Revenue
+from versioning import bump_table_versions
+from lifecycle import refresh_lifecycle
+from tenancy import farm_engine, use_farm
+from archive import drop_archive_partitions
+from populate_mock_data import LOCATIONS
+
+# Relative peak yield per breed (Holstein = 1.0) and herd mix
+BREED_MIX = {
+    'Holstein': (1.00, 0.55),
+    'Jersey': (0.72, 0.20),
+    'Simmental': (0.80, 0.10),
+    'Brahman': (0.45, 0.05),
+    'Angus': (0.40, 0.05),
+    'Hereford': (0.40, 0.05),
+}
+
+# Feed type -> (share of ration by mass, price per kg)
+FEED_RATION = {
+    'Corn Silage': (0.35, 0.08),
+    'Hay': (0.20, 0.18),
+    'Alfalfa': (0.15, 0.30),
+    'Barley': (0.10, 0.25),
+    'Wheat': (0.05, 0.27),
+    'Grass Pellets': (0.10, 0.22),
+    'Protein Supplement': (0.05, 0.60),
+}
+
+FEED_SUPPLIERS = ['FeedCorp', 'AgriSupply', 'FarmFresh', 'LocalFarm']
+SESSION_NOTES = {
+    1: ['Daily milking'],
+    2: ['Morning milking', 'Evening milking'],
+    3: ['Morning milking', 'Midday milking', 'Evening milking'],
+}
+MILK_PRICE_PER_LITER = 0.42
+
+# Wood's lactation curve y = a * t^b * exp(-c t), peak around day b / c
+WOOD_A, WOOD_B, WOOD_C = 15.0, 0.20, 0.0040
+DRY_PERIOD_DAYS = 60
+
+def session_shares(sessions):
+    """Fraction of the daily yield collected at each milking session"""
+    weights = np.linspace(1.2, 0.9, sessions) if sessions > 1 else np.ones(1)
+    return weights / weights.sum()
+
+def session_notes(sessions):
+    return SESSION_NOTES.get(sessions, [f'Session {i + 1}' for i in range(sessions)])
+
+def insert_chunk(connection, table, columns):
+    """Insert a dict of equal-length column sequences in one executemany and commit"""
+    names = list(columns)
+    with connection.begin():
+        if connection.dialect.name == 'sqlite':
+            # SQLite stores dates as ISO text, so skip per-row type processing
+            sql = f"INSERT INTO {table.name} ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})"
+            connection.exec_driver_sql(sql, list(zip(*(columns[name] for name in names))))
+        else:
+            rows = [dict(zip(names, values)) for values in zip(*(columns[name] for name in names))]
+            connection.execute(insert(table), rows)
+
+def date_column(connection, days, epoch):
+    """Convert day offsets from epoch into values the dialect accepts"""
+    values = np.datetime64(epoch, 'D') + days.astype('timedelta64[D]')
+    if connection.dialect.name == 'sqlite':
+        return np.datetime_as_string(values, unit='D').tolist()
+    return values.astype(object).tolist()
+
+def timestamp_column(connection, now, length):
+    if connection.dialect.name == 'sqlite':
+        return repeat(now.strftime('%Y-%m-%d %H:%M:%S.%f'), length)
+    return repeat(now, length)
+
+class SyntheticHerd:
+    """Per-animal parameters drawn once, used to generate history batch by batch"""
+
+    def __init__(self, rng, count, first_id, start, end):
+        breeds = list(BREED_MIX)
+        breed_scale = np.array([BREED_MIX[b][0] for b in breeds])
+        breed_share = np.array([BREED_MIX[b][1] for b in breeds])
+        history_days = (end - start).days
+
+        self.count = count
+        self.ids = np.arange(first_id, first_id + count)
+        self.breed_index = rng.choice(len(breeds), size=count, p=breed_share / breed_share.sum())
+        self.breeds = np.array(breeds)[self.breed_index]
+        self.female = rng.random(count) < 0.95
+
+        # Ages at the end of the history: 1 to 10 years
+        age_end_days = rng.integers(365, 3650, size=count)
+        self.birth_day = history_days - age_end_days  # relative to start
+        self.first_calving_day = self.birth_day + rng.normal(760, 45, size=count).astype(int)
+        self.calving_interval = np.clip(rng.normal(395, 25, size=count), 340, 480).astype(int)
+        self.yield_scale = breed_scale[self.breed_index] * rng.lognormal(0, 0.12, size=count)
+
+        mature_weight = np.where(self.female, rng.normal(620, 60, size=count), rng.normal(900, 80, size=count))
+        self.weight = np.clip(mature_weight * np.minimum(1.0, 0.35 + age_end_days / 1100), 150, 1200)
+
+        self.status = np.where(rng.random(count) < 0.92, 'Active',
+                               rng.choice(['Sold', 'Deceased', 'Quarantined'], size=count))
+        self.health = np.where(rng.random(count) < 0.9, 'Healthy',
+                               rng.choice(['Sick', 'Injured', 'Pregnant', 'Recovering'], size=count))
+        self.location = rng.choice(LOCATIONS, size=count)
+        self.history_days = history_days
+
+    def cattle_columns(self, connection, epoch, now, rows):
+        ids = self.ids[rows].tolist()
+        female = self.female[rows]
+        return {
+            'id': ids,
+            'tag_number': [f'GB{i:06d}' for i in ids],
+            'name': [f'Cow {i}' if f else f'Bull {i}' for i, f in zip(ids, female.tolist())],
+            'breed': self.breeds[rows].tolist(),
+            'date_of_birth': date_column(connection, self.birth_day[rows], epoch),
+            'gender': np.where(female, 'Female', 'Male').tolist(),
+            'weight': np.round(self.weight[rows], 1).tolist(),
+            'health_status': self.health[rows].tolist(),
+            'location': self.location[rows].tolist(),
+            'current_status': self.status[rows].tolist(),
+            'created_at': timestamp_column(connection, now, len(ids)),
+            'updated_at': timestamp_column(connection, now, len(ids)),
+        }
+
+    def daily_yield(self, rng, rows, days):
+        """Expected daily litres on the (rows x days) grid, 0 when not milking"""
+        since_calving = days[None, :] - self.first_calving_day[rows, None]
+        interval = self.calving_interval[rows, None]
+        dim = np.mod(since_calving, interval) + 1
+        parity = since_calving // interval + 1
+
+        litres = WOOD_A * np.power(dim, WOOD_B) * np.exp(-WOOD_C * dim)
+        litres *= self.yield_scale[rows, None] * np.where(parity == 1, 0.80, np.where(parity == 2, 0.95, 1.0))
+        litres *= rng.lognormal(0, 0.08, size=litres.shape)
+
+        milking = (since_calving >= 0) & (dim <= interval - DRY_PERIOD_DAYS) & self.female[rows, None]
+        return np.where(milking, litres, 0.0)
+
+def generate_cattle(connection, herd, epoch, now, chunk_size):
+    for start in range(0, herd.count, chunk_size):
+        rows = slice(start, start + chunk_size)
+        insert_chunk(connection, Cattle.__table__, herd.cattle_columns(connection, epoch, now, rows))
+
+def cow_batches(herd, row_budget, days_per_cow):
+    batch = max(1, row_budget // max(1, days_per_cow))
+    for start in range(0, herd.count, batch):
+        yield np.arange(start, min(herd.count, start + batch))
+
+def generate_milk(connection, rng, herd, epoch, now, sessions, chunk_size, monthly_litres, report):
+    days = np.arange(herd.history_days)
+    shares = session_shares(sessions)
+    month_index = (np.datetime64(epoch, 'D') + days.astype('timedelta64[D]')).astype('datetime64[M]').astype(int)
+    month_index -= month_index[0]
+    total = 0
+    report('milk_production', total)
+
+    for rows in cow_batches(herd, chunk_size // sessions, herd.history_days):
+        daily = herd.daily_yield(rng, rows, days)
+        cow_idx, day_idx = np.nonzero(daily)
+        if not len(cow_idx):
+            continue
+        litres = daily[cow_idx, day_idx]
+        monthly_litres += np.bincount(month_index[day_idx], weights=litres, minlength=len(monthly_litres))
+
+        n = len(cow_idx) * sessions
+        session = np.tile(np.arange(sessions), len(cow_idx))
+        per_session = np.repeat(litres, sessions) * shares[session] * rng.normal(1.0, 0.04, size=n)
+        quality = np.clip(rng.normal(8.8, 0.5, size=n), 5.0, 10.0)
+        notes = session_notes(sessions)
+
+        insert_chunk(connection, MilkProduction.__table__, {
+            'cattle_id': np.repeat(herd.ids[rows][cow_idx], sessions).tolist(),
+            'date_recorded': date_column(connection, np.repeat(day_idx, sessions), epoch),
+            'quantity_liters': np.round(np.maximum(per_session, 0.1), 2).tolist(),
+            'quality_score': np.round(quality, 1).tolist(),
+            'milking_session': (session + 1).tolist(),
+            'notes': [notes[i] for i in session.tolist()],
+            'created_at': timestamp_column(connection, now, n),
+            'updated_at': timestamp_column(connection, now, n),
+        })
+        total += n
+        report('milk_production', total)
+
+    return total
+
+def generate_feeding(connection, rng, herd, epoch, now, feedings, chunk_size, report):
+    feed_types = np.array(list(FEED_RATION))
+    share = np.array([FEED_RATION[f][0] for f in feed_types])
+    price = np.array([FEED_RATION[f][1] for f in feed_types])
+    days = np.arange(herd.history_days)
+    total = 0
+    report('feeding', total)
+
+    for rows in cow_batches(herd, chunk_size // feedings, herd.history_days):
+        # Only feed animals that are alive on the day
+        alive = days[None, :] >= herd.birth_day[rows, None] + 90
+        cow_idx, day_idx = np.nonzero(alive)
+        if not len(cow_idx):
+            continue
+
+        n = len(cow_idx) * feedings
+        cow_idx = np.repeat(cow_idx, feedings)
+        day_idx = np.repeat(day_idx, feedings)
+        feed = rng.choice(len(feed_types), size=n, p=share)
+
+        # Dry-matter intake of about 3% of body weight per day, split across feedings;
+        # feed types are drawn by ration share so totals per type follow the ration
+        intake = herd.weight[rows][cow_idx] * 0.03 / feedings * rng.lognormal(0, 0.10, size=n)
+        quantity = np.round(intake, 2)
+        unit_cost = np.round(price[feed] * rng.normal(1.0, 0.05, size=n), 3)
+
+        insert_chunk(connection, Feeding.__table__, {
+            'cattle_id': herd.ids[rows][cow_idx].tolist(),
+            'date_recorded': date_column(connection, day_idx, epoch),
+            'feed_type': feed_types[feed].tolist(),
+            'quantity_kg': quantity.tolist(),
+            'cost_per_unit': unit_cost.tolist(),
+            'total_cost': np.round(quantity * unit_cost, 2).tolist(),
+            'supplier': rng.choice(FEED_SUPPLIERS, size=n).tolist(),
+            'created_at': timestamp_column(connection, now, n),
+            'updated_at': timestamp_column(connection, now, n),
+        })
+        total += n
+        report('feeding', total)
+
+    return total
+
+def generate_finances(connection, rng, herd, epoch, now, monthly_litres):
+    """Monthly milk sales from generated yields plus herd-scaled expenses"""
+    months = len(monthly_litres)
+    month_start = (np.datetime64(epoch, 'M') + np.arange(months + 1)).astype('datetime64[D]')
+    offsets = (month_start - np.datetime64(epoch, 'D')).astype(int)
+    last_day = herd.history_days - 1
+    # Sales are booked on the last day of each month, expenses anywhere within it
+    month_end = np.clip(offsets[1:] - 1, 0, last_day)
+    offsets = np.clip(offsets[:-1], 0, last_day)
+
+    revenue = {
+        'date_recorded': date_column(connection, month_end, epoch),
+        'source': ['Milk Sales'] * months,
+        'description': [f'Milk sales - {int(l)} liters' for l in monthly_litres.tolist()],
+        'amount': np.round(monthly_litres * MILK_PRICE_PER_LITER, 2).tolist(),
+        'created_at': timestamp_column(connection, now, months),
+        'updated_at': timestamp_column(connection, now, months),
+    }
+    insert_chunk(connection, Revenue.__table__, revenue)
+
+    categories = {
+        'Veterinary': 6.0, 'Labor': 25.0, 'Utilities': 4.0,
+        'Maintenance': 3.0, 'Insurance': 2.5, 'Equipment': 3.5,
+    }
+    names = list(categories)
+    n = months * len(names)
+    category = np.tile(np.arange(len(names)), months)
+    amount = np.array([categories[c] for c in names])[category] * herd.count * rng.lognormal(0, 0.15, size=n)
+    insert_chunk(connection, Expenses.__table__, {
+        'date_recorded': date_column(connection, np.minimum(np.repeat(offsets, len(names)) + rng.integers(0, 28, size=n), np.repeat(month_end, len(names))), epoch),
+        'category': [names[i] for i in category.tolist()],
+        'description': [f'{names[i]} - monthly' for i in category.tolist()],
+        'amount': np.round(amount, 2).tolist(),
+        'supplier': rng.choice(['AgriSupply', 'VetClinic', 'LocalSupplier', 'UtilityCorp'], size=n).tolist(),
+        'created_at': timestamp_column(connection, now, n),
+        'updated_at': timestamp_column(connection, now, n),
+    })
+    return months, n
+
+def generate(args):
+    rng = np.random.default_rng(args.seed)
+    end = date.today()
+    epoch = end - timedelta(days=int(args.years * 365))
+    now = datetime.utcnow()
+    started = time.perf_counter()
+    phase_started = {}
+
+    def report(table, count):
+        elapsed = time.perf_counter() - phase_started.setdefault(table, time.perf_counter())
+        print(f'\r  {table}: {count:,} rows ({count / max(elapsed, 1e-9):,.0f} rows/s)', end='', flush=True)
+
+    with app.app_context(), use_farm(args.farm):
+        engine = farm_engine()
+        if args.reset:
+            print('Clearing existing data...')
+            drop_archive_partitions()
+            db.session.remove()
+            db.metadata.drop_all(engine)
+            create_schema(engine)
+
+        first_id = (db.session.query(func.max(Cattle.id)).scalar() or 0) + 1
+        db.session.remove()
+        herd = SyntheticHerd(rng, args.cattle, first_id, epoch, end)
+
+        with engine.connect() as connection:
+            if connection.dialect.name == 'sqlite':
+                # Durability is irrelevant while bulk loading generated data
+                connection.exec_driver_sql('PRAGMA synchronous=OFF')
+                connection.commit()
+
+            print(f'Creating {herd.count:,} cattle...')
+            generate_cattle(connection, herd, epoch, now, args.chunk_size)
+            with connection.begin():
+                refresh_lifecycle(connection)
+
+            print(f'Creating milk production records ({args.sessions_per_day} sessions/day)...')
+            monthly_litres = np.zeros((end.year - epoch.year) * 12 + end.month - epoch.month + 1)
+            milk_rows = 0
+            if args.sessions_per_day > 0:
+                milk_rows = generate_milk(connection, rng, herd, epoch, now, args.sessions_per_day,
+                                          args.chunk_size, monthly_litres, report)
+            print()
+
+            print('Creating feeding records...')
+            feeding_rows = 0
+            if args.feedings_per_day > 0:
+                feeding_rows = generate_feeding(connection, rng, herd, epoch, now, args.feedings_per_day,
+                                                args.chunk_size, report)
+            print()
+
+            print('Creating revenue and expenses...')
+            revenue_rows, expense_rows = generate_finances(connection, rng, herd, epoch, now, monthly_litres)
+            with connection.begin():
+                bump_table_versions(connection, ['cattle', 'milk_production', 'feeding', 'expenses', 'revenue'])
+
+        elapsed = time.perf_counter() - started
+        print(f'\n✅ Synthetic data generated in {elapsed:.1f}s')
+        print(f'  - {herd.count:,} cattle records')
+        print(f'  - {milk_rows:,} milk production records')
+        print(f'  - {feeding_rows:,} feeding records')
+        print(f'  - {expense_rows:,} expense records')
+        print(f'  - {revenue_rows:,} revenue records')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cattle', type=int, default=1000, help='herd size')
+    parser.add_argument('--years', type=float, default=2.0, help='years of history')
+    parser.add_argument('--sessions-per-day', type=int, default=2, help='milking sessions per day')
+    parser.add_argument('--feedings-per-day', type=int, default=1, help='feeding records per animal per day')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--farm', default=app.config['DEFAULT_FARM_ID'], help='farm database to fill')
+    parser.add_argument('--chunk-size', type=int, default=100_000, help='rows per INSERT batch')
+    parser.add_argument('--reset', action='store_true', help='drop and recreate all tables first')
+    args = parser.parse_args()
+
+    if args.cattle < 1 or args.years <= 0 or args.chunk_size < 1:
+        parser.error('--cattle, --years and --chunk-size must be positive')
+    if args.sessions_per_day < 0 or args.feedings_per_day < 0:
+        parser.error('--sessions-per-day and --feedings-per-day cannot be negative')
+
+    generate(args)
+
+if __name__ == '__main__':
+    main()
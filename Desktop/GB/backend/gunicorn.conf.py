@@ -0,0 +1,104 @@
+"""
+Production gunicorn settings; gunicorn reads this file from the working directory.
+
+    gunicorn                                 # API pool: threaded workers
+    GUNICORN_PROFILE=render gunicorn         # chart pool: single-threaded processes
+
+The app is imported once in the master (``preload_app``) and its objects are
+moved out of the garbage collector's reach with ``gc.freeze()`` before the
+workers are forked, so the workers keep sharing those pages copy-on-write
+instead of each touching (and copying) them on a full collection.
+
+Two profiles, meant to run side by side behind the reverse proxy:
+
+    api     gthread workers for the regular endpoints, which mostly wait on the
+            database; a slow request ties up a thread, not a process
+    render  sync workers for the matplotlib chart endpoints: pyplot is not
+            thread-safe and rendering holds the GIL, so one chart per process
+
+Workers are recycled after ``GUNICORN_MAX_REQUESTS`` requests and as soon as
+their private memory passes ``GUNICORN_MAX_WORKER_MEMORY_MB``, which bounds the
+growth from matplotlib figures and font caches.
+"""
+
+import gc
+import multiprocessing
+import os
+
+PROFILES = {
+    'api': {
+        'worker_class': 'gthread',
+        'workers': multiprocessing.cpu_count() + 1,
+        'threads': 8,
+        'timeout': 30,
+        'max_requests': 5000,
+    },
+    'render': {
+        'worker_class': 'sync',
+        'workers': multiprocessing.cpu_count(),
+        'threads': 1,
+        'timeout': 120,
+        'max_requests': 200,
+    },
+}
+
+profile = os.environ.get('GUNICORN_PROFILE', 'api')
+if profile not in PROFILES:
+    raise ValueError(f"Unknown GUNICORN_PROFILE: {profile} (expected one of {', '.join(PROFILES)})")
+settings = PROFILES[profile]
+
+wsgi_app = 'app:app'
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8080' if profile == 'api' else '0.0.0.0:8081')
+preload_app = True
+worker_class = settings['worker_class']
+workers = int(os.environ.get('WEB_CONCURRENCY', settings['workers']))
+threads = int(os.environ.get('GUNICORN_THREADS', settings['threads']))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', settings['timeout']))
+graceful_timeout = 30
+keepalive = 5
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', settings['max_requests']))
+max_requests_jitter = max_requests // 10  # workers started together do not all restart together
+proc_name = f'gb-{profile}'
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG')  # e.g. '-' for stdout
+errorlog = '-'
+
+MAX_WORKER_MEMORY_MB = float(os.environ.get('GUNICORN_MAX_WORKER_MEMORY_MB', 256))
+MEMORY_CHECK_EVERY = 25  # requests; reading smaps walks the worker's pages
+
+def private_memory_mb():
+    """Memory only this process holds, not pages still shared with the master (Linux); else peak RSS"""
+    try:
+        with open('/proc/self/smaps_rollup') as smaps:
+            return sum(
+                int(line.split()[1]) for line in smaps if line.startswith(('Private_Clean:', 'Private_Dirty:'))
+            ) / 1024
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def when_ready(server):
+    # Runs in the master after the app is preloaded and before any worker is forked
+    gc.collect()
+    gc.freeze()
+    server.log.info(f'Profile {profile}: {workers} {worker_class} workers, '
+                    f'{gc.get_freeze_count()} objects frozen for copy-on-write sharing')
+
+def post_fork(server, worker):
+    # Connections opened while preloading (creating tables) belong to the master
+    from app import app
+    from database import db
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+def post_request(worker, req, environ, resp):
+    if profile == 'render':
+        # A chart view that failed before plt.close() leaves its figure in pyplot's registry
+        import matplotlib.pyplot as plt
+        plt.close('all')
+    if worker.nr % MEMORY_CHECK_EVERY:
+        return
+    memory = private_memory_mb()
+    if memory > MAX_WORKER_MEMORY_MB:
+        worker.log.info(f'Worker {worker.pid} holds {memory:.0f} MB, recycling it')
+        worker.alive = False  # exits after this request; the master forks a fresh one
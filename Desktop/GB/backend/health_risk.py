@@ -0,0 +1,274 @@
+"""
+Herd health-risk scoring.
+
+Every animal still on the farm is scored in one vectorized pass from its recent
+milk and feed intake trends, age and body weight relative to its breed, plus the
+hand-set health status. Scores are cached per process and farm for the day.
+
+After a write, the change events since the cache was built (the same outbox every
+worker reads) name the animals whose milk or feed records were added, and only their
+window averages are re-queried and only they are re-scored. Changes to cattle reload
+the cheap herd table, since body-weight peers span the herd. Anything that cannot be
+pinned to animals (edits and deletes of records, bulk writes without ids, writes that
+bumped a table version without an event) recomputes the whole herd.
+"""
+
+import json
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, func, case, distinct
+
+from models.cattle import Cattle
+from models.milk_production import MilkProduction
+from models.feeding import Feeding
+from database import current_farm_bind
+from versioning import get_table_versions
+from events import event_table, latest_event_id, oldest_event_id
+
+RECENT_DAYS = 7
+BASELINE_DAYS = 21
+SOURCE_TABLES = ('cattle', 'milk_production', 'feeding')
+
+# Maximum points each factor contributes to the 0-100 score
+RISK_WEIGHTS = {
+    'milk_drop': 35,
+    'feed_drop': 25,
+    'age': 15,
+    'low_weight': 15,
+    'health_status': 10,
+}
+
+# A drop of this fraction (vs. the baseline window) counts as full risk
+FULL_RISK_DROP = 0.30
+FULL_RISK_UNDERWEIGHT = 0.20
+
+HEALTH_STATUS_RISK = {
+    'Healthy': 0.0,
+    'Pregnant': 0.3,
+    'Recovering': 0.5,
+    'Injured': 0.8,
+    'Sick': 1.0,
+}
+
+# Re-scoring more animals than this share of the herd is left to a full recompute
+INCREMENTAL_MAX_SHARE = 0.25
+WINDOW_COLUMNS = ['milk_recent', 'milk_baseline', 'feed_recent', 'feed_baseline']
+ID_CHUNK = 5000
+
+class _CachedScores:
+    def __init__(self, today, versions, event_id, herd, windows, records):
+        self.today = today
+        self.versions = versions
+        self.event_id = event_id
+        self.herd = herd  # cattle table with age and peer weight, no window data
+        self.windows = windows  # window averages per animal
+        self.records = records  # cattle_id -> score record
+        self.scores = _sorted(records)
+
+_cache = {}  # farm bind key -> _CachedScores
+_cache_lock = threading.Lock()
+
+def _window_averages(session, model, quantity_column, recent_start, baseline_start, cattle_ids=None):
+    """Average daily quantity per animal in the recent and baseline windows"""
+    recent = model.date_recorded >= recent_start
+    query = session.query(
+        model.cattle_id,
+        func.sum(case((recent, quantity_column), else_=0)).label('recent_total'),
+        func.sum(case((recent, 0), else_=quantity_column)).label('baseline_total'),
+        func.count(distinct(case((recent, model.date_recorded)))).label('recent_days'),
+        func.count(distinct(case((~recent, model.date_recorded)))).label('baseline_days'),
+    ).filter(model.date_recorded >= baseline_start).group_by(model.cattle_id)
+    if cattle_ids is None:
+        rows = query.all()
+    else:
+        rows = []
+        for start in range(0, len(cattle_ids), ID_CHUNK):
+            rows += query.filter(model.cattle_id.in_(cattle_ids[start:start + ID_CHUNK])).all()
+
+    frame = pd.DataFrame(rows, columns=['cattle_id', 'recent_total', 'baseline_total', 'recent_days', 'baseline_days'])
+    frame = frame.set_index('cattle_id').astype(float)
+    recent_avg = frame['recent_total'] / frame['recent_days'].replace(0, np.nan)
+    baseline_avg = frame['baseline_total'] / frame['baseline_days'].replace(0, np.nan)
+    return recent_avg, baseline_avg
+
+def _windows(session, today, cattle_ids=None):
+    """Milk and feed window averages of the herd, or of the given animals"""
+    recent_start = today - timedelta(days=RECENT_DAYS - 1)
+    baseline_start = recent_start - timedelta(days=BASELINE_DAYS)
+    milk_recent, milk_baseline = _window_averages(
+        session, MilkProduction, MilkProduction.quantity_liters, recent_start, baseline_start, cattle_ids)
+    feed_recent, feed_baseline = _window_averages(
+        session, Feeding, Feeding.quantity_kg, recent_start, baseline_start, cattle_ids)
+    windows = pd.DataFrame({
+        'milk_recent': milk_recent, 'milk_baseline': milk_baseline,
+        'feed_recent': feed_recent, 'feed_baseline': feed_baseline,
+    }, columns=WINDOW_COLUMNS)
+    # Queried animals without records must replace their cached averages too
+    return windows if cattle_ids is None else windows.reindex(cattle_ids)
+
+def _drop_fraction(recent_avg, baseline_avg, index):
+    drop = (baseline_avg - recent_avg) / baseline_avg.replace(0, np.nan)
+    return drop.reindex(index)
+
+def _herd(session, today):
+    """Animals still on the farm, with the factors that need the whole herd (age, peer weight)"""
+    cattle_rows = session.query(
+        Cattle.id, Cattle.tag_number, Cattle.name, Cattle.breed, Cattle.gender,
+        Cattle.date_of_birth, Cattle.weight, Cattle.health_status, Cattle.location
+    ).filter(Cattle.current_status.notin_(['Sold', 'Deceased'])).all()
+
+    herd = pd.DataFrame(cattle_rows, columns=[
+        'cattle_id', 'tag_number', 'name', 'breed', 'gender',
+        'date_of_birth', 'weight', 'health_status', 'location'
+    ]).set_index('cattle_id')
+    if herd.empty:
+        return herd
+
+    # Same month arithmetic as Cattle.calculate_age_in_months, for the whole herd at once
+    dob = pd.to_datetime(herd['date_of_birth'])
+    herd['age_months'] = (today.year - dob.dt.year) * 12 + (today.month - dob.dt.month)
+
+    weight = herd['weight'].astype(float)
+    peer_median = weight.groupby([herd['breed'], herd['gender']]).transform('median')
+    herd['underweight_pct'] = (peer_median - weight) / peer_median * 100
+    return herd
+
+def _score(herd, windows):
+    """Risk score and factor points of the given animals; herd from _herd"""
+    herd = herd.copy()
+    herd['milk_drop_pct'] = _drop_fraction(windows['milk_recent'], windows['milk_baseline'], herd.index) * 100
+    herd['feed_drop_pct'] = _drop_fraction(windows['feed_recent'], windows['feed_baseline'], herd.index) * 100
+
+    age = herd['age_months'].astype(float)
+    factors = pd.DataFrame({
+        'milk_drop': (herd['milk_drop_pct'] / 100 / FULL_RISK_DROP).clip(0, 1),
+        'feed_drop': (herd['feed_drop_pct'] / 100 / FULL_RISK_DROP).clip(0, 1),
+        # Calves under 6 months and cows past 8 years carry more risk
+        'age': np.maximum(((6 - age) / 6).clip(0, 1), ((age - 96) / 60).clip(0, 1)),
+        'low_weight': (herd['underweight_pct'] / 100 / FULL_RISK_UNDERWEIGHT).clip(0, 1),
+        'health_status': herd['health_status'].map(HEALTH_STATUS_RISK).fillna(0.5),
+    }, index=herd.index).fillna(0.0)
+
+    herd['risk_score'] = (factors * pd.Series(RISK_WEIGHTS)).sum(axis=1).round(1)
+    for name in RISK_WEIGHTS:
+        herd[f'{name}_points'] = (factors[name] * RISK_WEIGHTS[name]).round(1)
+
+    return herd
+
+def compute_risk_scores(session, today=None):
+    """Score the herd; returns a DataFrame sorted by risk_score descending"""
+    today = today or datetime.now().date()
+    herd = _herd(session, today)
+    if herd.empty:
+        return herd
+    return _score(herd, _windows(session, today)).sort_values(['risk_score', 'tag_number'], ascending=[False, True])
+
+def _number(value, digits=1):
+    return None if pd.isna(value) else round(float(value), digits)
+
+def _to_records(herd):
+    points = {name: herd[f'{name}_points'].tolist() for name in RISK_WEIGHTS}
+    records = []
+    for i, row in enumerate(herd.reset_index().itertuples(index=False)):
+        records.append({
+            'cattle_id': int(row.cattle_id),
+            'tag_number': row.tag_number,
+            'name': row.name,
+            'breed': row.breed,
+            'location': row.location,
+            'health_status': row.health_status,
+            'age_months': None if pd.isna(row.age_months) else int(row.age_months),
+            'risk_score': float(row.risk_score),
+            'factors': {
+                'milk_drop_pct': _number(row.milk_drop_pct),
+                'feed_drop_pct': _number(row.feed_drop_pct),
+                'underweight_pct': _number(row.underweight_pct),
+                'points': {name: points[name][i] for name in RISK_WEIGHTS},
+            }
+        })
+    return records
+
+def _sorted(records):
+    return sorted(records.values(), key=lambda record: (-record['risk_score'], record['tag_number']))
+
+def _changed_cattle(connection, cached, versions, event_id):
+    """
+    (cattle table changed, ids of animals whose milk or feed changed) since the
+    cache was built, from the outbox; None when the whole herd must be recomputed
+    """
+    oldest = oldest_event_id(connection)
+    if oldest is not None and oldest > cached.event_id + 1:
+        return None  # pruned
+    rows = connection.execute(
+        select(event_table.c.table_name, event_table.c.action, event_table.c.data)
+        .where(event_table.c.id > cached.event_id, event_table.c.id <= event_id,
+               event_table.c.table_name.in_(SOURCE_TABLES))
+    ).all()
+
+    cattle_changed, dirty, announced = False, set(), set()
+    for table_name, action, data in rows:
+        announced.add(table_name)
+        data = json.loads(data) if data else {}
+        if table_name == 'cattle':
+            if action == 'bulk_create':
+                return None
+            cattle_changed = True
+        elif action == 'create':
+            dirty.add(data['cattle_id'])
+        elif action == 'bulk_create' and 'cattle_ids' in data:
+            dirty.update(data['cattle_ids'])
+        else:
+            # Edits may move a record between animals; deletes and bulk writes name none
+            return None
+
+    # A version bump without an event was written around the outbox
+    if any(versions[name] != cached.versions[name] and name not in announced for name in SOURCE_TABLES):
+        return None
+    return cattle_changed, dirty
+
+def get_risk_scores(session):
+    """Cached herd risk list, re-scoring only the animals written since"""
+    today = datetime.now().date()
+    connection = session.connection()
+    versions = get_table_versions(session, SOURCE_TABLES)
+    event_id = latest_event_id(connection)
+    farm = current_farm_bind.get()
+
+    with _cache_lock:
+        cached = _cache.get(farm)
+    if cached is not None and cached.today == today and cached.versions == versions and cached.event_id == event_id:
+        return cached.scores
+
+    changes = None
+    if cached is not None and cached.today == today:
+        changes = _changed_cattle(connection, cached, versions, event_id)
+    if changes is not None and len(changes[1]) > INCREMENTAL_MAX_SHARE * max(len(cached.herd), 1):
+        changes = None
+
+    if changes is None:
+        herd = _herd(session, today)
+        windows = _windows(session, today) if not herd.empty else pd.DataFrame(columns=WINDOW_COLUMNS)
+        records = {record['cattle_id']: record for record in _to_records(_score(herd, windows))} if not herd.empty else {}
+    else:
+        cattle_changed, dirty = changes
+        herd, windows, records = cached.herd, cached.windows, cached.records
+        if dirty:
+            dirty = sorted(dirty)
+            windows = pd.concat([windows.drop(dirty, errors='ignore'), _windows(session, today, dirty)])
+        if cattle_changed:
+            # Peer weights and the herd itself may have changed: re-score everyone from cached windows
+            herd = _herd(session, today)
+            records = {record['cattle_id']: record for record in _to_records(_score(herd, windows))} if not herd.empty else {}
+        elif dirty:
+            records = dict(records)
+            rescored = herd.loc[herd.index.intersection(dirty)]
+            if not rescored.empty:
+                records.update((record['cattle_id'], record) for record in _to_records(_score(rescored, windows)))
+
+    cached = _CachedScores(today, versions, event_id, herd, windows, records)
+    with _cache_lock:
+        _cache[farm] = cached
+    return cached.scores
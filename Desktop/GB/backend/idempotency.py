@@ -0,0 +1,125 @@
+"""
+Retry-safe create endpoints.
+
+Clients that retry writes (such as the mobile app's offline sync) send an
+``Idempotency-Key`` header that is unique per operation. The key is stored with
+the id of the record the request created, in the same transaction as the record,
+so either both are committed or neither is. A retry with the same key gets the
+original record back with ``Idempotent-Replay: true`` instead of creating a
+duplicate, and reusing a key for a different request is rejected with 422.
+Keys expire after ``IDEMPOTENCY_TTL_HOURS``.
+"""
+
+import hashlib
+import itertools
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import request, jsonify, current_app
+from sqlalchemy import event, insert, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from database import db
+from models.idempotency_key import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAY_HEADER = 'Idempotent-Replay'
+MAX_KEY_LENGTH = 255
+PRUNE_EVERY = 500  # stored keys
+
+key_table = IdempotencyKey.__table__
+_stored = itertools.count(1)
+
+def _digest(*parts):
+    hasher = hashlib.sha256()
+    for part in parts:
+        hasher.update(part if isinstance(part, bytes) else part.encode('utf-8'))
+        hasher.update(b'\0')
+    return hasher.hexdigest()
+
+def _expired_before():
+    return datetime.utcnow() - timedelta(hours=current_app.config['IDEMPOTENCY_TTL_HOURS'])
+
+def _replay(claim):
+    """Response of the request that first used the key, or None when it is unused"""
+    stored = db.session.get(IdempotencyKey, claim['key_hash'])
+    if stored is None or stored.created_at < _expired_before():
+        return None
+    if stored.request_hash != claim['request_hash']:
+        return jsonify({'error': f'{IDEMPOTENCY_HEADER} was already used for a different request'}), 422
+
+    record = db.session.get(claim['model'], stored.record_id)
+    if record is None:
+        return jsonify({'error': 'This request was already processed but its record has since been deleted'}), 409
+    response = jsonify(record.to_dict())
+    response.headers[REPLAY_HEADER] = 'true'
+    return response, 201
+
+def idempotent(model):
+    """Make a view creating one ``model`` record safe to retry with an Idempotency-Key"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = request.headers.get(IDEMPOTENCY_HEADER)
+            if key is None:
+                return view(*args, **kwargs)
+            if not key or len(key) > MAX_KEY_LENGTH:
+                return jsonify({'error': f'{IDEMPOTENCY_HEADER} must be 1 to {MAX_KEY_LENGTH} characters'}), 400
+
+            claim = {
+                'key_hash': _digest(key),
+                'request_hash': _digest(request.method, request.path, request.get_data()),
+                'model': model,
+            }
+            replay = _replay(claim)
+            if replay is not None:
+                return replay
+
+            # Picked up by _store_key when the view flushes its new record
+            db.session.info['idempotency'] = claim
+            try:
+                response = view(*args, **kwargs)
+            finally:
+                db.session.info.pop('idempotency', None)
+
+            if claim.get('conflict'):
+                # A concurrent request with the same key committed first
+                db.session.rollback()
+                return _replay(claim) or response
+            return response
+        return wrapper
+    return decorator
+
+def register_idempotency_events():
+    if not event.contains(Session, 'after_flush', _store_key):
+        event.listen(Session, 'after_flush', _store_key)
+
+def _store_key(session, flush_context):
+    claim = session.info.get('idempotency')
+    if claim is None or 'record_id' in claim:
+        return
+    created = [obj for obj in session.new if isinstance(obj, claim['model'])]
+    if not created:
+        return
+
+    connection = session.connection()
+    expired_before = _expired_before()
+    connection.execute(
+        delete(key_table).where(key_table.c.key_hash == claim['key_hash'], key_table.c.created_at < expired_before)
+    )
+    try:
+        connection.execute(insert(key_table).values(
+            key_hash=claim['key_hash'],
+            request_hash=claim['request_hash'],
+            table_name=claim['model'].__tablename__,
+            record_id=created[0].id,
+            created_at=datetime.utcnow()
+        ))
+    except IntegrityError:
+        claim['conflict'] = True
+        raise
+    claim['record_id'] = created[0].id
+
+    if next(_stored) % PRUNE_EVERY == 0:
+        connection.execute(delete(key_table).where(key_table.c.created_at < expired_before))
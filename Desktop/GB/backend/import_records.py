@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+Bulk import of historical milk, feeding, expense and revenue records.
+
+Reads a CSV or XLSX file in chunks, resolves ``tag_number`` to ``cattle.id``
+from an in-memory map, validates whole chunks with pandas and loads the valid
+rows with chunked INSERTs. Invalid rows are written to a reject file with the
+line number and reason. Each loaded chunk is recorded in ``ingest_segments`` in
+its own transaction, so re-running an interrupted import skips what was
+already loaded. Secondary indexes of the table are dropped during the load and
+rebuilt once at the end, together with the forecasts.
+
+    python import_records.py milk milk_2014_2024.csv
+    python import_records.py feeding feed.xlsx --sheet Feeding --date-format %d/%m/%Y
+    python import_records.py expenses expenses.csv --farm north --rejects /tmp/rejected.csv
+
+Column names are matched case-insensitively (``Tag Number`` = ``tag_number``).
+Animals are identified by ``tag_number`` or ``cattle_id``.
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.schema import CreateIndex, DropIndex
+
+try:
+    import openpyxl
+except ImportError:  # only needed for .xlsx files
+    openpyxl = None
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import db
+from events import record_bulk_event
+from inventory import post_imported_feeding
+from models.cattle import Cattle
+from models.expenses import Expenses
+from models.feeding import Feeding
+from models.ingest_segment import IngestSegment
+from models.milk_production import MilkProduction
+from models.revenue import Revenue
+from tenancy import farm_engine, use_farm
+from versioning import bump_table_versions
+
+# Kind -> model, required columns, optional columns, numeric columns, what else a loaded chunk updates
+IMPORTS = {
+    'milk': {
+        'model': MilkProduction,
+        'required': ['date_recorded', 'quantity_liters'],
+        'optional': ['quality_score', 'milking_session', 'notes'],
+        'numeric': ['quantity_liters', 'quality_score', 'milking_session'],
+        'cattle': True,
+    },
+    'feeding': {
+        'model': Feeding,
+        'required': ['date_recorded', 'feed_type', 'quantity_kg'],
+        'optional': ['cost_per_unit', 'total_cost', 'supplier', 'notes'],
+        'numeric': ['quantity_kg', 'cost_per_unit', 'total_cost'],
+        'cattle': True,
+        'post': post_imported_feeding,  # feed stock and daily consumption
+    },
+    'expenses': {
+        'model': Expenses,
+        'required': ['date_recorded', 'category', 'description', 'amount'],
+        'optional': ['supplier', 'receipt_number', 'notes'],
+        'numeric': ['amount'],
+        'cattle': False,
+    },
+    'revenue': {
+        'model': Revenue,
+        'required': ['date_recorded', 'source', 'description', 'amount'],
+        'optional': ['notes'],
+        'numeric': ['amount'],
+        'cattle': False,
+    },
+}
+
+# Quantities that cannot be negative
+NON_NEGATIVE = ['quantity_liters', 'quantity_kg', 'cost_per_unit', 'total_cost']
+COLUMN_ALIASES = {'date': 'date_recorded', 'tag': 'tag_number'}
+
+class ImportFileError(ValueError):
+    """Raised when a file cannot be imported at all (as opposed to rejected rows)"""
+
+def normalize_column(name):
+    name = str(name).strip().lower().replace(' ', '_').replace('-', '_')
+    return COLUMN_ALIASES.get(name, name)
+
+def read_chunks(path, chunk_size, sheet=None):
+    """Yield DataFrames of strings, ``chunk_size`` rows at a time"""
+    if path.lower().endswith(('.xlsx', '.xlsm')):
+        yield from _read_xlsx_chunks(path, chunk_size, sheet)
+        return
+    for chunk in pd.read_csv(path, chunksize=chunk_size, dtype=str, keep_default_na=False,
+                             skipinitialspace=True):
+        yield chunk
+
+def _cell_text(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.date().isoformat() if value.time() == datetime.min.time() else value.isoformat()
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+def _read_xlsx_chunks(path, chunk_size, sheet):
+    if openpyxl is None:
+        raise ImportFileError('Reading .xlsx files needs the openpyxl package (pip install openpyxl)')
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = (workbook[sheet] if sheet else workbook.active).iter_rows(values_only=True)
+        header = [_cell_text(value) for value in next(rows, [])]
+        batch = []
+        for row in rows:
+            batch.append([_cell_text(value) for value in row[:len(header)]])
+            if len(batch) == chunk_size:
+                yield pd.DataFrame(batch, columns=header)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=header)
+    finally:
+        workbook.close()
+
+def check_columns(columns, spec):
+    missing = [column for column in spec['required'] if column not in columns]
+    if spec['cattle'] and 'tag_number' not in columns and 'cattle_id' not in columns:
+        missing.append('tag_number or cattle_id')
+    if missing:
+        raise ImportFileError(f"Missing column: {', '.join(missing)}")
+
+def validate_chunk(frame, spec, cattle_ids, date_format):
+    """
+    Returns (column dict of valid rows, DataFrame of rejected rows with an
+    ``error`` column). All checks run on whole columns.
+    """
+    errors = pd.Series('', index=frame.index)
+    text = {column: frame[column].str.strip() for column in frame.columns}
+
+    def reject(mask, reason):
+        errors[mask & (errors == '')] = reason
+
+    for column in spec['required']:
+        reject(text[column] == '', f'{column} is empty')
+
+    values = {}
+    if spec['cattle']:
+        if 'tag_number' in text:
+            ids = text['tag_number'].map(cattle_ids['tags'])
+            reject(ids.isna(), 'unknown tag_number')
+        else:
+            ids = pd.to_numeric(text['cattle_id'], errors='coerce')
+            reject(~ids.isin(cattle_ids['ids']), 'unknown cattle_id')
+        values['cattle_id'] = ids
+
+    dates = pd.to_datetime(text['date_recorded'], format=date_format, errors='coerce')
+    reject(dates.isna(), 'invalid date_recorded')
+    values['date_recorded'] = dates
+
+    for column in spec['numeric']:
+        if column not in text:
+            continue
+        numbers = pd.to_numeric(text[column], errors='coerce')
+        reject(numbers.isna() & (text[column] != ''), f'{column} is not a number')
+        if column in NON_NEGATIVE:
+            reject(numbers < 0, f'{column} cannot be negative')
+        values[column] = numbers
+
+    for column in spec['required'] + spec['optional']:
+        if column not in values and column in text:
+            values[column] = text[column].where(text[column] != '', None)
+
+    if 'milking_session' in values:
+        # One record per cow, day and session, within the file as in the database
+        session = values['milking_session']
+        keyed = session.notna() & (errors == '')
+        duplicate = pd.DataFrame({'c': values['cattle_id'], 'd': dates, 's': session})[keyed].duplicated()
+        reject(duplicate.reindex(frame.index, fill_value=False), 'duplicate milking session')
+
+    valid = errors == ''
+    rejected = frame[~valid].assign(error=errors[~valid])
+    return {column: series[valid] for column, series in values.items()}, rejected
+
+def to_db_columns(connection, columns, now):
+    """Plain Python lists the driver can insert, dates as the dialect expects"""
+    length = len(columns['date_recorded'])
+    rows = {}
+    for name, series in columns.items():
+        if name == 'date_recorded':
+            days = series.to_numpy().astype('datetime64[D]')
+            rows[name] = (np.datetime_as_string(days, unit='D').tolist() if connection.dialect.name == 'sqlite'
+                          else days.astype(object).tolist())
+        elif series.dtype.kind == 'f':
+            integer = name in ('cattle_id', 'milking_session')
+            if series.notna().all():
+                rows[name] = (series.astype(int) if integer else series).tolist()
+            else:
+                numbers = series.astype('Int64') if integer else series
+                rows[name] = numbers.astype(object).where(series.notna(), None).tolist()
+        else:
+            rows[name] = series.tolist()
+    stamp = now.strftime('%Y-%m-%d %H:%M:%S.%f') if connection.dialect.name == 'sqlite' else now
+    rows['created_at'] = [stamp] * length
+    rows['updated_at'] = [stamp] * length
+    return rows
+
+def load_chunk(connection, table, columns, segment, post=None):
+    """Insert one chunk, mark it loaded and ``post(connection, columns)`` it, in one transaction; False if loaded before"""
+    names = list(columns)
+    count = len(columns[names[0]])
+    with connection.begin():
+        done = connection.execute(select(IngestSegment.segment).where(IngestSegment.segment == segment)).first()
+        if done:
+            return False
+        if not count:
+            pass
+        elif connection.dialect.name == 'sqlite':
+            # SQLite stores dates as ISO text, so skip per-row type processing
+            sql = f"INSERT INTO {table.name} ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})"
+            connection.exec_driver_sql(sql, list(zip(*(columns[name] for name in names))))
+        else:
+            connection.execute(insert(table), [dict(zip(names, row)) for row in zip(*(columns[name] for name in names))])
+        if count and post is not None:
+            post(connection, columns)
+        connection.execute(insert(IngestSegment.__table__).values(
+            segment=segment, table_name=table.name, row_count=count, flushed_at=datetime.utcnow()
+        ))
+    return True
+
+def recorded_sessions(connection, columns):
+    """Mask of rows whose cow, day and milking session are already in the database"""
+    session = columns['milking_session']
+    keyed = session.notna()
+    if not keyed.any():
+        return pd.Series(False, index=session.index)
+    dates = columns['date_recorded'][keyed]
+    table = MilkProduction.__table__
+    with connection.begin():
+        existing = connection.execute(
+            select(table.c.cattle_id, table.c.date_recorded, table.c.milking_session).where(
+                table.c.cattle_id.in_(columns['cattle_id'][keyed].astype(int).unique().tolist()),
+                table.c.date_recorded.between(dates.min().date(), dates.max().date()),
+                table.c.milking_session.isnot(None)
+            )
+        ).all()
+    recorded = pd.MultiIndex.from_tuples(
+        [(cattle_id, pd.Timestamp(day), session) for cattle_id, day, session in existing]
+    ) if existing else pd.MultiIndex.from_tuples([], names=[None] * 3)
+    rows = pd.MultiIndex.from_arrays([columns['cattle_id'].astype('Int64'), columns['date_recorded'], session.astype('Int64')])
+    return pd.Series(rows.isin(recorded), index=session.index) & keyed
+
+def file_fingerprint(path, kind):
+    """Identifies one version of an input file, to name its chunks"""
+    stat = os.stat(path)
+    digest = hashlib.sha256(f'{kind}:{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}'.encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+def cattle_map(connection):
+    rows = connection.execute(select(Cattle.id, Cattle.tag_number)).all()
+    return {'tags': {tag: cattle_id for cattle_id, tag in rows}, 'ids': {cattle_id for cattle_id, _ in rows}}
+
+def import_file(kind, path, chunk_size=100_000, sheet=None, date_format='ISO8601', rejects_path=None,
+                rebuild_indexes=True, report=None):
+    """Import one file into the current farm; returns a dict of counts and timings"""
+    spec = IMPORTS[kind]
+    table = spec['model'].__table__
+    fingerprint = file_fingerprint(path, kind)
+    now = datetime.utcnow()
+    counts = {'read': 0, 'loaded': 0, 'rejected': 0, 'skipped': 0}
+    started = time.perf_counter()
+    rejects_file = None
+
+    engine = farm_engine()
+    with engine.connect() as connection:
+        cattle_ids = cattle_map(connection) if spec['cattle'] else None
+        connection.commit()
+
+        # Unique indexes stay: they enforce the natural keys during the load
+        dropped = [index for index in table.indexes if not index.unique] if rebuild_indexes else []
+        with connection.begin():
+            for index in dropped:
+                connection.execute(DropIndex(index, if_exists=True))
+
+        try:
+            for number, frame in enumerate(read_chunks(path, chunk_size, sheet)):
+                frame.columns = [normalize_column(column) for column in frame.columns]
+                if number == 0:
+                    check_columns(frame.columns, spec)
+                # Line numbers as in the file (header is line 1)
+                frame.index = pd.RangeIndex(counts['read'] + 2, counts['read'] + 2 + len(frame))
+                counts['read'] += len(frame)
+
+                columns, rejected = validate_chunk(frame, spec, cattle_ids, date_format)
+                segment = f'import-{fingerprint}-{number:06d}'
+                try:
+                    loaded = load_chunk(connection, table, to_db_columns(connection, columns, now), segment, spec.get('post'))
+                except IntegrityError:
+                    if 'milking_session' not in columns:
+                        raise
+                    # Some sessions were recorded before: reject those and load the rest
+                    clash = recorded_sessions(connection, columns)
+                    rejected = pd.concat([rejected, frame.loc[clash[clash].index].assign(error='milking session already recorded')])
+                    columns = {name: series[~clash] for name, series in columns.items()}
+                    loaded = load_chunk(connection, table, to_db_columns(connection, columns, now), segment, spec.get('post'))
+
+                count = len(columns['date_recorded'])
+                counts['loaded' if loaded else 'skipped'] += count
+                if len(rejected):
+                    rejected = rejected.sort_index()
+                    if rejects_file is None:
+                        rejects_file = open(rejects_path, 'w', newline='')
+                        rejected.to_csv(rejects_file, index_label='line')
+                    else:
+                        rejected.to_csv(rejects_file, header=False)
+                    counts['rejected'] += len(rejected)
+                if report:
+                    report(counts, time.perf_counter() - started)
+        finally:
+            if rejects_file is not None:
+                rejects_file.close()
+            # Rebuilt once, and even after a failed import
+            with connection.begin():
+                for index in dropped:
+                    connection.execute(CreateIndex(index, if_not_exists=True))
+
+        with connection.begin():
+            bump_table_versions(connection, [table.name])
+            if counts['loaded']:
+                record_bulk_event(connection, table.name, 'bulk_create', {'count': counts['loaded']})
+
+    counts['seconds'] = time.perf_counter() - started
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('kind', choices=list(IMPORTS), help='what the file holds')
+    parser.add_argument('path', help='CSV or XLSX file')
+    parser.add_argument('--farm', help='farm database to load into (default farm when omitted)')
+    parser.add_argument('--sheet', help='XLSX worksheet (the first one when omitted)')
+    parser.add_argument('--date-format', default='ISO8601', help='strftime format of date_recorded, e.g. %%d/%%m/%%Y')
+    parser.add_argument('--chunk-size', type=int, default=100_000, help='rows per read and INSERT batch')
+    parser.add_argument('--rejects', help='where to write rejected rows (default: <path>.rejects.csv)')
+    parser.add_argument('--keep-indexes', action='store_true', help='do not drop secondary indexes during the load')
+    parser.add_argument('--no-forecast', action='store_true', help='do not refit forecasts afterwards')
+    args = parser.parse_args()
+
+    if args.chunk_size < 1:
+        parser.error('--chunk-size must be positive')
+    if not os.path.exists(args.path):
+        parser.error(f'No such file: {args.path}')
+
+    from app import app
+
+    def report(counts, elapsed):
+        rate = counts['read'] / max(elapsed, 1e-9)
+        print(f"\r  {counts['read']:,} rows read, {counts['loaded']:,} loaded, {counts['rejected']:,} rejected "
+              f"({rate:,.0f} rows/s)", end='', flush=True)
+
+    rejects_path = args.rejects or f'{args.path}.rejects.csv'
+    with app.app_context(), use_farm(args.farm or app.config['DEFAULT_FARM_ID'], app):
+        print(f'Importing {args.kind} records from {args.path}...')
+        try:
+            counts = import_file(args.kind, args.path, args.chunk_size, args.sheet, args.date_format,
+                                 rejects_path, not args.keep_indexes, report)
+        except ImportFileError as e:
+            print(f'\n❌ {e}')
+            sys.exit(1)
+        print()
+
+        if counts['loaded'] and args.kind in ('milk', 'feeding') and not args.no_forecast:
+            from forecast import refresh_forecasts
+            print('Refitting forecasts...')
+            refresh_forecasts(full=True)
+            db.session.remove()
+
+    print(f"✅ Imported {counts['loaded']:,} of {counts['read']:,} rows in {counts['seconds']:.1f}s "
+          f"({counts['read'] / max(counts['seconds'], 1e-9):,.0f} rows/s)")
+    if counts['skipped']:
+        print(f"  - {counts['skipped']:,} rows skipped, already loaded by an earlier run")
+    if counts['rejected']:
+        print(f"  - {counts['rejected']:,} rows rejected, see {rejects_path}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Write-behind ingestion of high-frequency milk meter readings.
+
+Readings are validated, appended to a local log segment and fsynced, then
+acknowledged. A background thread flushes buffered readings to
+``milk_production`` in one transaction once ``batch_size`` readings are pending
+or ``flush_interval`` seconds have passed. Each flushed segment is recorded in
+``ingest_segments`` inside the same transaction, so replaying the logs after a
+crash never inserts a reading twice.
+
+    python ingest.py --replay
+"""
+
+import argparse
+import atexit
+import fcntl
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select, delete
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import db
+from models.cattle import Cattle
+from models.ingest_segment import IngestSegment
+from models.milk_production import MilkProduction
+from tenancy import farm_engine, farm_ids, use_farm
+from versioning import bump_table_versions
+from events import record_bulk_event
+
+KNOWN_CATTLE_REFRESH_SECONDS = 5.0
+SEGMENT_RETENTION_DAYS = 7
+SEGMENT_PRUNE_EVERY = 1000  # flushes
+
+_init_lock = threading.Lock()
+
+class IngestError(ValueError):
+    """Raised for an invalid reading; routes answer it with 400"""
+
+class LogSegment:
+    """One append-only JSON-lines log file, locked while its owner is alive"""
+
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.file = open(path, 'ab')
+        try:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self.file.close()
+            raise
+
+    def append(self, rows, fsync=True):
+        self.file.write(b''.join(json.dumps(row).encode('utf-8') + b'\n' for row in rows))
+        self.file.flush()
+        if fsync:
+            os.fsync(self.file.fileno())
+
+    def read(self):
+        with open(self.path, 'rb') as log:
+            # A torn final line means the reading was never acknowledged
+            return [json.loads(line) for line in log if line.endswith(b'\n')]
+
+    def remove(self):
+        os.unlink(self.path)
+        self.file.close()
+
+class MilkIngestBuffer:
+    """Durable write-behind buffer in front of the milk_production table"""
+
+    def __init__(self, app, directory, batch_size=500, flush_interval=1.0, fsync=True, farm_id=None):
+        self.app = app
+        self.farm_id = farm_id or app.config['DEFAULT_FARM_ID']
+        self.directory = directory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._segment = None
+        self._sequence = 0
+        self._pending = []
+        self._pending_since = None
+        self._retry = []  # (segment, rows, oldest append time) that failed to flush
+        self._known_cattle = set()
+        self._known_cattle_loaded_at = 0.0
+        self._latencies = deque(maxlen=1000)  # recent flush latencies in ms
+
+        self.stats = {
+            'accepted': 0,
+            'flushed': 0,
+            'flushes': 0,
+            'failed_flushes': 0,
+            'replayed': 0,
+            'last_flush_rows': 0,
+            'last_flush_latency_ms': None,
+            'max_flush_latency_ms': None,
+        }
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.replay()
+        self._open_segment()
+        self._thread = threading.Thread(target=self._run, name='milk-ingest', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+        return self
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._wake.set()
+        self._thread.join()
+        self._thread = None
+        self.flush()
+        with self._lock:
+            if not self._pending and not self._retry:
+                self._segment.remove()
+
+    def validate(self, reading):
+        """Turn one request payload into a milk_production row"""
+        if not isinstance(reading, dict):
+            raise IngestError('Each reading must be an object')
+        for field in ('cattle_id', 'quantity_liters'):
+            if field not in reading:
+                raise IngestError(f'Missing required field: {field}')
+
+        try:
+            cattle_id = int(reading['cattle_id'])
+            quantity = float(reading['quantity_liters'])
+            quality = float(reading['quality_score']) if reading.get('quality_score') is not None else None
+            recorded = reading.get('date_recorded') or datetime.now().strftime('%Y-%m-%d')
+            datetime.strptime(recorded, '%Y-%m-%d')
+        except (TypeError, ValueError) as e:
+            raise IngestError(f'Invalid reading: {e}')
+
+        if quantity < 0:
+            raise IngestError('quantity_liters cannot be negative')
+        if not self._cattle_exists(cattle_id):
+            raise IngestError(f'Unknown cattle_id: {cattle_id}')
+
+        return {
+            'cattle_id': cattle_id,
+            'date_recorded': recorded,
+            'quantity_liters': quantity,
+            'quality_score': quality,
+            'notes': reading.get('notes'),
+            'created_at': datetime.utcnow().isoformat(),
+        }
+
+    def append(self, rows):
+        """Durably log validated rows; they are acknowledged once this returns"""
+        if not rows:
+            return
+        with self._lock:
+            self._segment.append(rows, self.fsync)
+            if not self._pending:
+                self._pending_since = time.perf_counter()
+            self._pending.extend(rows)
+            self.stats['accepted'] += len(rows)
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self._wake.set()
+
+    def flush(self):
+        """Write everything buffered so far to the database"""
+        with self._flush_lock:
+            with self._lock:
+                if self._pending:
+                    self._retry.append((self._segment, self._pending, self._pending_since))
+                    self._pending = []
+                    self._pending_since = None
+                    self._open_segment()
+                batches, self._retry = self._retry, []
+
+            for index, (segment, rows, since) in enumerate(batches):
+                try:
+                    self._write(segment.name, rows)
+                except Exception as e:
+                    self.stats['failed_flushes'] += 1
+                    self.app.logger.error(f'Milk ingest flush failed, will retry: {e}')
+                    with self._lock:
+                        self._retry = batches[index:] + self._retry
+                    return
+                segment.remove()
+                self._record_flush(len(rows), since)
+
+    def replay(self):
+        """Flush segments left behind by a crashed or stopped process"""
+        if not os.path.isdir(self.directory):
+            return 0
+        replayed = 0
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith('.log'):
+                continue
+            try:
+                segment = LogSegment(os.path.join(self.directory, name))
+            except BlockingIOError:
+                continue  # still owned by a running process
+            rows = segment.read()
+            if rows:
+                self._write(segment.name, rows)
+                replayed += len(rows)
+            segment.remove()
+        self.stats['replayed'] += replayed
+        return replayed
+
+    def snapshot(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            pending = len(self._pending) + sum(len(rows) for _, rows, _ in self._retry)
+        snapshot = dict(self.stats, pending=pending)
+        for name, p in (('p50', 0.50), ('p95', 0.95)):
+            snapshot[f'{name}_flush_latency_ms'] = latencies[min(len(latencies) - 1, int(len(latencies) * p))] if latencies else None
+        return snapshot
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wake.wait(timeout=self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                self.app.logger.error(f'Milk ingest flush failed: {e}')
+
+    def _open_segment(self):
+        self._sequence += 1
+        name = f'milk-{os.getpid()}-{int(time.time() * 1000)}-{self._sequence:06d}.log'
+        self._segment = LogSegment(os.path.join(self.directory, name))
+
+    def _write(self, segment_name, rows):
+        table = MilkProduction.__table__
+        with self.app.app_context():
+            with farm_engine(self.farm_id).begin() as connection:
+                done = connection.execute(
+                    select(IngestSegment.segment).where(IngestSegment.segment == segment_name)
+                ).first()
+                if done:
+                    return
+                connection.execute(insert(table), [self._to_db_row(row) for row in rows])
+                connection.execute(insert(IngestSegment.__table__).values(
+                    segment=segment_name, table_name=table.name, row_count=len(rows), flushed_at=datetime.utcnow()
+                ))
+                bump_table_versions(connection, [table.name])
+                record_bulk_event(connection, table.name, 'bulk_create', {
+                    'count': len(rows), 'cattle_ids': sorted({row['cattle_id'] for row in rows})
+                })
+                
+                if self.stats['flushes'] % SEGMENT_PRUNE_EVERY == 0:
+                    cutoff = datetime.utcnow() - timedelta(days=SEGMENT_RETENTION_DAYS)
+                    connection.execute(delete(IngestSegment.__table__).where(IngestSegment.flushed_at < cutoff))
+
+    def _record_flush(self, count, since):
+        latency = round((time.perf_counter() - since) * 1000, 1) if since else None
+        with self._lock:
+            self.stats['flushed'] += count
+            self.stats['flushes'] += 1
+            self.stats['last_flush_rows'] = count
+            self.stats['last_flush_latency_ms'] = latency
+            if latency is not None:
+                self._latencies.append(latency)
+                self.stats['max_flush_latency_ms'] = max(self.stats['max_flush_latency_ms'] or 0, latency)
+
+    @staticmethod
+    def _to_db_row(row):
+        created_at = datetime.fromisoformat(row['created_at'])
+        return {
+            'cattle_id': row['cattle_id'],
+            'date_recorded': datetime.strptime(row['date_recorded'], '%Y-%m-%d').date(),
+            'quantity_liters': row['quantity_liters'],
+            'quality_score': row.get('quality_score'),
+            'notes': row.get('notes'),
+            'created_at': created_at,
+            'updated_at': created_at,
+        }
+
+    def _cattle_exists(self, cattle_id):
+        if cattle_id in self._known_cattle:
+            return True
+        if time.monotonic() - self._known_cattle_loaded_at < KNOWN_CATTLE_REFRESH_SECONDS:
+            return False
+        with self.app.app_context(), use_farm(self.farm_id, self.app):
+            ids = set(db.session.execute(select(Cattle.id)).scalars())
+            db.session.remove()
+        self._known_cattle = ids
+        self._known_cattle_loaded_at = time.monotonic()
+        return cattle_id in ids
+
+def farm_ingest_dir(app, farm_id):
+    """Log directory of a farm; the default farm keeps the top-level directory"""
+    if farm_id == app.config['DEFAULT_FARM_ID']:
+        return app.config['MILK_INGEST_DIR']
+    return os.path.join(app.config['MILK_INGEST_DIR'], 'farms', farm_id)
+
+def get_milk_ingest_buffer(app, farm_id):
+    """Return a farm's ingest buffer, starting it (and replaying logs) on first use"""
+    buffers = app.extensions.setdefault('milk_ingest', {})
+    buffer = buffers.get(farm_id)
+    if buffer is None:
+        with _init_lock:
+            buffer = buffers.get(farm_id)
+            if buffer is None:
+                buffer = MilkIngestBuffer(
+                    app,
+                    farm_ingest_dir(app, farm_id),
+                    batch_size=app.config['MILK_INGEST_BATCH_SIZE'],
+                    flush_interval=app.config['MILK_INGEST_FLUSH_INTERVAL'],
+                    farm_id=farm_id,
+                ).start()
+                buffers[farm_id] = buffer
+    return buffer
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--replay', action='store_true', help='flush log segments left by stopped processes')
+    args = parser.parse_args()
+
+    if not args.replay:
+        parser.print_help()
+        return
+
+    from app import app
+
+    for farm_id in farm_ids(app):
+        buffer = MilkIngestBuffer(app, farm_ingest_dir(app, farm_id), farm_id=farm_id)
+        print(f"✅ Replayed {buffer.replay()} milk readings for farm {farm_id}")
+
+if __name__ == '__main__':
+    main()
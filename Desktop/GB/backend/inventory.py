@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+"""
+Feed inventory: stock on hand per feed type, kept current on every write.
+
+Purchases, deliveries and stock counts are posted to ``feed_stock_movements``;
+feeding records are the consumption. Every write applies its change to the one
+``feed_stock`` row of its feed type and to that type's day in
+``feed_consumption_daily``, in the same transaction, so the stock levels and days
+of cover are read from one row per feed type (plus the last
+``INVENTORY_RATE_DAYS`` daily totals) instead of from the feeding history.
+
+A stock count replaces the quantity on hand when it is posted. Feeding records
+and deliveries posted after it but dated before its day (entered late, or
+imported) still go into the daily totals but leave the stock alone, as the
+count already reflected them. The same holds for editing or deleting a feeding
+record of the count's own day that was posted before the count.
+
+ORM writes are posted by session events. Set-based writes are not: bulk feeding
+updates and deletes call ``post_bulk_feeding_change`` first, and
+import_records.py posts each chunk it loads.
+
+Feed that was eaten stays eaten when its animal is deleted: cattle deletes call
+``retire_cattle_feeding`` first, which copies the animal's feeding (archived
+years included) to ``retired_feeding`` and leaves the stock and daily totals
+alone. Only deleting or editing a feeding record itself gives stock back. After loading feeding records any
+other way (e.g. generate_synthetic_data.py), recompute everything with:
+
+    python inventory.py --rebuild
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import DateTime, event, select, insert, update, delete, func, case, literal, and_, or_, union_all
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import db
+from archive import with_archive
+from models.cattle import Cattle
+from models.feeding import Feeding
+from models.feed_stock import FeedStock
+from models.feed_stock_movement import FeedStockMovement
+from models.feed_consumption import FeedConsumption
+from models.retired_feeding import RetiredFeeding
+from tenancy import farm_engine, farm_ids, use_farm
+from versioning import bump_table_versions
+
+MOVEMENT_KINDS = ('purchase', 'delivery', 'count')
+
+stock_table = FeedStock.__table__
+consumption_table = FeedConsumption.__table__
+retired_table = RetiredFeeding.__table__
+
+class InventoryError(ValueError):
+    """Raised for a posting that cannot be applied; routes answer it with 400"""
+
+def _day(value):
+    # Column defaults of datetime.utcnow leave a datetime on a Date attribute
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    return value
+
+def new_changes():
+    """
+    Accumulator of {(feed_type, day, posted_at): [on hand kg, on order kg, consumed kg]}
+    for post_changes. ``posted_at`` is when an edited or deleted feeding record was
+    first posted, None for postings made now.
+    """
+    return defaultdict(lambda: [0.0, 0.0, 0.0])
+
+def _upsert(connection, table):
+    # INSERT ... ON CONFLICT, so concurrent postings of a new key do not fail its unique constraint
+    return (postgresql.insert if connection.dialect.name == 'postgresql' else sqlite.insert)(table)
+
+def _ensure_stock_rows(connection, feed_types):
+    existing = set(connection.execute(
+        select(stock_table.c.feed_type).where(stock_table.c.feed_type.in_(feed_types))
+    ).scalars())
+    missing = sorted(set(feed_types) - existing)
+    if missing:
+        now = datetime.utcnow()
+        connection.execute(_upsert(connection, stock_table).on_conflict_do_nothing(index_elements=['feed_type']), [
+            {'feed_type': feed_type, 'on_hand_kg': 0.0, 'on_order_kg': 0.0, 'updated_at': now} for feed_type in missing
+        ])
+
+def post_changes(connection, changes):
+    """Apply accumulated changes to the stock rows and daily totals"""
+    changes = {key: delta for key, delta in changes.items() if any(delta)}
+    if not changes:
+        return
+    _ensure_stock_rows(connection, {key[0] for key in changes})
+
+    now = datetime.utcnow()
+    on_hand = defaultdict(float)  # (feed_type, day, posted_at) -> kg, applied unless a count covers it
+    on_order = defaultdict(float)
+    consumed = defaultdict(float)
+    for (feed_type, day, posted_at), (stock_kg, order_kg, consumed_kg) in changes.items():
+        if stock_kg:
+            on_hand[feed_type, day, posted_at] += stock_kg
+        if order_kg:
+            on_order[feed_type] += order_kg
+        if consumed_kg:
+            consumed[feed_type, day] += consumed_kg
+
+    consumed_rows = [
+        {'feed_type': feed_type, 'date_recorded': day, 'quantity_kg': kg}
+        for (feed_type, day), kg in sorted(consumed.items()) if kg
+    ]
+    if consumed_rows:
+        upsert = _upsert(connection, consumption_table)
+        connection.execute(upsert.on_conflict_do_update(
+            index_elements=['feed_type', 'date_recorded'],
+            set_={'quantity_kg': consumption_table.c.quantity_kg + upsert.excluded.quantity_kg}
+        ), consumed_rows)
+
+    for (feed_type, day, posted_at), kg in on_hand.items():
+        not_counted = or_(stock_table.c.counted_on.is_(None), stock_table.c.counted_on <= day)
+        if posted_at is not None:
+            # A count of the same day already reflects what was posted before it
+            not_counted = or_(
+                stock_table.c.counted_on.is_(None), stock_table.c.counted_on < day,
+                and_(stock_table.c.counted_on == day,
+                     or_(stock_table.c.counted_at.is_(None), stock_table.c.counted_at < posted_at))
+            )
+        connection.execute(
+            update(stock_table).where(stock_table.c.feed_type == feed_type, not_counted)
+            .values(on_hand_kg=stock_table.c.on_hand_kg + kg, updated_at=now)
+        )
+    for feed_type, kg in on_order.items():
+        # Deliveries beyond what was ordered do not leave a negative order book
+        ordered = stock_table.c.on_order_kg + kg
+        connection.execute(
+            update(stock_table).where(stock_table.c.feed_type == feed_type)
+            .values(on_order_kg=case((ordered < 0, 0.0), else_=ordered), updated_at=now)
+        )
+    bump_table_versions(connection, [stock_table.name, consumption_table.name])
+
+def add_movement(changes, movement):
+    """Stock effect of a new purchase or delivery (counts are applied by post_count)"""
+    key = (movement.feed_type, _day(movement.date_recorded), None)
+    if movement.kind == 'purchase':
+        changes[key][1] += movement.quantity_kg
+    elif movement.kind == 'delivery':
+        changes[key][0] += movement.quantity_kg
+        if movement.purchase_id is not None:
+            changes[key][1] -= movement.quantity_kg
+
+def add_consumption(changes, feed_type, day, quantity_kg, posted_at=None):
+    key = (feed_type, _day(day), posted_at)
+    changes[key][0] -= quantity_kg
+    changes[key][2] += quantity_kg
+
+def post_count(connection, movement):
+    """Apply a count's correction and make it the latest count of its feed type"""
+    _ensure_stock_rows(connection, {movement.feed_type})
+    connection.execute(
+        update(stock_table).where(stock_table.c.feed_type == movement.feed_type)
+        .values(on_hand_kg=stock_table.c.on_hand_kg + movement.quantity_kg,
+                counted_on=_day(movement.date_recorded), counted_at=movement.created_at or datetime.utcnow(),
+                updated_at=datetime.utcnow())
+    )
+    bump_table_versions(connection, [stock_table.name])
+
+def count_correction(session, feed_type, counted_kg, day):
+    """
+    Correction that makes a count of ``counted_kg`` on ``day`` the stock on
+    hand, allowing for deliveries and feeding dated after that day.
+    """
+    stock = session.execute(
+        select(FeedStock).where(FeedStock.feed_type == feed_type).with_for_update()
+    ).scalar_one_or_none()
+    if stock is not None and stock.counted_on is not None and day < stock.counted_on:
+        raise InventoryError(f'{feed_type} was already counted on {stock.counted_on.isoformat()}')
+    on_hand = stock.on_hand_kg if stock is not None else 0.0
+
+    delivered = session.execute(
+        select(func.coalesce(func.sum(FeedStockMovement.quantity_kg), 0.0)).where(
+            FeedStockMovement.feed_type == feed_type, FeedStockMovement.kind == 'delivery',
+            FeedStockMovement.date_recorded > day
+        )
+    ).scalar()
+    consumed = session.execute(
+        select(func.coalesce(func.sum(FeedConsumption.quantity_kg), 0.0)).where(
+            FeedConsumption.feed_type == feed_type, FeedConsumption.date_recorded > day
+        )
+    ).scalar()
+    return counted_kg + delivered - consumed - on_hand
+
+def _previous(state, name):
+    # Value in the database before this flush
+    history = state.attrs[name].history
+    return history.deleted[0] if history.deleted else getattr(state.obj(), name)
+
+def register_inventory_events():
+    """Post feeding records and stock movements written through the ORM"""
+    if event.contains(Session, 'after_flush', _after_flush):
+        return
+    event.listen(Session, 'after_flush', _after_flush)
+
+def _after_flush(session, flush_context):
+    changes = new_changes()
+    counts = []
+    # Their feeding goes with them but stays consumed (see retire_cattle_feeding)
+    deleted_cattle = {
+        state.obj().id for state, (isdelete, listonly) in flush_context.states.items()
+        if isdelete and isinstance(state.obj(), Cattle)
+    }
+    for state, (isdelete, listonly) in flush_context.states.items():
+        if listonly:
+            continue
+        obj = state.obj()
+        if isinstance(obj, Feeding):
+            if isdelete and _previous(state, 'cattle_id') in deleted_cattle:
+                continue
+            if obj in session.new:
+                add_consumption(changes, obj.feed_type, obj.date_recorded, obj.quantity_kg)
+                continue
+            before = [_previous(state, name) for name in ('feed_type', 'date_recorded', 'quantity_kg')]
+            after = [obj.feed_type, obj.date_recorded, obj.quantity_kg]
+            posted_at = _previous(state, 'created_at')
+            if isdelete or before != after:
+                add_consumption(changes, *before[:2], -before[2], posted_at)
+            if not isdelete and before != after:
+                add_consumption(changes, *after, posted_at)
+        elif isinstance(obj, FeedStockMovement) and obj in session.new:
+            if obj.kind == 'count':
+                counts.append(obj)
+            else:
+                add_movement(changes, obj)
+    if not changes and not counts:
+        return
+
+    connection = session.connection()
+    post_changes(connection, changes)
+    for movement in counts:
+        post_count(connection, movement)
+
+def post_bulk_feeding_change(session, conditions, changes=None, table=None):
+    """
+    Post a set-based UPDATE (with ``changes``) or DELETE of the feeding records
+    matching ``conditions``, in ``feeding`` or the given archive partition.
+    Call it in the same transaction, before the statement.
+    """
+    if changes is not None and not {'feed_type', 'quantity_kg'} & set(changes):
+        return
+    columns = (table if table is not None else Feeding.__table__).c
+    # Records of a counted day are told apart by when they were posted
+    posted_at = case(
+        (columns.date_recorded.in_(select(stock_table.c.counted_on).where(stock_table.c.counted_on.isnot(None))),
+         columns.created_at),
+        else_=None
+    ).label('posted_at')
+    groups = session.execute(
+        select(columns.feed_type, columns.date_recorded, posted_at, func.count(), func.sum(columns.quantity_kg))
+        .where(*conditions).group_by(columns.feed_type, columns.date_recorded, posted_at)
+    ).all()
+
+    stock_changes = new_changes()
+    for feed_type, day, posted, records, quantity_kg in groups:
+        add_consumption(stock_changes, feed_type, day, -quantity_kg, posted)
+        if changes is not None:
+            new_quantity = changes['quantity_kg'] * records if 'quantity_kg' in changes else quantity_kg
+            add_consumption(stock_changes, changes.get('feed_type', feed_type), day, new_quantity, posted)
+    post_changes(session.connection(), stock_changes)
+
+def retire_cattle_feeding(connection, cattle_ids):
+    """
+    Keep the feeding of cattle about to be deleted (ids or a select of ids) as
+    consumed. Call it in the same transaction, before the delete.
+    """
+    records = with_archive(Feeding)
+    connection.execute(insert(retired_table).from_select(
+        ['cattle_id', 'feed_type', 'date_recorded', 'quantity_kg', 'created_at', 'retired_at'],
+        select(records.cattle_id, records.feed_type, records.date_recorded, records.quantity_kg,
+               records.created_at, literal(datetime.utcnow(), DateTime))
+        .where(records.cattle_id.in_(cattle_ids))
+    ))
+
+def post_imported_feeding(connection, columns):
+    """Post a chunk of feeding records loaded by import_records.py, given its insert columns"""
+    changes = new_changes()
+    for feed_type, day, quantity_kg in zip(columns['feed_type'], columns['date_recorded'], columns['quantity_kg']):
+        add_consumption(changes, feed_type, day, quantity_kg)
+    post_changes(connection, changes)
+
+def stock_levels(session, feed_type=None, today=None):
+    """
+    Stock of every feed type with its consumption rate over the last
+    INVENTORY_RATE_DAYS days, days of cover and whether to reorder.
+    """
+    today = today or date.today()
+    rate_days = current_app.config['INVENTORY_RATE_DAYS']
+    query = select(FeedStock).order_by(FeedStock.feed_type)
+    rates = select(FeedConsumption.feed_type, func.sum(FeedConsumption.quantity_kg)).where(
+        FeedConsumption.date_recorded > today - timedelta(days=rate_days),
+        FeedConsumption.date_recorded <= today
+    ).group_by(FeedConsumption.feed_type)
+    if feed_type is not None:
+        query = query.where(FeedStock.feed_type == feed_type)
+        rates = rates.where(FeedConsumption.feed_type == feed_type)
+    consumed = dict(session.execute(rates).all())
+
+    levels = []
+    for stock in session.execute(query).scalars():
+        daily_kg = (consumed.get(stock.feed_type) or 0.0) / rate_days
+        cover = stock.on_hand_kg / daily_kg if daily_kg > 0 else None
+        cover_with_orders = (stock.on_hand_kg + stock.on_order_kg) / daily_kg if daily_kg > 0 else None
+        below_level = stock.reorder_level_kg is not None and stock.on_hand_kg + stock.on_order_kg <= stock.reorder_level_kg
+        runs_out_in_lead_time = (stock.lead_time_days is not None and cover_with_orders is not None
+                                 and cover_with_orders <= stock.lead_time_days)
+        levels.append({
+            **stock.to_dict(),
+            'daily_consumption_kg': round(daily_kg, 2),
+            'days_of_cover': round(max(cover, 0.0), 1) if cover is not None else None,
+            'days_of_cover_with_orders': round(max(cover_with_orders, 0.0), 1) if cover_with_orders is not None else None,
+            'runs_out_on': (today + timedelta(days=int(max(cover, 0.0)))).isoformat() if cover is not None else None,
+            'reorder': below_level or runs_out_in_lead_time,
+        })
+    return levels
+
+def rebuild_inventory():
+    """Recompute the daily totals and stock rows of the current farm from the full history"""
+    with farm_engine().begin() as connection:
+        records = with_archive(Feeding)
+        columns = ('feed_type', 'date_recorded', 'quantity_kg')
+        consumed = union_all(
+            select(*(getattr(records, name) for name in columns)),
+            select(*(retired_table.c[name] for name in columns))
+        ).subquery()
+        totals = connection.execute(
+            select(consumed.c.feed_type, consumed.c.date_recorded, func.sum(consumed.c.quantity_kg))
+            .group_by(consumed.c.feed_type, consumed.c.date_recorded)
+        ).all()
+        connection.execute(delete(consumption_table))
+        if totals:
+            connection.execute(insert(consumption_table), [
+                {'feed_type': feed_type, 'date_recorded': _day(day), 'quantity_kg': kg} for feed_type, day, kg in totals
+            ])
+
+        movements = connection.execute(
+            select(FeedStockMovement.__table__).order_by(FeedStockMovement.id)
+        ).all()
+        balances = {feed_type: {'on_hand_kg': 0.0, 'on_order_kg': 0.0, 'counted_on': None, 'counted_at': None}
+                     for feed_type in {row.feed_type for row in movements} | {row[0] for row in totals}}
+        # Counts dated before an earlier count are rejected, so the last one posted is the latest
+        counts = {movement.feed_type: movement for movement in movements if movement.kind == 'count'}
+        for feed_type, count in counts.items():
+            balances[feed_type].update(on_hand_kg=count.counted_kg, counted_on=_day(count.date_recorded),
+                                       counted_at=count.created_at)
+
+        for movement in movements:
+            balance = balances[movement.feed_type]
+            count = counts.get(movement.feed_type)
+            if movement.kind == 'purchase':
+                balance['on_order_kg'] += movement.quantity_kg
+            elif movement.kind == 'delivery':
+                if movement.purchase_id is not None:
+                    balance['on_order_kg'] = max(balance['on_order_kg'] - movement.quantity_kg, 0.0)
+                if count is None or _day(movement.date_recorded) > balance['counted_on'] or (
+                        _day(movement.date_recorded) == balance['counted_on'] and movement.id > count.id):
+                    balance['on_hand_kg'] += movement.quantity_kg
+        for feed_type, day, kg in totals:
+            if balances[feed_type]['counted_on'] is None or _day(day) > balances[feed_type]['counted_on']:
+                balances[feed_type]['on_hand_kg'] -= kg
+        for feed_type, count in counts.items():
+            # Feeding on the day of the count, posted after it
+            for table in (Feeding.__table__, retired_table):
+                balances[feed_type]['on_hand_kg'] -= connection.execute(
+                    select(func.coalesce(func.sum(table.c.quantity_kg), 0.0)).where(
+                        table.c.feed_type == feed_type, table.c.date_recorded == balances[feed_type]['counted_on'],
+                        table.c.created_at > count.created_at
+                    )
+                ).scalar()
+
+        now = datetime.utcnow()
+        _ensure_stock_rows(connection, set(balances))
+        for feed_type, balance in balances.items():
+            connection.execute(
+                update(stock_table).where(stock_table.c.feed_type == feed_type).values(**balance, updated_at=now)
+            )
+        bump_table_versions(connection, [stock_table.name, consumption_table.name])
+    return {'feed_types': len(balances), 'days': len(totals)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rebuild', action='store_true', help='recompute stock and daily totals from the history')
+    parser.add_argument('--farm', action='append', help='farm to process (repeatable; all farms when omitted)')
+    args = parser.parse_args()
+
+    from app import app
+
+    with app.app_context():
+        farms = args.farm or farm_ids(app)
+    for farm_id in farms:
+        with app.app_context(), use_farm(farm_id, app):
+            try:
+                if args.rebuild:
+                    started = time.perf_counter()
+                    result = rebuild_inventory()
+                    print(f"✅ Farm {farm_id}: rebuilt {result['feed_types']} feed types from "
+                          f"{result['days']:,} feed type days in {time.perf_counter() - started:.1f}s")
+                for level in stock_levels(db.session):
+                    cover = f"{level['days_of_cover']} days" if level['days_of_cover'] is not None else 'no recent use'
+                    flag = '  ⚠️ reorder' if level['reorder'] else ''
+                    print(f"  {level['feed_type']:<20}{level['on_hand_kg']:>14,.1f} kg  {cover}{flag}")
+            finally:
+                db.session.remove()
+
+if __name__ == '__main__':
+    main()
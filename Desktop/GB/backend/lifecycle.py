@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Lifecycle fields for cattle: birth month, age band and lifecycle stage.
+
+``birth_month`` (year * 12 + month - 1) never changes, so age in months is a
+plain subtraction in SQL. ``age_band`` and ``lifecycle_stage`` are stored and
+indexed so cohort queries group in the database. They are set whenever cattle
+are saved through the ORM, and the nightly job below rewrites only the rows
+whose band or stage moved since the last run (plus any rows inserted in bulk).
+
+    python lifecycle.py            # run nightly, e.g. from cron
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import date
+
+from sqlalchemy import event, update, case, extract, or_, Integer
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models.cattle import Cattle
+from tenancy import farm_engine, farm_ids
+from versioning import bump_table_versions
+
+# (upper bound in months, label); the last band is open-ended
+AGE_BANDS = [
+    (6, '0-6m'),
+    (12, '6-12m'),
+    (24, '12-24m'),
+    (48, '2-4y'),
+    (72, '4-6y'),
+    (96, '6-8y'),
+    (None, '8y+'),
+]
+AGE_BAND_LABELS = [label for _, label in AGE_BANDS]
+
+CALF_MONTHS = 12
+HEIFER_MONTHS = 24
+
+def month_index(day):
+    return day.year * 12 + day.month - 1
+
+def age_band(age_months):
+    for upper, label in AGE_BANDS:
+        if upper is None or age_months < upper:
+            return label
+
+def lifecycle_stage(gender, age_months):
+    if age_months < CALF_MONTHS:
+        return 'Calf'
+    if gender == 'Female':
+        return 'Heifer' if age_months < HEIFER_MONTHS else 'Cow'
+    return 'Bull'
+
+def set_lifecycle_fields(cattle, today=None):
+    """Fill the lifecycle columns of one Cattle instance from its date of birth"""
+    if cattle.date_of_birth is None:
+        return
+    today = today or date.today()
+    cattle.birth_month = month_index(cattle.date_of_birth)
+    age = month_index(today) - cattle.birth_month
+    cattle.age_band = age_band(age)
+    cattle.lifecycle_stage = lifecycle_stage(cattle.gender, age)
+
+def _before_save(mapper, connection, target):
+    set_lifecycle_fields(target)
+
+def register_lifecycle_events():
+    if event.contains(Cattle, 'before_insert', _before_save):
+        return
+    event.listen(Cattle, 'before_insert', _before_save)
+    event.listen(Cattle, 'before_update', _before_save)
+
+# SQL versions of the functions above, used by the nightly refresh
+
+def birth_month_expr(date_column):
+    year = extract('year', date_column).cast(Integer)
+    month = extract('month', date_column).cast(Integer)
+    return year * 12 + month - 1
+
+def age_band_expr(age):
+    whens = [(age < upper, label) for upper, label in AGE_BANDS if upper is not None]
+    return case(*whens, else_=AGE_BANDS[-1][1])
+
+def lifecycle_stage_expr(gender, age):
+    return case(
+        (age < CALF_MONTHS, 'Calf'),
+        (gender == 'Female', case((age < HEIFER_MONTHS, 'Heifer'), else_='Cow')),
+        else_='Bull',
+    )
+
+def refresh_lifecycle(connection, today=None):
+    """
+    Bring every animal's lifecycle columns up to date in one UPDATE that only
+    writes rows whose values changed. Returns the number of rows updated.
+    """
+    today = today or date.today()
+    table = Cattle.__table__
+    birth_month = birth_month_expr(table.c.date_of_birth)
+    age = month_index(today) - birth_month
+    band = age_band_expr(age)
+    stage = lifecycle_stage_expr(table.c.gender, age)
+
+    stale = or_(
+        table.c.birth_month.is_(None), table.c.birth_month != birth_month,
+        table.c.age_band.is_(None), table.c.age_band != band,
+        table.c.lifecycle_stage.is_(None), table.c.lifecycle_stage != stage,
+    )
+    result = connection.execute(
+        update(table).where(stale).values(
+            birth_month=birth_month,
+            age_band=band,
+            lifecycle_stage=stage,
+            # Ageing is not an edit; keep updated_at as it was
+            updated_at=table.c.updated_at,
+        )
+    )
+    if result.rowcount:
+        bump_table_versions(connection, [table.name])
+    return result.rowcount
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+
+    from app import app
+
+    with app.app_context():
+        for farm_id in farm_ids():
+            started = time.perf_counter()
+            with farm_engine(farm_id).begin() as connection:
+                updated = refresh_lifecycle(connection)
+            print(f"✅ Farm {farm_id}: lifecycle fields refreshed for {updated} cattle in {time.perf_counter() - started:.2f}s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+from database import db
+from datetime import datetime
+
+class ArchivePartition(db.Model):
+    __tablename__ = 'archive_partitions'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    source_table = db.Column(db.String(50), nullable=False)  # milk_production, feeding
+    year = db.Column(db.Integer, nullable=False)
+    partition_table = db.Column(db.String(100), unique=True, nullable=False)
+    row_count = db.Column(db.Integer, nullable=False, default=0)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        db.UniqueConstraint('source_table', 'year', name='uq_archive_source_year'),
+    )
+
+    def __repr__(self):
+        return f'ArchivePartition(source={self.source_table}, year={self.year}, rows={self.row_count})'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'source_table': self.source_table,
+            'year': self.year,
+            'partition_table': self.partition_table,
+            'row_count': self.row_count,
+            'archived_at': self.archived_at.isoformat() if self.archived_at else None
+        }
@@ -1,5 +1,6 @@
 from database import db
 from datetime import datetime
+from sqlalchemy import ForeignKey
 
 class Cattle(db.Model):
     __tablename__ = 'cattle'
@@ -7,19 +8,36 @@ class Cattle(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     tag_number = db.Column(db.String(50), unique=True, nullable=False)
     name = db.Column(db.String(100), nullable=False)
-    breed = db.Column(db.String(50), nullable=False)
+    breed = db.Column(db.String(50), nullable=False, index=True)
     date_of_birth = db.Column(db.Date, nullable=False)
-    gender = db.Column(db.String(10), nullable=False)  # Male/Female
+    gender = db.Column(db.String(10), nullable=False, index=True)  # Male/Female
     weight = db.Column(db.Float, nullable=True)
-    health_status = db.Column(db.String(50), default='Healthy')
-    location = db.Column(db.String(100), nullable=True)
+    health_status = db.Column(db.String(50), default='Healthy', index=True)
+    location = db.Column(db.String(100), nullable=True, index=True)
     purchase_date = db.Column(db.Date, nullable=True)
     purchase_price = db.Column(db.Float, nullable=True)
-    current_status = db.Column(db.String(20), default='Active')  # Active/Sold/Deceased
+    current_status = db.Column(db.String(20), default='Active', index=True)  # Active/Sold/Deceased
     notes = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Lifecycle fields, set on save and kept current by the nightly job in lifecycle.py
+    birth_month = db.Column(db.Integer, nullable=True, index=True)  # year * 12 + month - 1
+    age_band = db.Column(db.String(10), nullable=True, index=True)  # 0-6m, 6-12m, ..., 8y+
+    lifecycle_stage = db.Column(db.String(20), nullable=True, index=True)  # Calf/Heifer/Cow/Bull
+    
+    # Pedigree; ancestry is kept in cattle_ancestry by pedigree.py
+    sire_id = db.Column(db.Integer, ForeignKey('cattle.id', ondelete='SET NULL'), nullable=True, index=True)
+    dam_id = db.Column(db.Integer, ForeignKey('cattle.id', ondelete='SET NULL'), nullable=True, index=True)
+    inbreeding_coefficient = db.Column(db.Float, nullable=True)  # Wright's F, 0 when no common ancestor is recorded
+    
+    # Case-insensitive prefix search on tag number and name
+    __table_args__ = (
+        db.Index('ix_cattle_tag_number_lower', db.func.lower(tag_number)),
+        db.Index('ix_cattle_name_lower', db.func.lower(name)),
+        db.Index('ix_cattle_breed_age_band', breed, age_band),
+    )
+    
     # Relationships
     milk_records = db.relationship('MilkProduction', backref='cattle', lazy=True, cascade='all, delete-orphan')
     feeding_records = db.relationship('Feeding', backref='cattle', lazy=True, cascade='all, delete-orphan')
@@ -42,6 +60,11 @@ class Cattle(db.Model):
             'purchase_price': self.purchase_price,
             'current_status': self.current_status,
             'notes': self.notes,
+            'age_band': self.age_band,
+            'lifecycle_stage': self.lifecycle_stage,
+            'sire_id': self.sire_id,
+            'dam_id': self.dam_id,
+            'inbreeding_coefficient': self.inbreeding_coefficient,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
         }
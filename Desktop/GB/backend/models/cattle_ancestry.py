@@ -0,0 +1,24 @@
+from database import db
+from sqlalchemy import ForeignKey
+
+class CattleAncestry(db.Model):
+    __tablename__ = 'cattle_ancestry'
+    
+    # Closure of the sire/dam links: one row per animal and each of its recorded ancestors
+    ancestor_id = db.Column(db.Integer, ForeignKey('cattle.id'), primary_key=True)
+    descendant_id = db.Column(db.Integer, ForeignKey('cattle.id'), primary_key=True)
+    depth = db.Column(db.Integer, nullable=False)  # generations on the shortest path: 1 parent, 2 grandparent, ...
+    
+    __table_args__ = (
+        db.Index('ix_cattle_ancestry_descendant_depth', 'descendant_id', 'depth'),
+    )
+
+    def __repr__(self):
+        return f'CattleAncestry(ancestor_id={self.ancestor_id}, descendant_id={self.descendant_id}, depth={self.depth})'
+
+    def to_dict(self):
+        return {
+            'ancestor_id': self.ancestor_id,
+            'descendant_id': self.descendant_id,
+            'depth': self.depth
+        }
@@ -0,0 +1,27 @@
+from database import db
+from datetime import datetime
+import json
+
+class ChangeEvent(db.Model):
+    __tablename__ = 'change_events'
+    
+    # Outbox of record changes, written in the transaction that made them; the id is the SSE event id
+    id = db.Column(db.Integer, primary_key=True)
+    table_name = db.Column(db.String(50), nullable=False)
+    action = db.Column(db.String(20), nullable=False)  # create, update, delete, bulk_create, bulk_update, bulk_delete
+    record_id = db.Column(db.Integer, nullable=True)  # None for bulk changes
+    data = db.Column(db.Text, nullable=True)  # JSON: the record after a create or update
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'ChangeEvent(id={self.id}, table={self.table_name}, action={self.action}, record_id={self.record_id})'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'table': self.table_name,
+            'action': self.action,
+            'record_id': self.record_id,
+            'data': json.loads(self.data) if self.data else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
@@ -0,0 +1,24 @@
+from database import db
+
+class FeedConsumption(db.Model):
+    __tablename__ = 'feed_consumption_daily'
+    
+    # Feeding kg per feed type and day, kept current by inventory.py; consumption rates read these
+    id = db.Column(db.Integer, primary_key=True)
+    feed_type = db.Column(db.String(100), nullable=False)
+    date_recorded = db.Column(db.Date, nullable=False)
+    quantity_kg = db.Column(db.Float, nullable=False, default=0.0)
+    
+    __table_args__ = (
+        db.UniqueConstraint('feed_type', 'date_recorded', name='uq_feed_consumption_type_date'),
+    )
+
+    def __repr__(self):
+        return f'FeedConsumption(feed_type={self.feed_type}, date={self.date_recorded}, qty={self.quantity_kg})'
+
+    def to_dict(self):
+        return {
+            'feed_type': self.feed_type,
+            'date_recorded': self.date_recorded.isoformat(),
+            'quantity_kg': round(self.quantity_kg, 2)
+        }
@@ -0,0 +1,30 @@
+from database import db
+from datetime import datetime
+
+class FeedStock(db.Model):
+    __tablename__ = 'feed_stock'
+    
+    # Running balance of one feed type, updated by inventory.py in the transaction of every posting
+    id = db.Column(db.Integer, primary_key=True)
+    feed_type = db.Column(db.String(100), nullable=False, unique=True)
+    on_hand_kg = db.Column(db.Float, nullable=False, default=0.0)
+    on_order_kg = db.Column(db.Float, nullable=False, default=0.0)  # purchased, not yet delivered
+    reorder_level_kg = db.Column(db.Float, nullable=True)
+    lead_time_days = db.Column(db.Integer, nullable=True)  # from ordering to delivery
+    counted_on = db.Column(db.Date, nullable=True)  # latest stock count; earlier postings are in it
+    counted_at = db.Column(db.DateTime, nullable=True)  # when that count was posted
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'FeedStock(feed_type={self.feed_type}, on_hand_kg={self.on_hand_kg})'
+
+    def to_dict(self):
+        return {
+            'feed_type': self.feed_type,
+            'on_hand_kg': round(self.on_hand_kg, 2),
+            'on_order_kg': round(self.on_order_kg, 2),
+            'reorder_level_kg': self.reorder_level_kg,
+            'lead_time_days': self.lead_time_days,
+            'counted_on': self.counted_on.isoformat() if self.counted_on else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
@@ -0,0 +1,46 @@
+from database import db
+from datetime import datetime
+from sqlalchemy import ForeignKey
+
+class FeedStockMovement(db.Model):
+    __tablename__ = 'feed_stock_movements'
+    
+    # Purchases, deliveries and stock counts; feeding records are the consumption
+    id = db.Column(db.Integer, primary_key=True)
+    feed_type = db.Column(db.String(100), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)  # purchase, delivery, count
+    date_recorded = db.Column(db.Date, default=datetime.utcnow, nullable=False)
+    quantity_kg = db.Column(db.Float, nullable=False)  # for a count, the correction it made
+    counted_kg = db.Column(db.Float, nullable=True)  # counts only
+    unit_cost = db.Column(db.Float, nullable=True)
+    total_cost = db.Column(db.Float, nullable=True)
+    supplier = db.Column(db.String(100), nullable=True)
+    purchase_id = db.Column(db.Integer, ForeignKey('feed_stock_movements.id'), nullable=True)  # delivery of an order
+    expense_id = db.Column(db.Integer, ForeignKey('expenses.id'), nullable=True)
+    notes = db.Column(db.Text, nullable=True)
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_feed_stock_movements_type_date', 'feed_type', 'date_recorded'),
+    )
+
+    def __repr__(self):
+        return f'FeedStockMovement(id={self.id}, kind={self.kind}, feed_type={self.feed_type}, qty={self.quantity_kg})'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'feed_type': self.feed_type,
+            'kind': self.kind,
+            'date_recorded': self.date_recorded.isoformat(),
+            'quantity_kg': self.quantity_kg,
+            'counted_kg': self.counted_kg,
+            'unit_cost': self.unit_cost,
+            'total_cost': self.total_cost,
+            'supplier': self.supplier,
+            'purchase_id': self.purchase_id,
+            'expense_id': self.expense_id,
+            'notes': self.notes,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
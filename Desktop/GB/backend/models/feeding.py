@@ -18,6 +18,11 @@ class Feeding(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        # One animal's recent feeding, e.g. when re-scoring its health risk
+        db.Index('ix_feeding_cattle_date', 'cattle_id', 'date_recorded'),
+    )
+
     def __repr__(self):
         return f'Feeding(id={self.id}, cattle_id={self.cattle_id}, feed_type={self.feed_type}, qty={self.quantity_kg})'
 
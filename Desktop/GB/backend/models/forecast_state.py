@@ -0,0 +1,35 @@
+from database import db
+from datetime import datetime
+
+class ForecastState(db.Model):
+    __tablename__ = 'forecast_states'
+    
+    # Fitted smoothing state of one series, refreshed incrementally by forecast.py
+    id = db.Column(db.Integer, primary_key=True)
+    series = db.Column(db.String(20), nullable=False)  # herd_milk, cow_milk, feed
+    key = db.Column(db.String(100), nullable=False)  # herd, cattle id or feed type
+    level = db.Column(db.Float, nullable=False)
+    trend = db.Column(db.Float, nullable=False)
+    variance = db.Column(db.Float, nullable=False)  # of one-day-ahead errors
+    observations = db.Column(db.Integer, nullable=False)
+    fitted_through = db.Column(db.Date, nullable=False)
+    fitted_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        db.UniqueConstraint('series', 'key', name='uq_forecast_series_key'),
+    )
+
+    def __repr__(self):
+        return f'ForecastState(series={self.series}, key={self.key}, through={self.fitted_through})'
+
+    def to_dict(self):
+        return {
+            'series': self.series,
+            'key': self.key,
+            'level': self.level,
+            'trend': self.trend,
+            'variance': self.variance,
+            'observations': self.observations,
+            'fitted_through': self.fitted_through.isoformat(),
+            'fitted_at': self.fitted_at.isoformat() if self.fitted_at else None
+        }
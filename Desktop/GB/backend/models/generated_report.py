@@ -0,0 +1,42 @@
+from database import db
+from datetime import datetime
+import base64
+import json
+
+class GeneratedReport(db.Model):
+    __tablename__ = 'generated_reports'
+    
+    # Charts rendered ahead of time by reports.py so they can be served without matplotlib
+    id = db.Column(db.Integer, primary_key=True)
+    report = db.Column(db.String(20), nullable=False)  # financial, feed, milk
+    schedule = db.Column(db.String(20), nullable=False)  # daily, weekly, monthly
+    days = db.Column(db.Integer, nullable=False)
+    period_start = db.Column(db.Date, nullable=False)
+    period_end = db.Column(db.Date, nullable=False)
+    data = db.Column(db.Text, nullable=False)  # JSON chart data
+    chart = db.Column(db.LargeBinary, nullable=False)  # PNG
+    duration_ms = db.Column(db.Float, nullable=True)
+    generated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    __table_args__ = (
+        db.Index('ix_generated_reports_lookup', 'report', 'schedule', 'generated_at'),
+    )
+
+    def __repr__(self):
+        return f'GeneratedReport(report={self.report}, schedule={self.schedule}, generated_at={self.generated_at})'
+
+    def to_dict(self, include_chart=False):
+        result = {
+            'id': self.id,
+            'report': self.report,
+            'schedule': self.schedule,
+            'days': self.days,
+            'period_start': self.period_start.isoformat(),
+            'period_end': self.period_end.isoformat(),
+            'duration_ms': self.duration_ms,
+            'generated_at': self.generated_at.isoformat()
+        }
+        if include_chart:
+            result['data'] = json.loads(self.data)
+            result['chart'] = base64.b64encode(self.chart).decode('utf-8')
+        return result
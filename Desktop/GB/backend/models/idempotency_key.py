@@ -0,0 +1,22 @@
+from database import db
+from datetime import datetime
+
+class IdempotencyKey(db.Model):
+    __tablename__ = 'idempotency_keys'
+    
+    # Client keys are stored hashed so every row has the same small size
+    key_hash = db.Column(db.String(64), primary_key=True)
+    request_hash = db.Column(db.String(64), nullable=False)  # method, path and body of the first request
+    table_name = db.Column(db.String(50), nullable=False)
+    record_id = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'IdempotencyKey(table={self.table_name}, record_id={self.record_id})'
+
+    def to_dict(self):
+        return {
+            'table_name': self.table_name,
+            'record_id': self.record_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
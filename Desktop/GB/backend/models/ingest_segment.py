@@ -0,0 +1,22 @@
+from database import db
+from datetime import datetime
+
+class IngestSegment(db.Model):
+    __tablename__ = 'ingest_segments'
+    
+    # Log segments already written to the database, so a replay never inserts them twice
+    segment = db.Column(db.String(100), primary_key=True)
+    table_name = db.Column(db.String(50), nullable=False)
+    row_count = db.Column(db.Integer, nullable=False)
+    flushed_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'IngestSegment(segment={self.segment}, rows={self.row_count})'
+
+    def to_dict(self):
+        return {
+            'segment': self.segment,
+            'table_name': self.table_name,
+            'row_count': self.row_count,
+            'flushed_at': self.flushed_at.isoformat() if self.flushed_at else None
+        }
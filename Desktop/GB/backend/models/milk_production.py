@@ -10,10 +10,16 @@ class MilkProduction(db.Model):
     date_recorded = db.Column(db.Date, default=datetime.utcnow, nullable=False)
     quantity_liters = db.Column(db.Float, nullable=False)
     quality_score = db.Column(db.Float, nullable=True)
+    milking_session = db.Column(db.Integer, nullable=True)  # 1 for the first milking of the day, 2, ...
     notes = db.Column(db.Text, nullable=True)
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        # One record per cow per milking; records without a session (meter readings) are not limited
+        db.Index('uq_milk_production_cattle_session', 'cattle_id', 'date_recorded', 'milking_session', unique=True),
+    )
 
     def __repr__(self):
         return f'MilkProduction(id={self.id}, cattle_id={self.cattle_id}, date={self.date_recorded}, qty={self.quantity_liters})'
@@ -25,6 +31,7 @@ class MilkProduction(db.Model):
             'date_recorded': self.date_recorded.isoformat(),
             'quantity_liters': self.quantity_liters,
             'quality_score': self.quality_score,
+            'milking_session': self.milking_session,
             'notes': self.notes,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
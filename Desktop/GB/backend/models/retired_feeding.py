@@ -0,0 +1,21 @@
+from database import db
+from datetime import datetime
+
+class RetiredFeeding(db.Model):
+    __tablename__ = 'retired_feeding'
+    
+    # Feeding of deleted cattle: the feed stays consumed, so inventory.py rebuilds count it too
+    id = db.Column(db.Integer, primary_key=True)
+    cattle_id = db.Column(db.Integer, nullable=False)  # no foreign key, the animal is gone
+    feed_type = db.Column(db.String(100), nullable=False)
+    date_recorded = db.Column(db.Date, nullable=False)
+    quantity_kg = db.Column(db.Float, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=True)  # of the feeding records, for same-day stock counts
+    retired_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_retired_feeding_type_date', 'feed_type', 'date_recorded'),
+    )
+
+    def __repr__(self):
+        return f'RetiredFeeding(cattle_id={self.cattle_id}, feed_type={self.feed_type}, qty={self.quantity_kg})'
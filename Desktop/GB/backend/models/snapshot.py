@@ -0,0 +1,37 @@
+from database import db
+from datetime import datetime
+import json
+
+class Snapshot(db.Model):
+    __tablename__ = 'snapshots'
+
+    # Compressed SQLite copies of a farm's recent records built by snapshot.py for first-time sync
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.String(40), nullable=False, unique=True)
+    file_name = db.Column(db.String(100), nullable=False)  # in SNAPSHOT_DIR/<farm id>/
+    since = db.Column(db.Date, nullable=False)  # oldest record date included
+    event_id = db.Column(db.Integer, nullable=False)  # change events after this one are not in the snapshot
+    size_bytes = db.Column(db.Integer, nullable=False)  # compressed
+    raw_size_bytes = db.Column(db.Integer, nullable=False)
+    sha256 = db.Column(db.String(64), nullable=False)  # of the compressed file
+    row_counts = db.Column(db.Text, nullable=False)  # JSON {table: rows}
+    duration_ms = db.Column(db.Float, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+    def __repr__(self):
+        return f'Snapshot(version={self.version}, size_bytes={self.size_bytes})'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'version': self.version,
+            'since': self.since.isoformat(),
+            'event_id': self.event_id,
+            'size_bytes': self.size_bytes,
+            'raw_size_bytes': self.raw_size_bytes,
+            'sha256': self.sha256,
+            'row_counts': json.loads(self.row_counts),
+            'duration_ms': self.duration_ms,
+            'created_at': self.created_at.isoformat(),
+            'url': f'/api/snapshots/{self.version}.sqlite.gz'
+        }
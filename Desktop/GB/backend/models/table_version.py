@@ -0,0 +1,16 @@
+from database import db
+
+class TableVersion(db.Model):
+    __tablename__ = 'table_versions'
+    
+    table_name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'TableVersion(table={self.table_name}, version={self.version})'
+
+    def to_dict(self):
+        return {
+            'table_name': self.table_name,
+            'version': self.version
+        }
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Pedigree: sire and dam links, ancestry closure and inbreeding coefficients.
+
+``cattle_ancestry`` holds one row for every animal and each of its recorded
+ancestors, with the number of generations between them, so all ancestors or
+all descendants of an animal come from one indexed lookup. It is extended when
+cattle are inserted through the ORM, and the rows of an animal and its
+descendants are rebuilt when its sire or dam changes or a parent is deleted.
+
+Inbreeding coefficients are computed with the Meuwissen & Luo (1992) method
+over the animal's ancestors, all loaded with one closure query. The
+coefficient of every animal is stored on insert, and the same walk gives the
+expected coefficient of a planned mating's calf.
+
+Descendants' coefficients and cleared parent links are written with set-based
+updates, so each is announced as a ``bulk_update`` of cattle on the change
+event outbox, with the ids of the animals that changed.
+
+After upgrading an existing database, or loading cattle with raw SQL, build
+the closure and coefficients for the whole herd:
+
+    python pedigree.py --rebuild
+"""
+
+import argparse
+import heapq
+import os
+import sys
+import time
+from collections import defaultdict
+
+from sqlalchemy import event, inspect, select, insert, update, delete, literal, union_all, func, bindparam, or_
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models.cattle import Cattle
+from models.cattle_ancestry import CattleAncestry
+from tenancy import farm_engine, farm_ids
+from versioning import bump_table_versions
+from events import record_bulk_event
+
+ID_CHUNK = 5000  # ids per IN list
+EVENT_ID_LIMIT = 1000  # more changed cattle are announced by count only, for clients to reload
+
+cattle_table = Cattle.__table__
+ancestry_table = CattleAncestry.__table__
+
+class PedigreeError(ValueError):
+    """Raised for an impossible sire or dam; routes answer it with 400"""
+
+def _chunks(ids):
+    ids = list(ids)
+    for start in range(0, len(ids), ID_CHUNK):
+        yield ids[start:start + ID_CHUNK]
+
+def generations(parents):
+    """
+    {id: generation} for a {id: (sire_id, dam_id)} map, where every animal
+    comes after its parents in the map. Raises PedigreeError on a cycle.
+    """
+    children = defaultdict(list)
+    waiting = {}
+    for animal, links in parents.items():
+        known = [parent for parent in set(links) if parent is not None and parent in parents]
+        waiting[animal] = len(known)
+        for parent in known:
+            children[parent].append(animal)
+
+    generation = {}
+    ready = [animal for animal, count in waiting.items() if count == 0]
+    for animal in ready:
+        generation[animal] = 0
+    while ready:
+        animal = ready.pop()
+        for child in children[animal]:
+            generation[child] = max(generation.get(child, 0), generation[animal] + 1)
+            waiting[child] -= 1
+            if waiting[child] == 0:
+                ready.append(child)
+    if len(generation) < len(parents):
+        raise PedigreeError('The sire and dam links form a cycle: an animal would be its own ancestor')
+    return generation
+
+class Pedigree:
+    """Parents and inbreeding coefficients of a set of animals that includes all their ancestors"""
+
+    def __init__(self, parents, inbreeding=None):
+        self.parents = parents  # id -> (sire_id, dam_id)
+        self.inbreeding = {animal: f for animal, f in (inbreeding or {}).items() if f is not None}
+        self.generation = generations(parents)
+        self._variances = {}
+        self._matings = {}  # (sire_id, dam_id) -> F; full siblings share it
+
+    def coefficient(self, animal):
+        """F of an animal in the set"""
+        if animal not in self.inbreeding:
+            self.inbreeding[animal] = self.offspring_coefficient(*self.parents[animal])
+        return self.inbreeding[animal]
+
+    def _mendelian_variance(self, sire_id, dam_id):
+        # Unknown parents count as F = -1: 1 with no parent known, 0.75 - F/4 with one
+        return 0.5 - 0.25 * sum(self.coefficient(parent) if parent in self.parents else -1.0
+                                for parent in (sire_id, dam_id))
+
+    def _variance(self, animal):
+        if animal not in self._variances:
+            self._variances[animal] = self._mendelian_variance(*self.parents[animal])
+        return self._variances[animal]
+
+    def offspring_coefficient(self, sire_id, dam_id):
+        """F of a calf of these parents: its diagonal of the relationship matrix, less 1"""
+        if sire_id is None or dam_id is None:
+            return 0.0
+        if (sire_id, dam_id) in self._matings:
+            return self._matings[sire_id, dam_id]
+        diagonal = self._mendelian_variance(sire_id, dam_id)
+        weights = defaultdict(float)
+        queue = []
+        for parent in (sire_id, dam_id):
+            if parent in self.parents:
+                if parent not in weights:
+                    heapq.heappush(queue, (-self.generation[parent], -parent))
+                weights[parent] += 0.5
+
+        # Youngest first, so an ancestor is taken once all its paths to the calf are summed
+        while queue:
+            _, animal = heapq.heappop(queue)
+            weight = weights.pop(-animal)
+            diagonal += weight * weight * self._variance(-animal)
+            for parent in self.parents[-animal]:
+                if parent is not None and parent in self.parents:
+                    if parent not in weights:
+                        heapq.heappush(queue, (-self.generation[parent], -parent))
+                    weights[parent] += 0.5 * weight
+        self._matings[sire_id, dam_id] = max(diagonal - 1.0, 0.0)
+        return self._matings[sire_id, dam_id]
+
+def load_pedigree(connection, cattle_ids=None):
+    """Pedigree of the given animals (the whole herd when None) and all their recorded ancestors, in one query"""
+    query = select(cattle_table.c.id, cattle_table.c.sire_id, cattle_table.c.dam_id, cattle_table.c.inbreeding_coefficient)
+    if cattle_ids is not None:
+        cattle_ids = [animal for animal in cattle_ids if animal is not None]
+        if not cattle_ids:
+            return Pedigree({})
+        ancestors = select(ancestry_table.c.ancestor_id).where(ancestry_table.c.descendant_id.in_(cattle_ids))
+        query = query.where(or_(cattle_table.c.id.in_(cattle_ids), cattle_table.c.id.in_(ancestors)))
+    rows = connection.execute(query).all()
+    return Pedigree({row.id: (row.sire_id, row.dam_id) for row in rows},
+                    {row.id: row.inbreeding_coefficient for row in rows})
+
+def mating_coefficient(connection, sire_id, dam_id):
+    """Expected inbreeding coefficient of a calf of this sire and dam"""
+    return load_pedigree(connection, [sire_id, dam_id]).offspring_coefficient(sire_id, dam_id)
+
+def _ancestry_rows(cattle_ids):
+    """SELECT of (ancestor_id, descendant_id, depth) for these cattle from their parents' rows"""
+    cattle = cattle_table.alias('child')
+    links = []
+    for parent in (cattle.c.sire_id, cattle.c.dam_id):
+        links.append(select(parent.label('ancestor_id'), cattle.c.id.label('descendant_id'), literal(1).label('depth'))
+                     .where(cattle.c.id.in_(cattle_ids), parent.isnot(None)))
+        links.append(select(ancestry_table.c.ancestor_id, cattle.c.id, ancestry_table.c.depth + 1)
+                     .join(ancestry_table, ancestry_table.c.descendant_id == parent)
+                     .where(cattle.c.id.in_(cattle_ids)))
+    paths = union_all(*links).subquery()
+    # An ancestor reached through both parents (inbreeding) is stored once, at its nearest depth
+    return (select(paths.c.ancestor_id, paths.c.descendant_id, func.min(paths.c.depth))
+            .group_by(paths.c.ancestor_id, paths.c.descendant_id))
+
+def add_ancestry(connection, cattle_ids):
+    """Closure rows of new cattle whose parents' rows are in place"""
+    for chunk in _chunks(cattle_ids):
+        connection.execute(insert(ancestry_table).from_select(
+            ['ancestor_id', 'descendant_id', 'depth'], _ancestry_rows(chunk)
+        ))
+
+def _announce(connection, cattle_ids):
+    """Change event for cattle updated around the ORM"""
+    data = {'count': len(cattle_ids)}
+    if len(cattle_ids) <= EVENT_ID_LIMIT:
+        data['ids'] = sorted(cattle_ids)
+    record_bulk_event(connection, cattle_table.name, 'bulk_update', data)
+
+def _store_coefficients(connection, coefficients):
+    if coefficients:
+        connection.execute(
+            update(cattle_table).where(cattle_table.c.id == bindparam('cattle_id'))
+            # A pedigree correction is not an edit of the descendants; keep updated_at as it was
+            .values(inbreeding_coefficient=bindparam('coefficient'), updated_at=cattle_table.c.updated_at),
+            [{'cattle_id': animal, 'coefficient': f} for animal, f in coefficients.items()]
+        )
+        _announce(connection, coefficients)
+
+def relink(connection, cattle_ids, whole_herd=False):
+    """Rebuild the closure rows and coefficients of these cattle and all their descendants"""
+    affected = set(cattle_ids)
+    if whole_herd:
+        connection.execute(delete(ancestry_table))
+    else:
+        for chunk in _chunks(cattle_ids):
+            affected.update(connection.execute(
+                select(ancestry_table.c.descendant_id).where(ancestry_table.c.ancestor_id.in_(chunk))
+            ).scalars())
+        for chunk in _chunks(affected):
+            connection.execute(delete(ancestry_table).where(ancestry_table.c.descendant_id.in_(chunk)))
+
+    parents = {}
+    for chunk in _chunks(affected):
+        parents.update((row.id, (row.sire_id, row.dam_id)) for row in connection.execute(
+            select(cattle_table.c.id, cattle_table.c.sire_id, cattle_table.c.dam_id).where(cattle_table.c.id.in_(chunk))
+        ))
+    by_generation = defaultdict(list)
+    for animal, generation in generations(parents).items():
+        by_generation[generation].append(animal)
+    for generation in sorted(by_generation):
+        add_ancestry(connection, sorted(by_generation[generation]))
+
+    # Walk everything from the oldest generation down, so each animal's parents are already known
+    pedigree = load_pedigree(connection, None if whole_herd else affected)
+    stored = {animal: pedigree.inbreeding.pop(animal, None) for animal in affected}
+    coefficients = {}
+    for generation in sorted(by_generation):
+        for animal in by_generation[generation]:
+            coefficients[animal] = pedigree.coefficient(animal)
+    # Only write (and announce) the coefficients that moved
+    _store_coefficients(connection, {
+        animal: f for animal, f in coefficients.items() if stored[animal] is None or abs(stored[animal] - f) > 1e-12
+    })
+    bump_table_versions(connection, [cattle_table.name, ancestry_table.name])
+    return len(affected)
+
+def detach(connection, cattle_ids):
+    """
+    Before deleting cattle: drop their closure rows, clear the sire or dam of
+    their surviving calves and rebuild those calves' ancestry.
+    """
+    removed = set(cattle_ids)
+    orphaned = set()
+    for chunk in _chunks(removed):
+        connection.execute(delete(ancestry_table).where(
+            or_(ancestry_table.c.ancestor_id.in_(chunk), ancestry_table.c.descendant_id.in_(chunk))
+        ))
+        for parent in (cattle_table.c.sire_id, cattle_table.c.dam_id):
+            calves = connection.execute(select(cattle_table.c.id).where(parent.in_(chunk))).scalars().all()
+            if calves:
+                connection.execute(update(cattle_table).where(parent.in_(chunk)).values(
+                    **{parent.name: None}, updated_at=cattle_table.c.updated_at
+                ))
+                orphaned.update(calves)
+    orphaned -= removed
+    if orphaned:
+        _announce(connection, orphaned)
+        relink(connection, orphaned)
+    return len(orphaned)
+
+def check_parents(connection, cattle, sire_id, dam_id):
+    """Raise PedigreeError unless the sire and dam can be this animal's parents"""
+    for role, parent_id, gender in (('sire', sire_id, 'Male'), ('dam', dam_id, 'Female')):
+        if parent_id is None:
+            continue
+        parent = connection.execute(
+            select(cattle_table.c.gender, cattle_table.c.date_of_birth).where(cattle_table.c.id == parent_id)
+        ).first()
+        if parent is None:
+            raise PedigreeError(f'No cattle with id {parent_id} to be the {role}')
+        if parent.gender != gender:
+            raise PedigreeError(f'The {role} must be {gender}')
+        if cattle.date_of_birth is not None and parent.date_of_birth >= cattle.date_of_birth:
+            raise PedigreeError(f'The {role} must be born before the animal')
+        if cattle.id is not None and (parent_id == cattle.id or connection.execute(
+            select(ancestry_table.c.depth).where(ancestry_table.c.ancestor_id == cattle.id,
+                                                 ancestry_table.c.descendant_id == parent_id)
+        ).first()):
+            raise PedigreeError(f'The {role} cannot be the animal itself or one of its descendants')
+
+def _parents_changed(target):
+    attrs = inspect(target).attrs
+    return attrs.sire_id.history.has_changes() or attrs.dam_id.history.has_changes()
+
+def _before_insert(mapper, connection, target):
+    target.inbreeding_coefficient = mating_coefficient(connection, target.sire_id, target.dam_id)
+
+def _after_insert(mapper, connection, target):
+    if target.sire_id is not None or target.dam_id is not None:
+        add_ancestry(connection, [target.id])
+        bump_table_versions(connection, [ancestry_table.name])
+
+def _before_update(mapper, connection, target):
+    if _parents_changed(target):
+        target.inbreeding_coefficient = mating_coefficient(connection, target.sire_id, target.dam_id)
+
+def _after_update(mapper, connection, target):
+    if _parents_changed(target):
+        relink(connection, [target.id])
+
+def _before_delete(mapper, connection, target):
+    detach(connection, [target.id])
+
+def register_pedigree_events():
+    """Keep the closure and coefficients current when cattle are saved through the ORM"""
+    if event.contains(Cattle, 'before_insert', _before_insert):
+        return
+    event.listen(Cattle, 'before_insert', _before_insert)
+    event.listen(Cattle, 'after_insert', _after_insert)
+    event.listen(Cattle, 'before_update', _before_update)
+    event.listen(Cattle, 'after_update', _after_update)
+    event.listen(Cattle, 'before_delete', _before_delete)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rebuild', action='store_true', required=True,
+                        help='rebuild the closure and coefficients of the whole herd')
+    parser.parse_args()
+
+    from app import app
+
+    with app.app_context():
+        for farm_id in farm_ids():
+            started = time.perf_counter()
+            with farm_engine(farm_id).begin() as connection:
+                cattle_ids = connection.execute(select(cattle_table.c.id)).scalars().all()
+                relink(connection, cattle_ids, whole_herd=True)
+                links = connection.execute(select(func.count()).select_from(ancestry_table)).scalar()
+            print(f"✅ Farm {farm_id}: pedigree of {len(cattle_ids):,} cattle rebuilt "
+                  f"({links:,} ancestor links) in {time.perf_counter() - started:.1f}s")
+
+if __name__ == '__main__':
+    main()
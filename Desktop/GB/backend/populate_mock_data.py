@@ -18,6 +18,7 @@ from models.milk_production import MilkProduction
 from models.feeding import Feeding
 from models.expenses import Expenses
 from models.revenue import Revenue
+from archive import drop_archive_partitions
 
 # Mock data constants
 BREEDS = ['Holstein', 'Jersey', 'Angus', 'Hereford', 'Brahman', 'Simmental', 'Charolais']
@@ -222,6 +223,7 @@ def populate_database():
         try:
             # Clear existing data
             print("Clearing existing data...")
+            drop_archive_partitions()
             db.drop_all()
             db.create_all()
             
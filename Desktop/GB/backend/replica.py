@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Read-replica routing.
+
+Each farm may have a replica, configured like the farm databases:
+
+    REPLICA_DATABASES=main=sqlite:////var/lib/gb/replica.db,north=postgresql://.../north
+
+Views decorated with ``replica_read`` send their queries to the replica; writes
+(and everything else) stay on the primary. A heartbeat timestamp is written to
+the primary's ``table_versions`` every ``REPLICA_SNAPSHOT_INTERVAL`` seconds, so
+the replica's copy of it tells how far behind the replica is. A read falls back
+to the primary when the replica lags more than ``REPLICA_MAX_LAG`` seconds or has
+not yet caught up with the client's own last write (sent back by the client in
+the ``last_write`` cookie or ``X-Last-Write`` header).
+
+When both the primary and the replica are SQLite files the replica is refreshed
+here with the SQLite online backup API, copying only when the primary's table
+versions changed since the last copy; other replicas are expected to be kept
+in sync by the database itself (e.g. PostgreSQL streaming replication).
+
+    python replica.py --snapshot
+"""
+
+import argparse
+import fcntl
+import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import request, current_app
+from sqlalchemy import select, update, insert
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import db, current_read_replica, REPLICA_BIND_PREFIX
+from models.table_version import TableVersion
+from tenancy import farm_ids, farm_bind_key, FARM_BIND_PREFIX
+
+LAST_WRITE_COOKIE = 'last_write'
+LAST_WRITE_HEADER = 'X-Last-Write'
+HEARTBEAT = '_replica_heartbeat'  # table_versions row whose version is a ms timestamp
+HEARTBEAT_CACHE_SECONDS = 1.0
+WRITE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+version_table = TableVersion.__table__
+
+_heartbeats = {}  # replica bind key -> (checked at, heartbeat ms or None)
+_stats_lock = threading.Lock()
+_init_lock = threading.Lock()
+stats = {
+    'replica_reads': 0,
+    'primary_reads_own_write': 0,
+    'primary_reads_lagging': 0,
+    'primary_reads_unavailable': 0,
+}
+
+def now_ms():
+    return int(time.time() * 1000)
+
+def replica_binds(replica_databases, default_farm_id):
+    """SQLALCHEMY_BINDS entries for the configured replicas"""
+    binds = {}
+    for farm_id, url in replica_databases.items():
+        primary_key = None if farm_id == default_farm_id else FARM_BIND_PREFIX + farm_id
+        binds[replica_bind_key(primary_key)] = url
+    return binds
+
+def replica_bind_key(primary_bind_key):
+    return REPLICA_BIND_PREFIX + (primary_bind_key or '')
+
+def replica_engine(farm_id):
+    return db.engines.get(replica_bind_key(farm_bind_key(farm_id)))
+
+def _count(name):
+    with _stats_lock:
+        stats[name] += 1
+
+def read_heartbeat(connection):
+    return connection.execute(
+        select(version_table.c.version).where(version_table.c.table_name == HEARTBEAT)
+    ).scalar()
+
+def write_heartbeat(connection, stamp=None):
+    stamp = stamp or now_ms()
+    result = connection.execute(
+        update(version_table).where(version_table.c.table_name == HEARTBEAT).values(version=stamp)
+    )
+    if not result.rowcount:
+        connection.execute(insert(version_table).values(table_name=HEARTBEAT, version=stamp))
+    return stamp
+
+def data_versions(connection):
+    """Table versions without the heartbeat row"""
+    rows = connection.execute(select(version_table.c.table_name, version_table.c.version)).all()
+    return {name: version for name, version in rows if name != HEARTBEAT}
+
+def replica_heartbeat(bind_key, engine):
+    """Heartbeat last replicated to a replica, cached briefly; None when unreadable"""
+    checked_at, heartbeat = _heartbeats.get(bind_key, (0, None))
+    if time.monotonic() - checked_at < HEARTBEAT_CACHE_SECONDS:
+        return heartbeat
+    try:
+        with engine.connect() as connection:
+            heartbeat = read_heartbeat(connection)
+    except Exception:
+        heartbeat = None
+    # A stale cached value is older, so it can only send more reads to the primary
+    _heartbeats[bind_key] = (time.monotonic(), heartbeat)
+    return heartbeat
+
+def route_read(engines, primary_bind_key, last_write):
+    """Replica engine to serve a read from, or None to use the primary"""
+    bind_key = replica_bind_key(primary_bind_key)
+    engine = engines.get(bind_key)
+    if engine is None:
+        return None
+
+    heartbeat = replica_heartbeat(bind_key, engine)
+    if heartbeat is None:
+        _count('primary_reads_unavailable')
+        return None
+    if heartbeat < last_write:
+        _count('primary_reads_own_write')
+        return None
+    if now_ms() - heartbeat > current_app.config['REPLICA_MAX_LAG'] * 1000:
+        _count('primary_reads_lagging')
+        return None
+
+    _count('replica_reads')
+    return engine
+
+def _client_last_write():
+    values = [request.cookies.get(LAST_WRITE_COOKIE), request.headers.get(LAST_WRITE_HEADER)]
+    return max([int(value) for value in values if value and value.isdigit()] or [0])
+
+def replica_read(view):
+    """Serve a read-only view from the replica when it is fresh enough"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = current_read_replica.set(_client_last_write())
+        try:
+            return view(*args, **kwargs)
+        finally:
+            current_read_replica.reset(token)
+    return wrapper
+
+def _sqlite_path(engine):
+    url = engine.url
+    if url.get_backend_name() != 'sqlite' or url.database in (None, '', ':memory:'):
+        return None
+    return url.database
+
+def snapshot(primary, replica):
+    """
+    Write a heartbeat to the primary and copy the whole SQLite primary into the
+    replica file. Returns the heartbeat now visible on the replica.
+    """
+    source = _sqlite_path(primary)
+    target = _sqlite_path(replica)
+
+    with primary.begin() as connection:
+        stamp = write_heartbeat(connection)
+
+    source_connection = sqlite3.connect(source, timeout=30)
+    # WAL lets the backup read the primary without blocking writers (a no-op once set)
+    source_connection.execute('PRAGMA journal_mode=WAL')
+    target_connection = sqlite3.connect(target, timeout=30)
+    try:
+        # Readers of the replica see either the previous or the new copy
+        source_connection.backup(target_connection)
+    finally:
+        target_connection.close()
+        source_connection.close()
+    return stamp
+
+@contextmanager
+def _snapshot_lock(path):
+    """Only one process refreshes a given replica file at a time"""
+    with open(path + '.lock', 'a') as lock_file:
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        yield True
+
+class ReplicaMaintainer:
+    """Background heartbeat writer and SQLite snapshotter for every farm replica"""
+
+    def __init__(self, app, interval):
+        self.app = app
+        self.interval = interval
+        self.last_refresh = {}  # farm_id -> {'heartbeat': ms, 'duration_ms': ..., 'copied': bool}
+        self._copied_versions = {}  # farm_id -> primary table versions in the last copy
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='replica-maintainer', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopping.set()
+
+    def refresh(self, farm_id):
+        engine = replica_engine(farm_id)
+        if engine is None:
+            return None
+        primary = db.engines[farm_bind_key(farm_id, self.app)]
+        started = time.perf_counter()
+        copied = False
+
+        if _sqlite_path(primary) and _sqlite_path(engine):
+            with _snapshot_lock(_sqlite_path(engine)) as acquired:
+                if not acquired:
+                    return None
+                # Taken before reading versions: any write committed earlier shows up in them
+                stamp = now_ms()
+                with primary.connect() as connection:
+                    versions = data_versions(connection)
+                if versions == self._copied_versions.get(farm_id):
+                    # Nothing written since the last copy, so the replica is current as of now
+                    with engine.begin() as connection:
+                        heartbeat = write_heartbeat(connection, stamp)
+                else:
+                    heartbeat = snapshot(primary, engine)
+                    self._copied_versions[farm_id] = versions
+                    copied = True
+        else:
+            with primary.begin() as connection:
+                heartbeat = write_heartbeat(connection)
+
+        self.last_refresh[farm_id] = {
+            'heartbeat': heartbeat,
+            'duration_ms': round((time.perf_counter() - started) * 1000, 1),
+            'copied': copied,
+        }
+        return heartbeat
+
+    def _run(self):
+        while True:
+            with self.app.app_context():
+                for farm_id in farm_ids(self.app):
+                    try:
+                        self.refresh(farm_id)
+                    except Exception as e:
+                        self.app.logger.error(f'Replica refresh failed for farm {farm_id}: {e}')
+            if self._stopping.wait(self.interval):
+                return
+
+def replica_status(app):
+    """Lag metrics for every farm replica plus routing counters"""
+    maintainer = app.extensions.get('replica_maintainer')
+    farms = {}
+    for farm_id in farm_ids(app):
+        engine = replica_engine(farm_id)
+        if engine is None:
+            continue
+        primary = db.engines[farm_bind_key(farm_id, app)]
+        with primary.connect() as connection:
+            primary_versions = dict(connection.execute(select(version_table.c.table_name, version_table.c.version)).all())
+        try:
+            with engine.connect() as connection:
+                replica_versions = dict(connection.execute(select(version_table.c.table_name, version_table.c.version)).all())
+        except Exception as e:
+            farms[farm_id] = {'available': False, 'error': str(e)}
+            continue
+
+        heartbeat = replica_versions.get(HEARTBEAT)
+        farms[farm_id] = {
+            'available': heartbeat is not None,
+            'lag_seconds': round((now_ms() - heartbeat) / 1000, 3) if heartbeat else None,
+            'stale_tables': sorted(
+                name for name, version in primary_versions.items()
+                if name != HEARTBEAT and replica_versions.get(name) != version
+            ),
+            'last_refresh': maintainer.last_refresh.get(farm_id) if maintainer else None,
+        }
+
+    with _stats_lock:
+        routing = dict(stats)
+    return {'replicas': farms, 'routing': routing, 'max_lag_seconds': app.config['REPLICA_MAX_LAG']}
+
+def init_replicas(app):
+    """Remember each client's last write and keep the replicas refreshed"""
+    if not app.config['REPLICA_DATABASES']:
+        return
+
+    @app.before_request
+    def start_maintainer():
+        if 'replica_maintainer' in app.extensions or app.config['REPLICA_SNAPSHOT_INTERVAL'] <= 0:
+            return
+        with _init_lock:
+            if 'replica_maintainer' not in app.extensions:
+                app.extensions['replica_maintainer'] = ReplicaMaintainer(
+                    app, app.config['REPLICA_SNAPSHOT_INTERVAL']
+                ).start()
+
+    @app.after_request
+    def remember_write(response):
+        if request.method in WRITE_METHODS and response.status_code < 400:
+            stamp = str(now_ms())
+            response.set_cookie(LAST_WRITE_COOKIE, stamp, max_age=int(app.config['REPLICA_MAX_LAG']) + 60, httponly=True)
+            response.headers[LAST_WRITE_HEADER] = stamp
+        return response
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--snapshot', action='store_true', help='refresh every replica once')
+    args = parser.parse_args()
+
+    if not args.snapshot:
+        parser.print_help()
+        return
+
+    from app import app
+
+    maintainer = ReplicaMaintainer(app, app.config['REPLICA_SNAPSHOT_INTERVAL'])
+    with app.app_context():
+        for farm_id in farm_ids(app):
+            if maintainer.refresh(farm_id) is not None:
+                print(f"✅ Farm {farm_id}: replica refreshed in {maintainer.last_refresh[farm_id]['duration_ms']}ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Pre-generated report packs.
+
+Renders the financial, feed and milk analytics charts ahead of time and stores
+their data and PNG in ``generated_reports`` on each farm's database, so the
+``/api/reports`` endpoints serve them without running matplotlib. Run nightly
+from cron; each schedule only renders when it is due (or has never run):
+
+    daily    every night, last 30 days
+    weekly   on Mondays, last 90 days
+    monthly  on the 1st, last 365 days
+
+A schedule is due once a new period has started since its last pack, so a
+night missed on a Monday or a 1st is caught up by the next run.
+
+    python reports.py
+    python reports.py --schedule monthly --report financial --force
+"""
+
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import delete, select
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import db
+from models.generated_report import GeneratedReport
+from tenancy import FARM_HEADER, farm_ids, use_farm
+
+# Report name -> analytics endpoint that renders it
+REPORTS = {
+    'financial': '/api/analytics/financial-overview',
+    'feed': '/api/analytics/feeding-cost-analysis',
+    'milk': '/api/analytics/milk-production-chart',
+}
+
+# 'period' gives the first day of the period that contains a date
+SCHEDULES = {
+    'daily': {'days': 30, 'period': lambda day: day},
+    'weekly': {'days': 90, 'period': lambda day: day - timedelta(days=day.weekday())},
+    'monthly': {'days': 365, 'period': lambda day: day.replace(day=1)},
+}
+
+REPORT_HISTORY = 14  # generated reports kept per report and schedule
+
+def latest_report(report, schedule):
+    return GeneratedReport.query.filter_by(report=report, schedule=schedule).order_by(
+        GeneratedReport.generated_at.desc(), GeneratedReport.id.desc()
+    ).first()
+
+def period_due(schedule, last_period_end, today):
+    """Whether a period of the schedule has started since the last pack was generated"""
+    return last_period_end < SCHEDULES[schedule]['period'](today)
+
+def is_due(report, schedule, today):
+    latest = latest_report(report, schedule)
+    return latest is None or period_due(schedule, latest.period_end, today)
+
+def prune_reports(report, schedule):
+    keep = select(GeneratedReport.id).filter_by(report=report, schedule=schedule).order_by(
+        GeneratedReport.generated_at.desc(), GeneratedReport.id.desc()
+    ).limit(REPORT_HISTORY)
+    db.session.execute(
+        delete(GeneratedReport).where(
+            GeneratedReport.report == report,
+            GeneratedReport.schedule == schedule,
+            GeneratedReport.id.notin_(keep.scalar_subquery())
+        )
+    )
+
+def render_report(client, farm_id, report, schedule):
+    """Render one report through its analytics endpoint; None when there is no data"""
+    response = client.get(REPORTS[report], query_string={'days': SCHEDULES[schedule]['days']},
+                          headers={FARM_HEADER: farm_id})
+    if response.status_code == 404:
+        return None
+    payload = response.get_json()
+    if response.status_code != 200:
+        raise RuntimeError(payload.get('error', f'HTTP {response.status_code}'))
+    return payload
+
+def store_report(report, schedule, payload, today, duration_ms):
+    days = SCHEDULES[schedule]['days']
+    record = GeneratedReport(
+        report=report,
+        schedule=schedule,
+        days=days,
+        period_start=today - timedelta(days=days),
+        period_end=today,
+        data=json.dumps(payload['data']),
+        chart=base64.b64decode(payload['chart']),
+        duration_ms=duration_ms
+    )
+    db.session.add(record)
+    prune_reports(report, schedule)
+    db.session.commit()
+    return record.to_dict()
+
+def run_reports(app, farms=None, reports=None, schedules=None, force=False, today=None):
+    """Generate every due report; returns [(farm_id, report, schedule, report dict or None)]"""
+    today = today or date.today()
+    client = app.test_client()
+    generated = []
+
+    for farm_id in farms or farm_ids(app):
+        with app.app_context(), use_farm(farm_id, app):
+            due = [
+                (report, schedule)
+                for schedule in schedules or SCHEDULES
+                for report in reports or REPORTS
+                if force or is_due(report, schedule, today)
+            ]
+
+        for report, schedule in due:
+            # Rendered through the app like any other request, outside our own session
+            started = time.perf_counter()
+            payload = render_report(client, farm_id, report, schedule)
+            record = None
+            if payload is not None:
+                duration_ms = round((time.perf_counter() - started) * 1000, 1)
+                with app.app_context(), use_farm(farm_id, app):
+                    record = store_report(report, schedule, payload, today, duration_ms)
+            generated.append((farm_id, report, schedule, record))
+
+    return generated
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--schedule', choices=list(SCHEDULES), action='append', help='only these schedules')
+    parser.add_argument('--report', choices=list(REPORTS), action='append', help='only these reports')
+    parser.add_argument('--farm', action='append', help='only these farms')
+    parser.add_argument('--force', action='store_true', help='render even when not due')
+    args = parser.parse_args()
+
+    from app import app
+
+    started = time.perf_counter()
+    generated = run_reports(app, args.farm, args.report, args.schedule, args.force)
+
+    if not generated:
+        print("No reports due.")
+    for farm_id, report, schedule, record in generated:
+        if record is None:
+            print(f"  - Farm {farm_id}: {schedule} {report} skipped, no data")
+        else:
+            print(f"  - Farm {farm_id}: {schedule} {report} rendered in {record['duration_ms']}ms")
+    print(f"✅ Reports generated in {time.perf_counter() - started:.1f}s")
+
+if __name__ == '__main__':
+    main()
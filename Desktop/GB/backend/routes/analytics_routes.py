@@ -12,44 +12,64 @@ import matplotlib.pyplot as plt
 import io
 import base64
 import pandas as pd
-from sqlalchemy import func
+from sqlalchemy import func, and_, distinct
+from archive import with_archive
+from versioning import conditional_get
+from replica import replica_read
+from downsample import GranularityError, MAX_CHART_POINTS, resolve_granularity, time_bucket, bucket_start, as_date, lttb
 
 analytics_bp = Blueprint('analytics', __name__)
 
 @analytics_bp.route('/milk-production-chart', methods=['GET'])
+@replica_read
 def milk_production_chart():
     try:
         cattle_id = request.args.get('cattle_id')
         days = int(request.args.get('days', 30))
         chart_type = request.args.get('chart_type', 'line')  # line, bar
+        granularity = resolve_granularity(request.args.get('granularity', 'auto'), days)
+        max_points = request.args.get('max_points', MAX_CHART_POINTS, type=int)
+        if max_points is None or max_points < 3:
+            # LTTB keeps the first and last points and needs one bucket between them
+            return jsonify({'error': 'max_points must be an integer of at least 3'}), 400
         
-        start_date = datetime.now().date() - timedelta(days=days)
+        # A partial first bucket would chart as a dip
+        start_date = bucket_start(datetime.now().date() - timedelta(days=days), granularity)
+        records = with_archive(MilkProduction, start_date)
+        bucket = time_bucket(records.date_recorded, granularity).label('bucket')
         
         query = db.session.query(
-            MilkProduction.date_recorded,
-            func.sum(MilkProduction.quantity_liters).label('total_liters')
-        ).filter(MilkProduction.date_recorded >= start_date)
+            bucket,
+            func.sum(records.quantity_liters).label('total_liters')
+        ).filter(records.date_recorded >= start_date)
         
         if cattle_id:
-            query = query.filter(MilkProduction.cattle_id == cattle_id)
+            query = query.filter(records.cattle_id == cattle_id)
         
-        results = query.group_by(MilkProduction.date_recorded).order_by(MilkProduction.date_recorded).all()
+        results = query.group_by(bucket).order_by(bucket).all()
         
         if not results:
             return jsonify({'error': 'No data found for the specified period'}), 404
         
         # Prepare data
-        dates = [result.date_recorded for result in results]
+        dates = [as_date(result.bucket) for result in results]
         quantities = [float(result.total_liters) for result in results]
         
+        # Still too many points (e.g. granularity=day over years): keep the shape, not every point
+        if len(dates) > max_points:
+            keep = lttb([d.toordinal() for d in dates], quantities, max_points)
+            dates = [dates[i] for i in keep]
+            quantities = [quantities[i] for i in keep]
+        
         # Create plot
         plt.figure(figsize=(12, 6))
         if chart_type == 'bar':
             plt.bar(dates, quantities, color='skyblue')
         else:
-            plt.plot(dates, quantities, marker='o', linewidth=2, markersize=6)
+            plt.plot(dates, quantities, marker='o' if len(dates) <= 60 else None, linewidth=2, markersize=6)
         
-        plt.title(f'Milk Production Over Last {days} Days', fontsize=16)
+        per = '' if granularity == 'day' else f' (per {granularity})'
+        plt.title(f'Milk Production Over Last {days} Days{per}', fontsize=16)
         plt.xlabel('Date', fontsize=12)
         plt.ylabel('Liters', fontsize=12)
         plt.xticks(rotation=45)
@@ -67,28 +87,33 @@ def milk_production_chart():
             'chart': img_base64,
             'data': {
                 'dates': [d.isoformat() for d in dates],
-                'quantities': quantities
+                'quantities': quantities,
+                'granularity': granularity
             }
         }), 200
         
+    except GranularityError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         plt.close()
         return jsonify({'error': str(e)}), 500
 
 @analytics_bp.route('/cattle-comparison', methods=['GET'])
+@replica_read
 def cattle_comparison():
     try:
         days = int(request.args.get('days', 30))
         start_date = datetime.now().date() - timedelta(days=days)
+        records = with_archive(MilkProduction, start_date)
         
         # Get milk production by cattle
         query = db.session.query(
             Cattle.name,
             Cattle.tag_number,
-            func.sum(MilkProduction.quantity_liters).label('total_liters'),
-            func.avg(MilkProduction.quantity_liters).label('avg_daily')
-        ).join(MilkProduction).filter(
-            MilkProduction.date_recorded >= start_date
+            func.sum(records.quantity_liters).label('total_liters'),
+            func.avg(records.quantity_liters).label('avg_daily')
+        ).join(records, records.cattle_id == Cattle.id).filter(
+            records.date_recorded >= start_date
         ).group_by(Cattle.id, Cattle.name, Cattle.tag_number).all()
         
         if not query:
@@ -137,6 +162,7 @@ def cattle_comparison():
         return jsonify({'error': str(e)}), 500
 
 @analytics_bp.route('/financial-overview', methods=['GET'])
+@replica_read
 def financial_overview():
     try:
         days = int(request.args.get('days', 30))
@@ -203,22 +229,24 @@ def financial_overview():
         return jsonify({'error': str(e)}), 500
 
 @analytics_bp.route('/feeding-cost-analysis', methods=['GET'])
+@replica_read
 def feeding_cost_analysis():
     try:
         cattle_id = request.args.get('cattle_id')
         days = int(request.args.get('days', 30))
         start_date = datetime.now().date() - timedelta(days=days)
+        records = with_archive(Feeding, start_date)
         
         query = db.session.query(
-            Feeding.feed_type,
-            func.sum(Feeding.quantity_kg).label('total_quantity'),
-            func.sum(Feeding.total_cost).label('total_cost')
-        ).filter(Feeding.date_recorded >= start_date)
+            records.feed_type,
+            func.sum(records.quantity_kg).label('total_quantity'),
+            func.sum(records.total_cost).label('total_cost')
+        ).filter(records.date_recorded >= start_date)
         
         if cattle_id:
-            query = query.filter(Feeding.cattle_id == cattle_id)
+            query = query.filter(records.cattle_id == cattle_id)
         
-        results = query.group_by(Feeding.feed_type).all()
+        results = query.group_by(records.feed_type).all()
         
         if not results:
             return jsonify({'error': 'No feeding data found for the specified period'}), 404
@@ -264,3 +292,59 @@ def feeding_cost_analysis():
     except Exception as e:
         plt.close()
         return jsonify({'error': str(e)}), 500
+
+def cohort_yield(*group_columns, days=30):
+    """
+    Herd size and milk yield grouped by cattle columns, in one query.
+    Animals without milk in the window still count towards head_count.
+    """
+    start_date = datetime.now().date() - timedelta(days=days)
+    records = with_archive(MilkProduction, start_date)
+    
+    results = db.session.query(
+        *group_columns,
+        func.count(distinct(Cattle.id)).label('head_count'),
+        func.count(distinct(records.cattle_id)).label('milking_count'),
+        func.coalesce(func.sum(records.quantity_liters), 0).label('total_liters')
+    ).outerjoin(
+        records, and_(records.cattle_id == Cattle.id, records.date_recorded >= start_date)
+    ).filter(
+        Cattle.current_status.notin_(['Sold', 'Deceased'])
+    ).group_by(*group_columns).order_by(
+        # Youngest age band first within each group
+        *group_columns[:-1], func.max(Cattle.birth_month).desc()
+    ).all()
+    
+    cohorts = []
+    for result in results:
+        cohort = {column.key: getattr(result, column.key) for column in group_columns}
+        total = float(result.total_liters)
+        cohort.update({
+            'head_count': result.head_count,
+            'milking_count': result.milking_count,
+            'total_liters': round(total, 2),
+            'liters_per_milking_head_day': round(total / result.milking_count / days, 2) if result.milking_count else 0,
+            'period_days': days
+        })
+        cohorts.append(cohort)
+    return cohorts
+
+@analytics_bp.route('/cohorts/yield', methods=['GET'])
+@replica_read
+@conditional_get('cattle', 'milk_production', daily=True)
+def cohort_yield_by_age():
+    try:
+        days = int(request.args.get('days', 30))
+        return jsonify(cohort_yield(Cattle.age_band, days=days)), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@analytics_bp.route('/cohorts/breed-age', methods=['GET'])
+@replica_read
+@conditional_get('cattle', 'milk_production', daily=True)
+def cohort_yield_by_breed_and_age():
+    try:
+        days = int(request.args.get('days', 30))
+        return jsonify(cohort_yield(Cattle.breed, Cattle.age_band, days=days)), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
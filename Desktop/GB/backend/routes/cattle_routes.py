@@ -1,15 +1,89 @@
 from flask import Blueprint, request, jsonify
 from database import db
+from versioning import conditional_get
 from models.cattle import Cattle
+from models.milk_production import MilkProduction
+from models.feeding import Feeding
 from datetime import datetime
+from sqlalchemy import func, and_, or_, select, update, delete
+from bulk import BulkRequestError, bulk_conditions, bulk_changes
+from health_risk import get_risk_scores
+from replica import replica_read
+from inventory import retire_cattle_feeding
+from pedigree import PedigreeError, check_parents, detach
+from archive import delete_archived_records
 
 cattle_bp = Blueprint('cattle', __name__)
 
+CATTLE_FILTER_FIELDS = ['breed', 'gender', 'health_status', 'location', 'current_status']
+CATTLE_UPDATE_FIELDS = ['name', 'breed', 'weight', 'health_status', 'location', 'current_status', 'notes']
+CATTLE_SORT_FIELDS = [
+    'id', 'tag_number', 'name', 'breed', 'date_of_birth', 'gender', 'weight',
+    'health_status', 'location', 'current_status', 'created_at', 'updated_at'
+]
+
+def prefix_match(column, prefix):
+    """Case-insensitive prefix match as a range, so the lower(column) index is used"""
+    prefix = prefix.lower()
+    upper_bound = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return and_(func.lower(column) >= prefix, func.lower(column) < upper_bound)
+
 @cattle_bp.route('/', methods=['GET'])
+@replica_read
+@conditional_get('cattle')
 def get_all_cattle():
     try:
-        cattle = Cattle.query.all()
-        return jsonify([c.to_dict() for c in cattle]), 200
+        query = Cattle.query
+        
+        # Exact filters, comma-separated for several values (?current_status=Active,Quarantined)
+        for field in CATTLE_FILTER_FIELDS:
+            value = request.args.get(field)
+            if value:
+                values = [v.strip() for v in value.split(',') if v.strip()]
+                query = query.filter(getattr(Cattle, field).in_(values))
+        
+        # Prefix search on tag number or name
+        search = request.args.get('search', '').strip()
+        if search:
+            query = query.filter(or_(prefix_match(Cattle.tag_number, search), prefix_match(Cattle.name, search)))
+        
+        # Sort field, prefixed with '-' for descending (?sort=-weight)
+        sort = request.args.get('sort', 'id')
+        sort_field = sort.lstrip('-')
+        if sort_field not in CATTLE_SORT_FIELDS:
+            return jsonify({'error': f'Invalid sort field: {sort_field}'}), 400
+        sort_column = getattr(Cattle, sort_field)
+        query = query.order_by(sort_column.desc() if sort.startswith('-') else sort_column.asc(), Cattle.id)
+        
+        headers = {}
+        limit = request.args.get('limit', type=int)
+        offset = request.args.get('offset', 0, type=int)
+        if limit is not None:
+            headers['X-Total-Count'] = query.order_by(None).count()
+            query = query.offset(offset).limit(limit)
+        
+        cattle = query.all()
+        return jsonify([c.to_dict() for c in cattle]), 200, headers
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@cattle_bp.route('/risk', methods=['GET'])
+@replica_read
+@conditional_get('cattle', 'milk_production', 'feeding', daily=True)
+def get_cattle_risk():
+    """Herd sorted by health-risk score, highest first"""
+    try:
+        scores = get_risk_scores(db.session)
+        
+        min_score = request.args.get('min_score', type=float)
+        if min_score is not None:
+            scores = [s for s in scores if s['risk_score'] >= min_score]
+        
+        limit = request.args.get('limit', type=int)
+        if limit is not None:
+            scores = scores[:limit]
+        
+        return jsonify(scores), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -47,13 +121,19 @@ def create_cattle():
             purchase_date=datetime.strptime(data['purchase_date'], '%Y-%m-%d').date() if data.get('purchase_date') else None,
             purchase_price=data.get('purchase_price'),
             current_status=data.get('current_status', 'Active'),
-            notes=data.get('notes')
+            notes=data.get('notes'),
+            sire_id=data.get('sire_id'),
+            dam_id=data.get('dam_id')
         )
+        check_parents(db.session.connection(), cattle, cattle.sire_id, cattle.dam_id)
         
         db.session.add(cattle)
         db.session.commit()
         
         return jsonify(cattle.to_dict()), 201
+    except PedigreeError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -79,11 +159,20 @@ def update_cattle(cattle_id):
             cattle.current_status = data['current_status']
         if 'notes' in data:
             cattle.notes = data['notes']
+        if 'sire_id' in data or 'dam_id' in data:
+            sire_id = data.get('sire_id', cattle.sire_id)
+            dam_id = data.get('dam_id', cattle.dam_id)
+            check_parents(db.session.connection(), cattle, sire_id, dam_id)
+            cattle.sire_id = sire_id
+            cattle.dam_id = dam_id
         
         cattle.updated_at = datetime.utcnow()
         db.session.commit()
         
         return jsonify(cattle.to_dict()), 200
+    except PedigreeError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -92,6 +181,8 @@ def update_cattle(cattle_id):
 def delete_cattle(cattle_id):
     try:
         cattle = Cattle.query.get_or_404(cattle_id)
+        retire_cattle_feeding(db.session.connection(), [cattle.id])
+        delete_archived_records(db.session.connection(), [cattle.id])
         db.session.delete(cattle)
         db.session.commit()
         
@@ -99,3 +190,51 @@ def delete_cattle(cattle_id):
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
+
+@cattle_bp.route('/bulk', methods=['PATCH'])
+def bulk_update_cattle():
+    try:
+        data = request.get_json() or {}
+        conditions = bulk_conditions(Cattle, data, CATTLE_FILTER_FIELDS)
+        changes = bulk_changes(data, CATTLE_UPDATE_FIELDS)
+        
+        result = db.session.execute(
+            update(Cattle).where(*conditions)
+            .values(**changes, updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        
+        return jsonify({'updated': result.rowcount}), 200
+    except BulkRequestError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@cattle_bp.route('/bulk', methods=['DELETE'])
+def bulk_delete_cattle():
+    try:
+        data = request.get_json() or {}
+        conditions = bulk_conditions(Cattle, data, CATTLE_FILTER_FIELDS)
+        
+        # Set-based deletes bypass the ORM cascade, so remove child records first
+        cattle_ids = select(Cattle.id).where(*conditions)
+        retire_cattle_feeding(db.session.connection(), cattle_ids)
+        detach(db.session.connection(), db.session.execute(cattle_ids).scalars().all())
+        delete_archived_records(db.session.connection(), cattle_ids)
+        for model in (MilkProduction, Feeding):
+            db.session.execute(
+                delete(model).where(model.cattle_id.in_(cattle_ids)).execution_options(synchronize_session=False)
+            )
+        result = db.session.execute(
+            delete(Cattle).where(*conditions).execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        
+        return jsonify({'message': f'{result.rowcount} cattle deleted', 'deleted': result.rowcount}), 200
+    except BulkRequestError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,84 @@
+from flask import Blueprint, request, jsonify, current_app
+from database import db
+from models.cattle import Cattle
+from models.milk_production import MilkProduction
+from models.expenses import Expenses
+from models.revenue import Revenue
+from datetime import datetime, timedelta
+from sqlalchemy import func, case, distinct
+from archive import with_archive
+from tenancy import farm_ids, fan_out
+from replica import replica_read
+
+coop_bp = Blueprint('coop', __name__)
+
+SUMMED_FIELDS = ['head_count', 'active_count', 'milking_count', 'total_liters', 'total_revenue', 'total_expenses']
+
+def farm_summary(days):
+    """Herd, milk and money totals of the current farm over the last ``days``"""
+    start_date = datetime.now().date() - timedelta(days=days)
+
+    cattle = db.session.query(
+        func.count(Cattle.id).label('head_count'),
+        func.sum(case((Cattle.current_status.notin_(['Sold', 'Deceased']), 1), else_=0)).label('active_count')
+    ).one()
+
+    records = with_archive(MilkProduction, start_date)
+    milk = db.session.query(
+        func.sum(records.quantity_liters).label('total_liters'),
+        func.count(distinct(records.cattle_id)).label('milking_count')
+    ).filter(records.date_recorded >= start_date).one()
+
+    total_revenue = db.session.query(func.sum(Revenue.amount)).filter(Revenue.date_recorded >= start_date).scalar() or 0
+    total_expenses = db.session.query(func.sum(Expenses.amount)).filter(Expenses.date_recorded >= start_date).scalar() or 0
+
+    return {
+        'head_count': cattle.head_count,
+        'active_count': int(cattle.active_count or 0),
+        'milking_count': milk.milking_count,
+        'total_liters': float(milk.total_liters or 0),
+        'total_revenue': float(total_revenue),
+        'total_expenses': float(total_expenses),
+    }
+
+def add_ratios(summary, days):
+    for field in ('total_liters', 'total_revenue', 'total_expenses'):
+        summary[field] = round(summary[field], 2)
+    summary['net_income'] = round(summary['total_revenue'] - summary['total_expenses'], 2)
+    summary['liters_per_milking_head_day'] = (
+        round(summary['total_liters'] / summary['milking_count'] / days, 2) if summary['milking_count'] else 0
+    )
+    return summary
+
+@coop_bp.route('/farms', methods=['GET'])
+def get_farms():
+    default_farm = current_app.config['DEFAULT_FARM_ID']
+    return jsonify([{'id': farm_id, 'default': farm_id == default_farm} for farm_id in farm_ids()]), 200
+
+@coop_bp.route('/summary', methods=['GET'])
+@replica_read
+def get_coop_summary():
+    """Co-op dashboard totals, queried on every farm database in parallel"""
+    try:
+        days = int(request.args.get('days', 30))
+        farms = request.args.get('farms')
+        farms = [farm for farm in farms.split(',') if farm] if farms else None
+
+        unknown = set(farms or []) - set(farm_ids())
+        if unknown:
+            return jsonify({'error': f"Unknown farm: {', '.join(sorted(unknown))}"}), 404
+
+        results, errors = fan_out(
+            lambda farm_id: farm_summary(days), farms, timeout=current_app.config['COOP_FARM_TIMEOUT']
+        )
+
+        totals = {field: sum(result[field] for result in results.values()) for field in SUMMED_FIELDS}
+
+        return jsonify({
+            'farms': {farm_id: add_ratios(result, days) for farm_id, result in results.items()},
+            'totals': add_ratios(totals, days),
+            'errors': errors,
+            'period_days': days
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
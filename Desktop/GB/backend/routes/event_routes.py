@@ -0,0 +1,25 @@
+from flask import Blueprint, Response, request, jsonify, current_app
+from events import EventStreamError, get_event_hub, parse_stream_request
+from tenancy import current_farm_id
+
+events_bp = Blueprint('events', __name__)
+
+# Set by asgi.py: the server streams the events itself instead of holding a thread
+ASGI_STREAM_KEY = 'gb.event_stream'
+
+@events_bp.route('/', methods=['GET'])
+def stream_events():
+    """Server-sent events of record changes on the current farm (``tables`` to filter)"""
+    try:
+        last_id, tables = parse_stream_request(request)
+        stream = get_event_hub(current_app._get_current_object()).open(current_farm_id(), last_id, tables)
+    except EventStreamError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    if ASGI_STREAM_KEY in request.environ:
+        request.environ[ASGI_STREAM_KEY] = stream
+        return Response(status=200, mimetype='text/event-stream', headers=headers)
+    return Response(stream.iter_blocking(), mimetype='text/event-stream', headers=headers)
@@ -1,38 +1,55 @@
 from flask import Blueprint, request, jsonify
 from database import db
+from archive import with_archive, record_columns, records_to_dicts, archived_years, execute_on_archive
 from models.feeding import Feeding
 from models.cattle import Cattle
 from datetime import datetime, timedelta
-from sqlalchemy import func
+from sqlalchemy import func, update, delete
+from bulk import BulkRequestError, bulk_conditions, bulk_changes, bulk_date_range
+from replica import replica_read
+from encoding import list_response
+from idempotency import idempotent
+from inventory import post_bulk_feeding_change
 
 feeding_bp = Blueprint('feeding', __name__)
 
+FEEDING_UPDATE_FIELDS = ['feed_type', 'quantity_kg', 'cost_per_unit', 'total_cost', 'supplier', 'notes']
+FEEDING_FILTER_FIELDS = ['cattle_id', 'feed_type', 'supplier']
+
 @feeding_bp.route('/', methods=['GET'])
+@replica_read
 def get_all_feeding_records():
     try:
         cattle_id = request.args.get('cattle_id')
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
         
-        query = Feeding.query
+        if start_date:
+            start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+        
+        if end_date:
+            end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+        
+        # Only reads archived partitions when the date range reaches them
+        records = with_archive(Feeding, start_date, end_date)
+        query = db.session.query(*record_columns(records, Feeding))
         
         if cattle_id:
-            query = query.filter(Feeding.cattle_id == cattle_id)
+            query = query.filter(records.cattle_id == cattle_id)
         
         if start_date:
-            start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-            query = query.filter(Feeding.date_recorded >= start_date)
+            query = query.filter(records.date_recorded >= start_date)
         
         if end_date:
-            end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-            query = query.filter(Feeding.date_recorded <= end_date)
+            query = query.filter(records.date_recorded <= end_date)
         
-        records = query.order_by(Feeding.date_recorded.desc()).all()
-        return jsonify([r.to_dict() for r in records]), 200
+        rows = query.order_by(records.date_recorded.desc()).all()
+        return list_response(records_to_dicts(Feeding, rows)), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @feeding_bp.route('/', methods=['POST'])
+@idempotent(Feeding)
 def create_feeding_record():
     try:
         data = request.get_json()
@@ -103,3 +120,65 @@ def delete_feeding_record(record_id):
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
+
+@feeding_bp.route('/bulk', methods=['PATCH'])
+def bulk_update_feeding_records():
+    try:
+        data = request.get_json() or {}
+        conditions = bulk_conditions(Feeding, data, FEEDING_FILTER_FIELDS, date_field='date_recorded')
+        changes = bulk_changes(data, FEEDING_UPDATE_FIELDS)
+        now = datetime.utcnow()
+        
+        # Set-based writes skip the session events that keep feed stock current
+        post_bulk_feeding_change(db.session, conditions, changes)
+        result = db.session.execute(
+            update(Feeding).where(*conditions)
+            .values(**changes, updated_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        
+        def archived_update(partition):
+            partition_conditions = bulk_conditions(partition.c, data, FEEDING_FILTER_FIELDS, date_field='date_recorded')
+            post_bulk_feeding_change(db.session, partition_conditions, changes, partition)
+            return update(partition).where(*partition_conditions).values(**changes, updated_at=now)
+        
+        archived = execute_on_archive(
+            db.session.connection(), Feeding, archived_years(Feeding.__tablename__, *bulk_date_range(data)), archived_update
+        )
+        db.session.commit()
+        
+        return jsonify({'updated': result.rowcount + archived}), 200
+    except BulkRequestError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@feeding_bp.route('/bulk', methods=['DELETE'])
+def bulk_delete_feeding_records():
+    try:
+        data = request.get_json() or {}
+        conditions = bulk_conditions(Feeding, data, FEEDING_FILTER_FIELDS, date_field='date_recorded')
+        
+        post_bulk_feeding_change(db.session, conditions)
+        result = db.session.execute(
+            delete(Feeding).where(*conditions).execution_options(synchronize_session=False)
+        )
+        
+        def archived_delete(partition):
+            partition_conditions = bulk_conditions(partition.c, data, FEEDING_FILTER_FIELDS, date_field='date_recorded')
+            post_bulk_feeding_change(db.session, partition_conditions, table=partition)
+            return delete(partition).where(*partition_conditions)
+        
+        archived = execute_on_archive(
+            db.session.connection(), Feeding, archived_years(Feeding.__tablename__, *bulk_date_range(data)), archived_delete
+        )
+        db.session.commit()
+        
+        deleted = result.rowcount + archived
+        return jsonify({'message': f'{deleted} feeding records deleted', 'deleted': deleted}), 200
+    except BulkRequestError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
@@ -1,13 +1,18 @@
 from flask import Blueprint, request, jsonify
 from database import db
+from versioning import conditional_get
 from models.expenses import Expenses
 from models.revenue import Revenue
 from datetime import datetime
 from sqlalchemy import func
+from replica import replica_read
+from encoding import list_response
+from idempotency import idempotent
 
 financial_bp = Blueprint('financial', __name__)
 
 @financial_bp.route('/expenses', methods=['GET'])
+@replica_read
 def get_expenses():
     try:
         start_date = request.args.get('start_date')
@@ -24,11 +29,12 @@ def get_expenses():
             query = query.filter(Expenses.date_recorded <= end_date)
 
         expenses = query.order_by(Expenses.date_recorded.desc()).all()
-        return jsonify([e.to_dict() for e in expenses]), 200
+        return list_response([e.to_dict() for e in expenses]), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @financial_bp.route('/revenue', methods=['GET'])
+@replica_read
 def get_revenue():
     try:
         start_date = request.args.get('start_date')
@@ -45,11 +51,12 @@ def get_revenue():
             query = query.filter(Revenue.date_recorded <= end_date)
 
         revenues = query.order_by(Revenue.date_recorded.desc()).all()
-        return jsonify([r.to_dict() for r in revenues]), 200
+        return list_response([r.to_dict() for r in revenues]), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @financial_bp.route('/expenses', methods=['POST'])
+@idempotent(Expenses)
 def create_expense():
     try:
         data = request.get_json()
@@ -78,6 +85,7 @@ def create_expense():
         return jsonify({'error': str(e)}), 500
 
 @financial_bp.route('/revenue', methods=['POST'])
+@idempotent(Revenue)
 def create_revenue():
     try:
         data = request.get_json()
@@ -104,6 +112,8 @@ def create_revenue():
         return jsonify({'error': str(e)}), 500
 
 @financial_bp.route('/summary', methods=['GET'])
+@replica_read
+@conditional_get('expenses', 'revenue')
 def get_financial_summary():
     try:
         start_date = request.args.get('start_date')
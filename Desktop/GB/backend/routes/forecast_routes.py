@@ -0,0 +1,51 @@
+from flask import Blueprint, request, jsonify
+from versioning import conditional_get
+from replica import replica_read
+from models.forecast_state import ForecastState
+from forecast import project
+
+forecast_bp = Blueprint('forecast', __name__)
+
+MAX_HORIZON = 180
+
+def not_fitted(series):
+    return jsonify({'error': f'No {series} forecast has been fitted yet; run forecast.py'}), 404
+
+@forecast_bp.route('/milk', methods=['GET'])
+@replica_read
+@conditional_get('forecast_states')
+def get_milk_forecast():
+    """Herd milk forecast, or one cow's with ?cattle_id="""
+    try:
+        horizon = int(request.args.get('horizon', 30))
+        if not 1 <= horizon <= MAX_HORIZON:
+            return jsonify({'error': f'horizon must be between 1 and {MAX_HORIZON} days'}), 400
+        cattle_id = request.args.get('cattle_id', type=int)
+        if cattle_id is None:
+            state = ForecastState.query.filter_by(series='herd_milk', key='herd').first()
+        else:
+            state = ForecastState.query.filter_by(series='cow_milk', key=str(cattle_id)).first()
+        if state is None:
+            return not_fitted('milk' if cattle_id is None else f'cattle {cattle_id} milk')
+        return jsonify(project(state, horizon)), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@forecast_bp.route('/feed', methods=['GET'])
+@replica_read
+@conditional_get('forecast_states')
+def get_feed_forecast():
+    """Feed demand forecast in kg per feed type, or for one with ?feed_type="""
+    try:
+        horizon = int(request.args.get('horizon', 30))
+        if not 1 <= horizon <= MAX_HORIZON:
+            return jsonify({'error': f'horizon must be between 1 and {MAX_HORIZON} days'}), 400
+        query = ForecastState.query.filter_by(series='feed')
+        if request.args.get('feed_type'):
+            query = query.filter_by(key=request.args['feed_type'])
+        states = query.order_by(ForecastState.key).all()
+        if not states:
+            return not_fitted('feed')
+        return jsonify({state.key: project(state, horizon) for state in states}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
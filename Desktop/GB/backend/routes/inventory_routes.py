@@ -0,0 +1,240 @@
+from flask import Blueprint, request, jsonify
+from database import db
+from versioning import conditional_get
+from models.feed_stock import FeedStock
+from models.feed_stock_movement import FeedStockMovement
+from models.feed_consumption import FeedConsumption
+from models.expenses import Expenses
+from datetime import datetime
+from replica import replica_read
+from encoding import list_response
+from idempotency import idempotent
+from inventory import MOVEMENT_KINDS, InventoryError, count_correction, stock_levels
+
+inventory_bp = Blueprint('inventory', __name__)
+
+STOCK_SETTINGS_FIELDS = ['reorder_level_kg', 'lead_time_days']
+
+def parse_date(value):
+    return datetime.strptime(value or datetime.now().strftime('%Y-%m-%d'), '%Y-%m-%d').date()
+
+def positive_quantity(data, field='quantity_kg'):
+    if field not in data:
+        raise InventoryError(f'Missing required field: {field}')
+    quantity = float(data[field])
+    if quantity <= 0:
+        raise InventoryError(f'{field} must be positive')
+    return quantity
+
+@inventory_bp.route('/', methods=['GET'])
+@replica_read
+@conditional_get('feed_stock', 'feed_consumption_daily', daily=True)
+def get_stock_levels():
+    """Stock, consumption rate and days of cover of every feed type (or one with ?feed_type=)"""
+    try:
+        return jsonify(stock_levels(db.session, request.args.get('feed_type'))), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@inventory_bp.route('/alerts', methods=['GET'])
+@replica_read
+@conditional_get('feed_stock', 'feed_consumption_daily', daily=True)
+def get_reorder_alerts():
+    """Feed types at or below their reorder level, or running out within their lead time"""
+    try:
+        levels = stock_levels(db.session)
+        return jsonify([level for level in levels if level['reorder']]), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@inventory_bp.route('/<path:feed_type>', methods=['PUT'])
+def update_stock_settings(feed_type):
+    try:
+        data = request.get_json() or {}
+        stock = FeedStock.query.filter_by(feed_type=feed_type).first()
+        if stock is None:
+            stock = FeedStock(feed_type=feed_type, on_hand_kg=0.0, on_order_kg=0.0)
+            db.session.add(stock)
+
+        for field in STOCK_SETTINGS_FIELDS:
+            if field in data:
+                setattr(stock, field, data[field])
+
+        db.session.commit()
+        return jsonify(stock.to_dict()), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@inventory_bp.route('/movements', methods=['GET'])
+@replica_read
+def get_movements():
+    try:
+        query = FeedStockMovement.query
+
+        if request.args.get('feed_type'):
+            query = query.filter(FeedStockMovement.feed_type == request.args['feed_type'])
+
+        kind = request.args.get('kind')
+        if kind:
+            if kind not in MOVEMENT_KINDS:
+                return jsonify({'error': f"kind must be one of {', '.join(MOVEMENT_KINDS)}"}), 400
+            query = query.filter(FeedStockMovement.kind == kind)
+
+        if request.args.get('start_date'):
+            query = query.filter(FeedStockMovement.date_recorded >= parse_date(request.args['start_date']))
+
+        if request.args.get('end_date'):
+            query = query.filter(FeedStockMovement.date_recorded <= parse_date(request.args['end_date']))
+
+        movements = query.order_by(FeedStockMovement.date_recorded.desc(), FeedStockMovement.id.desc()).all()
+        return list_response([m.to_dict() for m in movements]), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@inventory_bp.route('/consumption', methods=['GET'])
+@replica_read
+@conditional_get('feed_consumption_daily')
+def get_daily_consumption():
+    """Daily feeding totals per feed type"""
+    try:
+        query = FeedConsumption.query
+
+        if request.args.get('feed_type'):
+            query = query.filter(FeedConsumption.feed_type == request.args['feed_type'])
+
+        if request.args.get('start_date'):
+            query = query.filter(FeedConsumption.date_recorded >= parse_date(request.args['start_date']))
+
+        if request.args.get('end_date'):
+            query = query.filter(FeedConsumption.date_recorded <= parse_date(request.args['end_date']))
+
+        rows = query.order_by(FeedConsumption.date_recorded.desc(), FeedConsumption.feed_type).all()
+        return list_response([row.to_dict() for row in rows]), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@inventory_bp.route('/purchases', methods=['POST'])
+@idempotent(FeedStockMovement)
+def create_purchase():
+    """
+    Order feed: on order until delivered, or on hand straight away with
+    ``"delivered": true``. A cost adds a Feed expense.
+    """
+    try:
+        data = request.get_json() or {}
+        if 'feed_type' not in data:
+            return jsonify({'error': 'Missing required field: feed_type'}), 400
+        quantity = positive_quantity(data)
+        day = parse_date(data.get('date_recorded'))
+
+        unit_cost = data.get('unit_cost')
+        total_cost = data.get('total_cost')
+        if total_cost is None and unit_cost is not None:
+            total_cost = round(unit_cost * quantity, 2)
+
+        movement = FeedStockMovement(
+            feed_type=data['feed_type'],
+            kind='delivery' if data.get('delivered') else 'purchase',
+            date_recorded=day,
+            quantity_kg=quantity,
+            unit_cost=unit_cost,
+            total_cost=total_cost,
+            supplier=data.get('supplier'),
+            notes=data.get('notes')
+        )
+        if total_cost is not None:
+            expense = Expenses(
+                date_recorded=day,
+                category='Feed',
+                description=f"{quantity:g} kg {data['feed_type']}",
+                amount=total_cost,
+                supplier=data.get('supplier'),
+                receipt_number=data.get('receipt_number'),
+                notes=data.get('notes')
+            )
+            db.session.add(expense)
+            db.session.flush()
+            movement.expense_id = expense.id
+
+        db.session.add(movement)
+        db.session.commit()
+
+        return jsonify(movement.to_dict()), 201
+    except InventoryError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@inventory_bp.route('/deliveries', methods=['POST'])
+@idempotent(FeedStockMovement)
+def create_delivery():
+    """Feed received, against an earlier purchase (``purchase_id``) or not"""
+    try:
+        data = request.get_json() or {}
+        quantity = positive_quantity(data)
+
+        purchase = None
+        if data.get('purchase_id') is not None:
+            purchase = db.session.get(FeedStockMovement, data['purchase_id'])
+            if purchase is None or purchase.kind != 'purchase':
+                return jsonify({'error': f"No purchase with id {data['purchase_id']}"}), 404
+        elif 'feed_type' not in data:
+            return jsonify({'error': 'Missing required field: feed_type'}), 400
+
+        movement = FeedStockMovement(
+            feed_type=purchase.feed_type if purchase else data['feed_type'],
+            kind='delivery',
+            date_recorded=parse_date(data.get('date_recorded')),
+            quantity_kg=quantity,
+            supplier=data.get('supplier', purchase.supplier if purchase else None),
+            purchase_id=purchase.id if purchase else None,
+            notes=data.get('notes')
+        )
+
+        db.session.add(movement)
+        db.session.commit()
+
+        return jsonify(movement.to_dict()), 201
+    except InventoryError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@inventory_bp.route('/counts', methods=['POST'])
+@idempotent(FeedStockMovement)
+def create_stock_count():
+    """Physical stock count at the end of ``date_recorded``; corrects the stock to match"""
+    try:
+        data = request.get_json() or {}
+        for field in ('feed_type', 'counted_kg'):
+            if field not in data:
+                return jsonify({'error': f'Missing required field: {field}'}), 400
+        counted = float(data['counted_kg'])
+        if counted < 0:
+            return jsonify({'error': 'counted_kg cannot be negative'}), 400
+        day = parse_date(data.get('date_recorded'))
+
+        movement = FeedStockMovement(
+            feed_type=data['feed_type'],
+            kind='count',
+            date_recorded=day,
+            quantity_kg=count_correction(db.session, data['feed_type'], counted, day),
+            counted_kg=counted,
+            notes=data.get('notes')
+        )
+
+        db.session.add(movement)
+        db.session.commit()
+
+        return jsonify(movement.to_dict()), 201
+    except InventoryError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
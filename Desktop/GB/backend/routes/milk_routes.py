@@ -1,34 +1,52 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from database import db
+from versioning import conditional_get
+from archive import with_archive, record_columns, records_to_dicts, archived_years, execute_on_archive
 from models.milk_production import MilkProduction
 from models.cattle import Cattle
 from datetime import datetime, timedelta
-from sqlalchemy import func
+from sqlalchemy import func, update, delete
+from sqlalchemy.exc import IntegrityError
+from bulk import BulkRequestError, bulk_conditions, bulk_changes, bulk_date_range
+from ingest import IngestError, get_milk_ingest_buffer
+from tenancy import current_farm_id
+from replica import replica_read
+from encoding import list_response
+from idempotency import idempotent
 
 milk_bp = Blueprint('milk', __name__)
 
+MILK_UPDATE_FIELDS = ['quantity_liters', 'quality_score', 'notes']
+
 @milk_bp.route('/', methods=['GET'])
+@replica_read
 def get_all_milk_records():
     try:
         cattle_id = request.args.get('cattle_id')
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
         
-        query = MilkProduction.query
+        if start_date:
+            start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+        
+        if end_date:
+            end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+        
+        # Only reads archived partitions when the date range reaches them
+        records = with_archive(MilkProduction, start_date, end_date)
+        query = db.session.query(*record_columns(records, MilkProduction))
         
         if cattle_id:
-            query = query.filter(MilkProduction.cattle_id == cattle_id)
+            query = query.filter(records.cattle_id == cattle_id)
         
         if start_date:
-            start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-            query = query.filter(MilkProduction.date_recorded >= start_date)
+            query = query.filter(records.date_recorded >= start_date)
         
         if end_date:
-            end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-            query = query.filter(MilkProduction.date_recorded <= end_date)
+            query = query.filter(records.date_recorded <= end_date)
         
-        records = query.order_by(MilkProduction.date_recorded.desc()).all()
-        return jsonify([r.to_dict() for r in records]), 200
+        rows = query.order_by(records.date_recorded.desc()).all()
+        return list_response(records_to_dicts(MilkProduction, rows)), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -41,6 +59,7 @@ def get_milk_record(record_id):
         return jsonify({'error': str(e)}), 500
 
 @milk_bp.route('/', methods=['POST'])
+@idempotent(MilkProduction)
 def create_milk_record():
     try:
         data = request.get_json()
@@ -59,17 +78,54 @@ def create_milk_record():
             date_recorded=datetime.strptime(data.get('date_recorded', datetime.now().strftime('%Y-%m-%d')), '%Y-%m-%d').date(),
             quantity_liters=data['quantity_liters'],
             quality_score=data.get('quality_score'),
+            milking_session=data.get('milking_session'),
             notes=data.get('notes')
         )
         
+        if record.milking_session is not None:
+            existing = MilkProduction.query.filter_by(
+                cattle_id=record.cattle_id, date_recorded=record.date_recorded, milking_session=record.milking_session
+            ).first()
+            if existing:
+                return jsonify({'error': 'This milking session is already recorded', 'existing': existing.to_dict()}), 409
+        
         db.session.add(record)
         db.session.commit()
         
         return jsonify(record.to_dict()), 201
+    except IntegrityError:
+        # Recorded by a concurrent request since the check above
+        db.session.rollback()
+        return jsonify({'error': 'This milking session is already recorded'}), 409
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@milk_bp.route('/readings', methods=['POST'])
+def ingest_milk_readings():
+    """Accept one or many milk meter readings; they are written to the database in batches"""
+    try:
+        data = request.get_json()
+        readings = data if isinstance(data, list) else [data]
+        
+        buffer = get_milk_ingest_buffer(current_app._get_current_object(), current_farm_id())
+        rows = [buffer.validate(reading) for reading in readings]
+        buffer.append(rows)
+        
+        return jsonify({'accepted': len(rows)}), 202
+    except IngestError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@milk_bp.route('/readings/stats', methods=['GET'])
+def milk_ingest_stats():
+    try:
+        buffer = get_milk_ingest_buffer(current_app._get_current_object(), current_farm_id())
+        return jsonify(buffer.snapshot()), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @milk_bp.route('/<int:record_id>', methods=['PUT'])
 def update_milk_record(record_id):
     try:
@@ -103,27 +159,85 @@ def delete_milk_record(record_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@milk_bp.route('/bulk', methods=['PATCH'])
+def bulk_update_milk_records():
+    try:
+        data = request.get_json() or {}
+        conditions = bulk_conditions(MilkProduction, data, ['cattle_id'], date_field='date_recorded')
+        changes = bulk_changes(data, MILK_UPDATE_FIELDS)
+        now = datetime.utcnow()
+        
+        result = db.session.execute(
+            update(MilkProduction).where(*conditions)
+            .values(**changes, updated_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        # Closed years live in archive partitions, which the statement above never reaches
+        archived = execute_on_archive(
+            db.session.connection(), MilkProduction,
+            archived_years(MilkProduction.__tablename__, *bulk_date_range(data)),
+            lambda partition: update(partition)
+            .where(*bulk_conditions(partition.c, data, ['cattle_id'], date_field='date_recorded'))
+            .values(**changes, updated_at=now)
+        )
+        db.session.commit()
+        
+        return jsonify({'updated': result.rowcount + archived}), 200
+    except BulkRequestError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@milk_bp.route('/bulk', methods=['DELETE'])
+def bulk_delete_milk_records():
+    try:
+        data = request.get_json() or {}
+        conditions = bulk_conditions(MilkProduction, data, ['cattle_id'], date_field='date_recorded')
+        
+        result = db.session.execute(
+            delete(MilkProduction).where(*conditions).execution_options(synchronize_session=False)
+        )
+        archived = execute_on_archive(
+            db.session.connection(), MilkProduction,
+            archived_years(MilkProduction.__tablename__, *bulk_date_range(data)),
+            lambda partition: delete(partition)
+            .where(*bulk_conditions(partition.c, data, ['cattle_id'], date_field='date_recorded'))
+        )
+        db.session.commit()
+        
+        deleted = result.rowcount + archived
+        return jsonify({'message': f'{deleted} milk records deleted', 'deleted': deleted}), 200
+    except BulkRequestError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @milk_bp.route('/summary', methods=['GET'])
+@replica_read
+@conditional_get('milk_production', 'cattle', daily=True)
 def get_milk_summary():
     try:
         cattle_id = request.args.get('cattle_id')
         days = int(request.args.get('days', 30))
         
         start_date = datetime.now().date() - timedelta(days=days)
+        records = with_archive(MilkProduction, start_date)
         
         query = db.session.query(
-            MilkProduction.cattle_id,
+            records.cattle_id,
             Cattle.name,
             Cattle.tag_number,
-            func.sum(MilkProduction.quantity_liters).label('total_liters'),
-            func.avg(MilkProduction.quantity_liters).label('avg_daily'),
-            func.count(MilkProduction.id).label('record_count')
-        ).join(Cattle).filter(MilkProduction.date_recorded >= start_date)
+            func.sum(records.quantity_liters).label('total_liters'),
+            func.avg(records.quantity_liters).label('avg_daily'),
+            func.count(records.id).label('record_count')
+        ).join(Cattle, Cattle.id == records.cattle_id).filter(records.date_recorded >= start_date)
         
         if cattle_id:
-            query = query.filter(MilkProduction.cattle_id == cattle_id)
+            query = query.filter(records.cattle_id == cattle_id)
         
-        results = query.group_by(MilkProduction.cattle_id).all()
+        results = query.group_by(records.cattle_id).all()
         
         summary = []
         for result in results:
@@ -0,0 +1,112 @@
+from flask import Blueprint, request, jsonify
+from database import db
+from versioning import conditional_get
+from models.cattle import Cattle
+from models.cattle_ancestry import CattleAncestry
+from sqlalchemy import select, literal, union_all
+from replica import replica_read
+from pedigree import mating_coefficient
+
+pedigree_bp = Blueprint('pedigree', __name__)
+
+def related_cattle(match_column, other_column, cattle_id):
+    """Cattle at the other end of an animal's closure rows, nearest first (?max_depth= limits the generations)"""
+    query = (
+        select(Cattle, CattleAncestry.depth)
+        .join(CattleAncestry, other_column == Cattle.id)
+        .where(match_column == cattle_id)
+    )
+    max_depth = request.args.get('max_depth', type=int)
+    if max_depth is not None:
+        query = query.where(CattleAncestry.depth <= max_depth)
+    rows = db.session.execute(query.order_by(CattleAncestry.depth, Cattle.id)).all()
+    return [{**cattle.to_dict(), 'depth': depth} for cattle, depth in rows]
+
+def common_ancestors(first_id, second_id):
+    """Ancestors shared by two animals (either may be the other's ancestor), with the depth from each"""
+    def lineage(cattle_id):
+        return union_all(
+            select(CattleAncestry.ancestor_id, CattleAncestry.depth).where(CattleAncestry.descendant_id == cattle_id),
+            select(literal(cattle_id).label('ancestor_id'), literal(0).label('depth'))
+        ).subquery()
+
+    first, second = lineage(first_id), lineage(second_id)
+    rows = db.session.execute(
+        select(Cattle, first.c.depth, second.c.depth)
+        .join(first, first.c.ancestor_id == Cattle.id)
+        .join(second, second.c.ancestor_id == Cattle.id)
+        .order_by(first.c.depth + second.c.depth, Cattle.id)
+    ).all()
+    return [
+        {'id': cattle.id, 'tag_number': cattle.tag_number, 'name': cattle.name,
+         'inbreeding_coefficient': cattle.inbreeding_coefficient, 'depth_from_first': first_depth,
+         'depth_from_second': second_depth}
+        for cattle, first_depth, second_depth in rows
+    ]
+
+@pedigree_bp.route('/<int:cattle_id>/ancestors', methods=['GET'])
+@replica_read
+@conditional_get('cattle', 'cattle_ancestry')
+def get_ancestors(cattle_id):
+    try:
+        Cattle.query.get_or_404(cattle_id)
+        return jsonify(related_cattle(CattleAncestry.descendant_id, CattleAncestry.ancestor_id, cattle_id)), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@pedigree_bp.route('/<int:cattle_id>/descendants', methods=['GET'])
+@replica_read
+@conditional_get('cattle', 'cattle_ancestry')
+def get_descendants(cattle_id):
+    try:
+        Cattle.query.get_or_404(cattle_id)
+        return jsonify(related_cattle(CattleAncestry.ancestor_id, CattleAncestry.descendant_id, cattle_id)), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@pedigree_bp.route('/<int:cattle_id>/inbreeding', methods=['GET'])
+@replica_read
+@conditional_get('cattle', 'cattle_ancestry')
+def get_inbreeding(cattle_id):
+    """An animal's inbreeding coefficient and the common ancestors of its sire and dam"""
+    try:
+        cattle = Cattle.query.get_or_404(cattle_id)
+        shared = []
+        if cattle.sire_id is not None and cattle.dam_id is not None:
+            shared = common_ancestors(cattle.sire_id, cattle.dam_id)
+        return jsonify({
+            'cattle_id': cattle.id,
+            'sire_id': cattle.sire_id,
+            'dam_id': cattle.dam_id,
+            'inbreeding_coefficient': cattle.inbreeding_coefficient,
+            'common_ancestors': shared
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@pedigree_bp.route('/mating', methods=['GET'])
+@replica_read
+@conditional_get('cattle', 'cattle_ancestry')
+def check_mating():
+    """Expected inbreeding coefficient of a calf of ?sire_id= and ?dam_id=, with their common ancestors"""
+    try:
+        sire_id = request.args.get('sire_id', type=int)
+        dam_id = request.args.get('dam_id', type=int)
+        if sire_id is None or dam_id is None:
+            return jsonify({'error': 'sire_id and dam_id are required'}), 400
+
+        sire = db.session.get(Cattle, sire_id)
+        dam = db.session.get(Cattle, dam_id)
+        if sire is None or sire.gender != 'Male':
+            return jsonify({'error': f'No bull with id {sire_id}'}), 404
+        if dam is None or dam.gender != 'Female':
+            return jsonify({'error': f'No cow with id {dam_id}'}), 404
+
+        return jsonify({
+            'sire_id': sire_id,
+            'dam_id': dam_id,
+            'expected_inbreeding_coefficient': round(mating_coefficient(db.session.connection(), sire_id, dam_id), 6),
+            'common_ancestors': common_ancestors(sire_id, dam_id)
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
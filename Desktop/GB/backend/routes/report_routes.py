@@ -0,0 +1,60 @@
+from flask import Blueprint, jsonify, send_file
+from database import db
+from versioning import conditional_get
+from replica import replica_read
+from models.generated_report import GeneratedReport
+from sqlalchemy import func
+from reports import REPORTS, SCHEDULES, latest_report
+import io
+
+reports_bp = Blueprint('reports', __name__)
+
+def find_report(report, schedule):
+    """Latest generated report, or an error response"""
+    if report not in REPORTS or schedule not in SCHEDULES:
+        return None, (jsonify({'error': f'Unknown report: {schedule} {report}'}), 404)
+    record = latest_report(report, schedule)
+    if record is None:
+        return None, (jsonify({'error': f'No {schedule} {report} report has been generated yet'}), 404)
+    return record, None
+
+@reports_bp.route('/', methods=['GET'])
+@replica_read
+@conditional_get('generated_reports')
+def get_reports():
+    """Latest generated report of every report and schedule, without charts"""
+    try:
+        latest = db.session.query(func.max(GeneratedReport.id)).group_by(
+            GeneratedReport.report, GeneratedReport.schedule
+        )
+        records = GeneratedReport.query.filter(GeneratedReport.id.in_(latest)).order_by(
+            GeneratedReport.report, GeneratedReport.schedule
+        ).all()
+        return jsonify([record.to_dict() for record in records]), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@reports_bp.route('/<report>/<schedule>', methods=['GET'])
+@replica_read
+@conditional_get('generated_reports')
+def get_report(report, schedule):
+    try:
+        record, error = find_report(report, schedule)
+        if error:
+            return error
+        return jsonify(record.to_dict(include_chart=True)), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@reports_bp.route('/<report>/<schedule>/chart.png', methods=['GET'])
+@replica_read
+@conditional_get('generated_reports')
+def get_report_chart(report, schedule):
+    try:
+        record, error = find_report(report, schedule)
+        if error:
+            return error
+        return send_file(io.BytesIO(record.chart), mimetype='image/png',
+                         download_name=f'{report}-{schedule}-{record.period_end.isoformat()}.png')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
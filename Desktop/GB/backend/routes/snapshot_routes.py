@@ -0,0 +1,40 @@
+from flask import Blueprint, jsonify, send_file
+from versioning import conditional_get
+from models.snapshot import Snapshot
+from snapshot import latest_snapshot, snapshot_path
+import os
+
+snapshots_bp = Blueprint('snapshots', __name__)
+
+@snapshots_bp.route('/latest', methods=['GET'])
+@conditional_get('snapshots')
+def get_latest_snapshot():
+    """Version, size, checksum and download URL of the newest snapshot"""
+    try:
+        record = latest_snapshot()
+        if record is None:
+            return jsonify({'error': 'No snapshot has been built yet; run snapshot.py'}), 404
+        return jsonify(record.to_dict()), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@snapshots_bp.route('/<version>.sqlite.gz', methods=['GET'])
+def download_snapshot(version):
+    """
+    The gzipped SQLite file. Supports Range and If-Range, so an interrupted
+    download resumes where it stopped; a version never changes once built.
+    """
+    try:
+        record = Snapshot.query.filter_by(version=version).first()
+        path = snapshot_path(record) if record is not None else None
+        if path is None or not os.path.exists(path):
+            # Pruned since the client read /latest: it starts over with the new one
+            return jsonify({'error': f'Snapshot {version} is no longer available'}), 404
+        response = send_file(path, mimetype='application/gzip', download_name=record.file_name,
+                             conditional=True, etag=record.sha256, max_age=365 * 24 * 3600)
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        response.headers['X-Snapshot-Event-ID'] = str(record.event_id)
+        return response
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
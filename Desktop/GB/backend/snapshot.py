@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Pre-built SQLite snapshots for first-time sync of mobile devices.
+
+Copies each farm's cattle and the last ``SNAPSHOT_DAYS`` of milk, feeding,
+expense and revenue records into a fresh SQLite file with the same tables,
+gzips it and records it in ``snapshots``. A new device downloads the latest
+snapshot with one (resumable) request from ``/api/snapshots`` and then follows
+``/api/events`` from the snapshot's ``event_id`` instead of pulling every list
+endpoint. Run it every hour or so from cron; a farm without changes since its
+latest snapshot is skipped:
+
+    python snapshot.py
+    python snapshot.py --farm north --force
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import Date, DateTime, create_engine, select
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import db
+from archive import with_archive, record_columns
+from events import latest_event_id
+from models.cattle import Cattle
+from models.expenses import Expenses
+from models.feeding import Feeding
+from models.milk_production import MilkProduction
+from models.revenue import Revenue
+from models.snapshot import Snapshot
+from tenancy import current_farm_id, farm_ids, use_farm
+
+# Cattle are copied whole, the others from the snapshot's start date
+SNAPSHOT_MODELS = [Cattle, MilkProduction, Feeding, Expenses, Revenue]
+COPY_BATCH = 5000
+GZIP_LEVEL = 6
+
+def snapshot_dir(farm_id=None):
+    return os.path.join(current_app.config['SNAPSHOT_DIR'], farm_id or current_farm_id())
+
+def snapshot_path(record, farm_id=None):
+    return os.path.join(snapshot_dir(farm_id), record.file_name)
+
+def latest_snapshot():
+    return Snapshot.query.order_by(Snapshot.created_at.desc(), Snapshot.id.desc()).first()
+
+def sqlite_text(column):
+    """Converter to the text SQLAlchemy stores a date or datetime column as on SQLite, else None"""
+    if isinstance(column.type, DateTime):
+        return lambda value: value.isoformat(' ', 'microseconds')
+    if isinstance(column.type, Date):
+        return date.isoformat
+    return None
+
+def copy_records(target, model, since, today):
+    """Copy one model's records into the snapshot database; returns the row count"""
+    table = model.__table__
+    if model is Cattle:
+        statement = select(*table.columns)
+    else:
+        records = with_archive(model, since, today)
+        statement = select(*record_columns(records, model)).where(records.date_recorded >= since)
+
+    # Plain executemany on the snapshot file; SQLAlchemy's per-row parameter processing
+    # took longer than reading the records
+    sql = f"INSERT INTO {table.name} ({', '.join(table.columns.keys())}) VALUES ({', '.join('?' * len(table.columns))})"
+    converters = [sqlite_text(column) for column in table.columns]
+    count = 0
+    result = db.session.execute(statement.execution_options(yield_per=COPY_BATCH))
+    for batch in result.partitions():
+        values = list(zip(*batch))
+        for i, convert in enumerate(converters):
+            if convert is not None:
+                values[i] = [None if value is None else convert(value) for value in values[i]]
+        target.exec_driver_sql(sql, list(zip(*values)))
+        count += len(batch)
+    return count
+
+def write_database(path, since, today, info):
+    """Build the uncompressed snapshot database at ``path``; returns {table: rows}"""
+    engine = create_engine(f'sqlite:///{path}')
+    try:
+        db.metadata.create_all(engine, tables=[model.__table__ for model in SNAPSHOT_MODELS])
+        row_counts = {}
+        with engine.begin() as target:
+            target.exec_driver_sql('PRAGMA journal_mode=OFF')
+            for model in SNAPSHOT_MODELS:
+                row_counts[model.__tablename__] = copy_records(target, model, since, today)
+            # Lets the device check what it has without asking the server
+            target.exec_driver_sql('CREATE TABLE snapshot_info (key TEXT PRIMARY KEY, value TEXT)')
+            target.exec_driver_sql(
+                'INSERT INTO snapshot_info (key, value) VALUES (?, ?)',
+                [(key, str(value)) for key, value in dict(info, row_counts=json.dumps(row_counts)).items()]
+            )
+        return row_counts
+    finally:
+        engine.dispose()
+
+def compress(source, destination):
+    """gzip ``source`` into ``destination``; returns the sha256 of the compressed bytes"""
+    with open(source, 'rb') as raw, gzip.open(destination, 'wb', compresslevel=GZIP_LEVEL) as packed:
+        shutil.copyfileobj(raw, packed, 1024 * 1024)
+    digest = hashlib.sha256()
+    with open(destination, 'rb') as packed:
+        for block in iter(lambda: packed.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def prune_snapshots(keep):
+    """Delete all but the newest ``keep`` snapshots and their files"""
+    old = Snapshot.query.order_by(Snapshot.created_at.desc(), Snapshot.id.desc()).offset(keep).all()
+    for record in old:
+        try:
+            os.remove(snapshot_path(record))
+        except FileNotFoundError:
+            pass
+        db.session.delete(record)
+    db.session.commit()
+    return len(old)
+
+def build_snapshot(days=None, force=False, today=None):
+    """Snapshot the current farm; returns the new snapshot's dict, or None when nothing changed"""
+    today = today or date.today()
+    since = today - timedelta(days=days or current_app.config['SNAPSHOT_DAYS'])
+
+    # Read before copying: a change made during the copy may be both in the file and
+    # replayed from the events after event_id, and devices apply events as upserts
+    event_id = latest_event_id(db.session.connection())
+    latest = latest_snapshot()
+    if not force and latest is not None and latest.event_id == event_id and latest.since == since:
+        return None
+
+    started = time.perf_counter()
+    created_at = datetime.utcnow()
+    version = f'{created_at:%Y%m%dT%H%M%S}-{event_id}'
+    file_name = f'snapshot-{version}.sqlite.gz'
+    directory = snapshot_dir()
+    os.makedirs(directory, exist_ok=True)
+
+    raw_path = os.path.join(directory, f'.{version}.sqlite')
+    packed_path = os.path.join(directory, f'.{file_name}')
+    try:
+        info = {'farm_id': current_farm_id(), 'version': version, 'since': since.isoformat(),
+                'event_id': event_id, 'created_at': created_at.isoformat()}
+        row_counts = write_database(raw_path, since, today, info)
+        sha256 = compress(raw_path, packed_path)
+        raw_size = os.path.getsize(raw_path)
+        # Only complete files ever carry a snapshot's name
+        os.replace(packed_path, os.path.join(directory, file_name))
+    finally:
+        for path in (raw_path, packed_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    record = Snapshot(
+        version=version,
+        file_name=file_name,
+        since=since,
+        event_id=event_id,
+        size_bytes=os.path.getsize(os.path.join(directory, file_name)),
+        raw_size_bytes=raw_size,
+        sha256=sha256,
+        row_counts=json.dumps(row_counts),
+        duration_ms=round((time.perf_counter() - started) * 1000, 1),
+        created_at=created_at
+    )
+    db.session.add(record)
+    db.session.commit()
+    prune_snapshots(current_app.config['SNAPSHOT_KEEP'])
+    return record.to_dict()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--farm', action='append', help='only these farms')
+    parser.add_argument('--days', type=int, help='days of records to include (default SNAPSHOT_DAYS)')
+    parser.add_argument('--force', action='store_true', help='build even when nothing changed')
+    args = parser.parse_args()
+
+    from app import app
+
+    with app.app_context():
+        for farm_id in args.farm or farm_ids():
+            with use_farm(farm_id):
+                try:
+                    record = build_snapshot(args.days, args.force)
+                finally:
+                    db.session.remove()
+            if record is None:
+                print(f"  - Farm {farm_id}: unchanged, skipped")
+            else:
+                print(f"✅ Farm {farm_id}: snapshot {record['version']} "
+                      f"({record['size_bytes'] / 1e6:.1f} MB, {record['raw_size_bytes'] / 1e6:.1f} MB unpacked) "
+                      f"in {record['duration_ms'] / 1000:.1f}s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+Multi-farm tenancy.
+
+Each farm of the co-op has its own database and connection pool. The default
+farm lives at ``SQLALCHEMY_DATABASE_URI``; further farms are configured with
+
+    FARM_DATABASES=north=postgresql://.../north,south=sqlite:///south.db
+
+and registered as Flask-SQLAlchemy binds. A request picks its farm with the
+``X-Farm-ID`` header (or ``?farm=``); ``db.session`` then talks to that farm's
+database only. ``fan_out`` runs a function against every farm in parallel for
+the co-op dashboard.
+"""
+
+import contextvars
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+
+from flask import g, request, jsonify, current_app
+
+from database import db, current_farm_bind
+
+FARM_HEADER = 'X-Farm-ID'
+FARM_BIND_PREFIX = 'farm:'
+
+_fan_out_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('FARM_FANOUT_THREADS', 8)), thread_name_prefix='farm-fanout'
+)
+
+def parse_farm_databases(value):
+    """Parse ``id=url,id=url`` into {farm_id: database url}"""
+    farms = {}
+    for entry in (value or '').split(','):
+        if not entry.strip():
+            continue
+        farm_id, _, url = entry.partition('=')
+        if not url:
+            raise ValueError(f'Invalid FARM_DATABASES entry: {entry}')
+        farms[farm_id.strip()] = url.strip()
+    return farms
+
+def farm_binds(farm_databases):
+    """SQLALCHEMY_BINDS entries for the configured farms"""
+    return {FARM_BIND_PREFIX + farm_id: url for farm_id, url in farm_databases.items()}
+
+def farm_ids(app=None):
+    app = app or current_app
+    return [app.config['DEFAULT_FARM_ID']] + list(app.config['FARM_DATABASES'])
+
+def farm_bind_key(farm_id, app=None):
+    app = app or current_app
+    if farm_id == app.config['DEFAULT_FARM_ID']:
+        return None
+    if farm_id not in app.config['FARM_DATABASES']:
+        raise KeyError(farm_id)
+    return FARM_BIND_PREFIX + farm_id
+
+def current_farm_id(app=None):
+    app = app or current_app
+    bind_key = current_farm_bind.get()
+    return app.config['DEFAULT_FARM_ID'] if bind_key is None else bind_key[len(FARM_BIND_PREFIX):]
+
+def farm_engine(farm_id=None):
+    """Engine of a farm (the current farm when not given); needs an app context"""
+    bind_key = current_farm_bind.get() if farm_id is None else farm_bind_key(farm_id)
+    return db.engines[bind_key]
+
+@contextmanager
+def use_farm(farm_id, app=None):
+    """Route db.session to a farm's database for the duration of the block"""
+    token = current_farm_bind.set(farm_bind_key(farm_id, app))
+    try:
+        yield
+    finally:
+        current_farm_bind.reset(token)
+
+def fan_out(fn, farms=None, timeout=None):
+    """
+    Call ``fn(farm_id)`` for every farm in parallel, each in its own app
+    context bound to that farm. Returns ({farm_id: result}, {farm_id: error}).
+    A farm that fails or is not done within ``timeout`` seconds is reported
+    in the errors and does not hold back the others.
+    """
+    app = current_app._get_current_object()
+    farms = farms or farm_ids(app)
+
+    def run(farm_id):
+        with app.app_context(), use_farm(farm_id, app):
+            return fn(farm_id)
+
+    # Each task gets a copy of the caller's context, e.g. to keep reading from replicas
+    futures = {farm_id: _fan_out_executor.submit(contextvars.copy_context().run, run, farm_id) for farm_id in farms}
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    results, errors = {}, {}
+    for farm_id, future in futures.items():
+        try:
+            remaining = max(0, deadline - time.monotonic()) if deadline is not None else None
+            results[farm_id] = future.result(timeout=remaining)
+        except FutureTimeoutError:
+            errors[farm_id] = 'Timed out'
+        except Exception as e:
+            errors[farm_id] = str(e)
+    return results, errors
+
+def init_tenancy(app):
+    """Bind each request to the farm named in its X-Farm-ID header"""
+
+    @app.before_request
+    def select_farm():
+        farm_id = request.headers.get(FARM_HEADER) or request.args.get('farm')
+        if not farm_id:
+            return None
+        try:
+            g.farm_token = current_farm_bind.set(farm_bind_key(farm_id, app))
+        except KeyError:
+            return jsonify({'error': f'Unknown farm: {farm_id}'}), 404
+
+    @app.after_request
+    def vary_on_farm(response):
+        response.vary.add(FARM_HEADER)
+        return response
+
+    @app.teardown_request
+    def release_farm(exc):
+        token = g.pop('farm_token', None)
+        if token is not None:
+            current_farm_bind.reset(token)
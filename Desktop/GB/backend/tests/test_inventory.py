@@ -0,0 +1,81 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+COUNT_DAY = '2026-10-04'
+
+@pytest.fixture(scope='module')
+def app(tmp_path_factory):
+    # Before app is imported: it creates its tables on import
+    url = f"sqlite:///{tmp_path_factory.mktemp('inventory') / 'inventory.db'}"
+    os.environ['DATABASE_URL'] = url
+    from app import app
+    assert app.config['SQLALCHEMY_DATABASE_URI'] == url
+    return app
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    response = client.post('/api/cattle/', json={
+        'tag_number': f'T-{os.urandom(4).hex()}', 'name': 'Daisy', 'breed': 'Jersey',
+        'date_of_birth': '2022-03-01', 'gender': 'Female'
+    })
+    assert response.status_code == 201
+    client.cattle_id = response.json['id']
+    return client
+
+def feed(client, feed_type, quantity_kg):
+    response = client.post('/api/feeding/', json={
+        'cattle_id': client.cattle_id, 'feed_type': feed_type, 'quantity_kg': quantity_kg, 'date_recorded': COUNT_DAY
+    })
+    assert response.status_code == 201
+    return response.json['id']
+
+def count(client, feed_type, counted_kg):
+    response = client.post('/api/inventory/counts', json={
+        'feed_type': feed_type, 'counted_kg': counted_kg, 'date_recorded': COUNT_DAY
+    })
+    assert response.status_code == 201
+
+def on_hand(app, feed_type, rebuild=False):
+    from database import db
+    from inventory import rebuild_inventory
+    from models.feed_stock import FeedStock
+
+    with app.app_context():
+        if rebuild:
+            rebuild_inventory()
+        stock = db.session.execute(db.select(FeedStock).filter_by(feed_type=feed_type)).scalar_one()
+        on_hand_kg = stock.on_hand_kg
+        db.session.remove()
+    return on_hand_kg
+
+def test_editing_feeding_posted_before_a_count_of_its_day_keeps_the_count(app, client):
+    record_id = feed(client, 'Hay A', 10)
+    count(client, 'Hay A', 700)
+    assert client.put(f'/api/feeding/{record_id}', json={'quantity_kg': 15}).status_code == 200
+    assert on_hand(app, 'Hay A') == pytest.approx(700)
+    assert on_hand(app, 'Hay A', rebuild=True) == pytest.approx(700)
+
+def test_deleting_feeding_posted_before_a_count_of_its_day_keeps_the_count(app, client):
+    record_id = feed(client, 'Hay B', 10)
+    count(client, 'Hay B', 700)
+    assert client.delete(f'/api/feeding/{record_id}').status_code == 200
+    assert on_hand(app, 'Hay B') == pytest.approx(700)
+    assert on_hand(app, 'Hay B', rebuild=True) == pytest.approx(700)
+
+def test_bulk_update_only_moves_stock_for_feeding_posted_after_the_count(app, client):
+    feed(client, 'Hay C', 10)
+    count(client, 'Hay C', 700)
+    feed(client, 'Hay C', 5)
+    assert on_hand(app, 'Hay C') == pytest.approx(695)
+
+    response = client.patch('/api/feeding/bulk', json={
+        'filter': {'feed_type': 'Hay C', 'start_date': COUNT_DAY, 'end_date': COUNT_DAY}, 'changes': {'quantity_kg': 12}
+    })
+    assert response.json == {'updated': 2}
+    assert on_hand(app, 'Hay C') == pytest.approx(688)
+    assert on_hand(app, 'Hay C', rebuild=True) == pytest.approx(688)
@@ -0,0 +1,45 @@
+import os
+import sys
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reports import period_due
+
+def nightly(schedule, first, last, skipped=()):
+    """Days a nightly run would generate the schedule, starting from a pack on ``first``"""
+    generated, period_end = [], first
+    day = first + timedelta(days=1)
+    while day <= last:
+        if day not in skipped and period_due(schedule, period_end, day):
+            generated.append(day)
+            period_end = day
+        day += timedelta(days=1)
+    return generated
+
+def test_daily_runs_every_night():
+    assert nightly('daily', date(2026, 3, 1), date(2026, 3, 4)) == [
+        date(2026, 3, 2), date(2026, 3, 3), date(2026, 3, 4)
+    ]
+
+def test_weekly_runs_on_mondays():
+    assert nightly('weekly', date(2026, 3, 2), date(2026, 3, 22)) == [date(2026, 3, 9), date(2026, 3, 16)]
+
+def test_weekly_catches_up_after_a_skipped_monday():
+    assert nightly('weekly', date(2026, 3, 2), date(2026, 3, 22), skipped={date(2026, 3, 9)}) == [
+        date(2026, 3, 10), date(2026, 3, 16)
+    ]
+
+def test_monthly_runs_on_the_first():
+    assert nightly('monthly', date(2026, 1, 1), date(2026, 3, 15)) == [date(2026, 2, 1), date(2026, 3, 1)]
+
+def test_monthly_catches_up_after_a_skipped_first():
+    skipped = {date(2026, 2, 1), date(2026, 2, 2)}
+    assert nightly('monthly', date(2026, 1, 1), date(2026, 3, 15), skipped=skipped) == [
+        date(2026, 2, 3), date(2026, 3, 1)
+    ]
+
+def test_forced_pack_mid_period_does_not_delay_the_next():
+    assert period_due('weekly', date(2026, 3, 11), date(2026, 3, 16))
+    assert not period_due('weekly', date(2026, 3, 11), date(2026, 3, 15))
+    assert period_due('monthly', date(2026, 3, 20), date(2026, 4, 1))
@@ -47,6 +47,9 @@ api.interceptors.response.use(
   }
 );
 
+// Sent on creates so a retried request never records the same thing twice
+const idempotent = (key?: string) => (key ? { headers: { 'Idempotency-Key': key } } : undefined);
+
 // Cattle API
 export const cattleAPI = {
   getAll: () => api.get<{data: Cattle[], pagination: any}>('/cattle'),
@@ -61,7 +64,8 @@ export const milkAPI = {
   getAll: (params?: { cattle_id?: string; date_from?: string; date_to?: string }) => 
     api.get<{data: MilkProduction[], pagination: any}>('/milk', { params }),
   getById: (id: string) => api.get<MilkProduction>(`/milk/${id}`),
-  create: (data: Partial<MilkProduction>) => api.post<MilkProduction>('/milk', data),
+  create: (data: Partial<MilkProduction>, idempotencyKey?: string) =>
+    api.post<MilkProduction>('/milk', data, idempotent(idempotencyKey)),
   update: (id: string, data: Partial<MilkProduction>) => api.put<MilkProduction>(`/milk/${id}`, data),
   delete: (id: string) => api.delete(`/milk/${id}`),
   getSummary: (params?: { cattle_id?: string; days?: number }) => 
@@ -72,7 +76,8 @@ export const milkAPI = {
 export const feedingAPI = {
   getAll: (params?: { cattle_id?: string; date_from?: string; date_to?: string }) => 
     api.get<{data: Feeding[], pagination: any}>('/feeding', { params }),
-  create: (data: Partial<Feeding>) => api.post<Feeding>('/feeding', data),
+  create: (data: Partial<Feeding>, idempotencyKey?: string) =>
+    api.post<Feeding>('/feeding', data, idempotent(idempotencyKey)),
   update: (id: string, data: Partial<Feeding>) => api.put<Feeding>(`/feeding/${id}`, data),
   delete: (id: string) => api.delete(`/feeding/${id}`),
   getSummary: (params?: { days?: number }) => 
@@ -85,8 +90,10 @@ export const financialAPI = {
     api.get<{data: Expense[], pagination: any}>('/financial/expenses', { params }),
   getRevenue: (params?: { date_from?: string; date_to?: string }) => 
     api.get<{data: Revenue[], pagination: any}>('/financial/revenue', { params }),
-  createExpense: (data: Partial<Expense>) => api.post<Expense>('/financial/expenses', data),
-  createRevenue: (data: Partial<Revenue>) => api.post<Revenue>('/financial/revenue', data),
+  createExpense: (data: Partial<Expense>, idempotencyKey?: string) =>
+    api.post<Expense>('/financial/expenses', data, idempotent(idempotencyKey)),
+  createRevenue: (data: Partial<Revenue>, idempotencyKey?: string) =>
+    api.post<Revenue>('/financial/revenue', data, idempotent(idempotencyKey)),
   updateExpense: (id: string, data: Partial<Expense>) => api.put<Expense>(`/financial/expenses/${id}`, data),
   updateRevenue: (id: string, data: Partial<Revenue>) => api.put<Revenue>(`/financial/revenue/${id}`, data),
   deleteExpense: (id: string) => api.delete(`/financial/expenses/${id}`),
@@ -105,6 +112,20 @@ export const analyticsAPI = {
     api.get<any>('/analytics/feeding-analysis', { params }),
 };
 
+// First-time sync: download `url` once (Range requests resume it), then follow /events from `event_id`
+export const snapshotAPI = {
+  getLatest: () => api.get<{
+    version: string;
+    since: string;
+    event_id: number;
+    size_bytes: number;
+    sha256: string;
+    row_counts: Record<string, number>;
+    url: string;
+  }>('/snapshots/latest'),
+  downloadUrl: (url: string) => `${API_BASE_URL}${url.replace(/^\/api/, '')}`,
+};
+
 // Health check
 export const healthAPI = {
   check: () => api.get('/health'),
@@ -73,7 +73,8 @@ class OfflineAPI {
     const pendingOps = await this.getFromStorage<PendingOperation>(STORAGE_KEYS.PENDING_SYNC);
     const newOp: PendingOperation = {
       ...operation,
-      id: Date.now().toString(),
+      // Also the Idempotency-Key of the synced request, so it must be unique across devices
+      id: `${Date.now()}-${Math.random().toString(36).slice(2, 10)}`,
       timestamp: Date.now(),
     };
     pendingOps.push(newOp);
@@ -389,17 +390,17 @@ class OfflineAPI {
             break;
           case 'milk':
             if (op.type === 'CREATE') {
-              await milkAPI.create(op.data);
+              await milkAPI.create(op.data, op.id);
             }
             break;
           case 'feeding':
             if (op.type === 'CREATE') {
-              await feedingAPI.create(op.data);
+              await feedingAPI.create(op.data, op.id);
             }
             break;
           case 'expense':
             if (op.type === 'CREATE') {
-              await financialAPI.createExpense(op.data);
+              await financialAPI.createExpense(op.data, op.id);
             }
             break;
         }
@@ -16,6 +16,7 @@ import {
   IconButton,
   Chip,
   CardActions,
+  Pagination,
 } from '@mui/material';
 import { Add, Edit, Delete, Visibility } from '@mui/icons-material';
 import { cattleAPI } from '../services/api';
@@ -41,6 +42,10 @@ const CattleManagement: React.FC = () => {
   const [loading, setLoading] = useState(true);
   const [dialogOpen, setDialogOpen] = useState(false);
   const [editingCattle, setEditingCattle] = useState<Cattle | null>(null);
+  const [search, setSearch] = useState('');
+  const [statusFilter, setStatusFilter] = useState('');
+  const [page, setPage] = useState(1);
+  const [total, setTotal] = useState(0);
   const [formData, setFormData] = useState<CattleFormData>({
     tag_number: '',
     name: '',
@@ -54,16 +59,26 @@ const CattleManagement: React.FC = () => {
   const breeds = ['Holstein', 'Jersey', 'Angus', 'Hereford', 'Brahman', 'Simmental', 'Charolais', 'Other'];
   const healthStatuses = ['Healthy', 'Sick', 'Injured', 'Pregnant', 'Recovering'];
   const statuses = ['Active', 'Sold', 'Deceased', 'Quarantined'];
+  const pageSize = 24;
 
   useEffect(() => {
-    fetchCattle();
-  }, []);
+    // Wait for typing to pause before searching
+    const timer = setTimeout(fetchCattle, search ? 300 : 0);
+    return () => clearTimeout(timer);
+  }, [search, statusFilter, page]);
 
   const fetchCattle = async () => {
     try {
       setLoading(true);
-      const response = await cattleAPI.getAll();
+      const response = await cattleAPI.getAll({
+        search: search.trim() || undefined,
+        current_status: statusFilter || undefined,
+        sort: 'tag_number',
+        limit: pageSize,
+        offset: (page - 1) * pageSize,
+      });
       setCattle(response.data);
+      setTotal(Number(response.headers['x-total-count'] ?? response.data.length));
     } catch (error) {
       console.error('Error fetching cattle:', error);
     } finally {
@@ -158,14 +173,6 @@ const CattleManagement: React.FC = () => {
     }
   };
 
-  if (loading) {
-    return (
-      <Box display="flex" justifyContent="center" alignItems="center" minHeight="400px">
-        <CircularProgress />
-      </Box>
-    );
-  }
-
   return (
     <Box>
       <Box display="flex" justifyContent="space-between" alignItems="center" mb={3}>
@@ -182,75 +189,115 @@ const CattleManagement: React.FC = () => {
         </Button>
       </Box>
 
-      <Grid container spacing={3}>
-        {cattle.map((cow) => (
-          <Grid item xs={12} sm={6} md={4} key={cow.id}>
-            <Card sx={{ height: '100%', display: 'flex', flexDirection: 'column' }}>
-              <CardContent sx={{ flexGrow: 1 }}>
-                <Box display="flex" justifyContent="space-between" alignItems="start" mb={2}>
-                  <Typography variant="h6" sx={{ color: '#00ED64' }}>
-                    {cow.name}
+      <Box display="flex" gap={2} mb={3}>
+        <TextField
+          label="Search tag or name"
+          value={search}
+          onChange={(e) => { setSearch(e.target.value); setPage(1); }}
+          size="small"
+        />
+        <TextField
+          select
+          label="Status"
+          value={statusFilter}
+          onChange={(e) => { setStatusFilter(e.target.value); setPage(1); }}
+          size="small"
+          sx={{ minWidth: 160 }}
+        >
+          <MenuItem value="">All</MenuItem>
+          {statuses.map((status) => (
+            <MenuItem key={status} value={status}>
+              {status}
+            </MenuItem>
+          ))}
+        </TextField>
+      </Box>
+
+      {loading ? (
+        <Box display="flex" justifyContent="center" alignItems="center" minHeight="400px">
+          <CircularProgress />
+        </Box>
+      ) : (
+        <Grid container spacing={3}>
+          {cattle.map((cow) => (
+            <Grid item xs={12} sm={6} md={4} key={cow.id}>
+              <Card sx={{ height: '100%', display: 'flex', flexDirection: 'column' }}>
+                <CardContent sx={{ flexGrow: 1 }}>
+                  <Box display="flex" justifyContent="space-between" alignItems="start" mb={2}>
+                    <Typography variant="h6" sx={{ color: '#00ED64' }}>
+                      {cow.name}
+                    </Typography>
+                    <Chip
+                      label={cow.current_status}
+                      color={getStatusColor(cow.current_status) as any}
+                      size="small"
+                    />
+                  </Box>
+                  
+                  <Typography variant="body2" color="textSecondary" gutterBottom>
+                    <strong>Tag:</strong> {cow.tag_number}
                   </Typography>
-                  <Chip
-                    label={cow.current_status}
-                    color={getStatusColor(cow.current_status) as any}
-                    size="small"
-                  />
-                </Box>
-                
-                <Typography variant="body2" color="textSecondary" gutterBottom>
-                  <strong>Tag:</strong> {cow.tag_number}
-                </Typography>
-                <Typography variant="body2" color="textSecondary" gutterBottom>
-                  <strong>Breed:</strong> {cow.breed}
-                </Typography>
-                <Typography variant="body2" color="textSecondary" gutterBottom>
-                  <strong>Gender:</strong> {cow.gender}
-                </Typography>
-                {cow.weight && (
                   <Typography variant="body2" color="textSecondary" gutterBottom>
-                    <strong>Weight:</strong> {cow.weight} kg
+                    <strong>Breed:</strong> {cow.breed}
                   </Typography>
-                )}
-                <Box mt={1}>
-                  <Chip
-                    label={cow.health_status}
-                    color={getHealthColor(cow.health_status) as any}
-                    size="small"
-                    variant="outlined"
-                  />
-                </Box>
-              </CardContent>
-              
-              <CardActions sx={{ justifyContent: 'space-between', px: 2, pb: 2 }}>
-                <Box>
-                  <IconButton
-                    size="small"
-                    onClick={() => handleOpenDialog(cow)}
-                    sx={{ color: '#00ED64' }}
-                  >
-                    <Edit fontSize="small" />
-                  </IconButton>
-                  <IconButton
+                  <Typography variant="body2" color="textSecondary" gutterBottom>
+                    <strong>Gender:</strong> {cow.gender}
+                  </Typography>
+                  {cow.weight && (
+                    <Typography variant="body2" color="textSecondary" gutterBottom>
+                      <strong>Weight:</strong> {cow.weight} kg
+                    </Typography>
+                  )}
+                  <Box mt={1}>
+                    <Chip
+                      label={cow.health_status}
+                      color={getHealthColor(cow.health_status) as any}
+                      size="small"
+                      variant="outlined"
+                    />
+                  </Box>
+                </CardContent>
+                
+                <CardActions sx={{ justifyContent: 'space-between', px: 2, pb: 2 }}>
+                  <Box>
+                    <IconButton
+                      size="small"
+                      onClick={() => handleOpenDialog(cow)}
+                      sx={{ color: '#00ED64' }}
+                    >
+                      <Edit fontSize="small" />
+                    </IconButton>
+                    <IconButton
+                      size="small"
+                      onClick={() => handleDelete(cow.id)}
+                      sx={{ color: '#FF6B6B' }}
+                    >
+                      <Delete fontSize="small" />
+                    </IconButton>
+                  </Box>
+                  <Button
                     size="small"
-                    onClick={() => handleDelete(cow.id)}
-                    sx={{ color: '#FF6B6B' }}
+                    startIcon={<Visibility />}
+                    sx={{ color: '#C1C7CD' }}
                   >
-                    <Delete fontSize="small" />
-                  </IconButton>
-                </Box>
-                <Button
-                  size="small"
-                  startIcon={<Visibility />}
-                  sx={{ color: '#C1C7CD' }}
-                >
-                  Details
-                </Button>
-              </CardActions>
-            </Card>
-          </Grid>
-        ))}
-      </Grid>
+                    Details
+                  </Button>
+                </CardActions>
+              </Card>
+            </Grid>
+          ))}
+        </Grid>
+      )}
+
+      {total > pageSize && (
+        <Box display="flex" justifyContent="center" mt={3}>
+          <Pagination
+            count={Math.ceil(total / pageSize)}
+            page={page}
+            onChange={(_, value) => setPage(value)}
+          />
+        </Box>
+      )}
 
       {/* Add/Edit Dialog */}
       <Dialog
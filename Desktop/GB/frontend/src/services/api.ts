@@ -20,8 +20,22 @@ const api = axios.create({
 });
 
 // Cattle API
+// Filtering, prefix search, sorting and paging happen on the server; with a
+// limit the total match count comes back in the X-Total-Count header
+export interface CattleQuery {
+  search?: string;
+  breed?: string;
+  gender?: string;
+  health_status?: string;
+  location?: string;
+  current_status?: string;
+  sort?: string;
+  limit?: number;
+  offset?: number;
+}
+
 export const cattleAPI = {
-  getAll: () => api.get<Cattle[]>('/cattle'),
+  getAll: (params?: CattleQuery) => api.get<Cattle[]>('/cattle', { params }),
   getById: (id: number) => api.get<Cattle>(`/cattle/${id}`),
   create: (data: Partial<Cattle>) => api.post<Cattle>('/cattle', data),
   update: (id: number, data: Partial<Cattle>) => api.put<Cattle>(`/cattle/${id}`, data),
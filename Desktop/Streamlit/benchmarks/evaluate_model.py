@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Headless speed and accuracy harness for the crop disease model.
+
+Runs the model over a labelled image directory, one sub-directory per class
+named after its label (``Tomato - Leaf Mold``; case, spaces, dashes and
+underscores are ignored, so ``tomato___leaf_mold`` matches too), for every
+combination of model variant, thread count and batch size. Each combination
+runs in its own process, so peak RSS is its own. The JSON report has
+throughput, per-image and per-batch latency percentiles, peak RSS, accuracy,
+per-class accuracy and the confusion matrix (rows are true classes).
+
+    python benchmarks/evaluate_model.py data/val --batch-sizes 1 16 --threads 1 4
+    python benchmarks/evaluate_model.py data/val --variants fp32 traced --output new.json --baseline base.json
+
+With ``--baseline`` the run is compared with an earlier report; it exits with
+status 1 when accuracy drops by more than ``--max-accuracy-drop`` or
+throughput by more than ``--max-slowdown``.
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(APP_DIR)
+
+IMAGE_EXTENSIONS = ('jpg', 'jpeg', 'png')
+VARIANTS = {
+    'fp32': 'memory-mapped float32 weights, as served by the app',
+    'channels_last': 'fp32 with NHWC memory format',
+    'traced': 'TorchScript trace, frozen and optimized for inference',
+    'int8_dynamic': 'dynamic int8 quantization of the Linear layer',
+}
+
+def normalize_label(name):
+    return re.sub(r'[^a-z0-9]+', ' ', name.lower()).strip()
+
+def find_images(directory, class_labels):
+    """[(path, class index)] of every image in a class sub-directory"""
+    classes = {normalize_label(label): index for index, label in class_labels.items()}
+    samples, unknown = [], []
+    for entry in sorted(os.listdir(directory)):
+        folder = os.path.join(directory, entry)
+        if not os.path.isdir(folder):
+            continue
+        index = classes.get(normalize_label(entry))
+        if index is None:
+            unknown.append(entry)
+            continue
+        for ext in IMAGE_EXTENSIONS:
+            samples += [(path, index) for path in sorted(glob.glob(os.path.join(folder, f'*.{ext}')))]
+    if unknown:
+        print(f"Skipping folders that match no class label: {', '.join(unknown)}", file=sys.stderr)
+    return samples
+
+def build_variant(variant, model_path, batch_size):
+    import torch
+    from inference import INPUT_SIZE, load_model
+
+    model = load_model(model_path)
+    example = torch.zeros(batch_size, 3, INPUT_SIZE, INPUT_SIZE)
+    if variant == 'channels_last':
+        model = model.to(memory_format=torch.channels_last)
+    elif variant == 'traced':
+        with torch.inference_mode():
+            model = torch.jit.optimize_for_inference(torch.jit.freeze(torch.jit.trace(model, example)))
+    elif variant == 'int8_dynamic':
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
+
+def percentiles(values):
+    values = np.asarray(values)
+    return {f'p{p}': round(float(np.percentile(values, p)), 2) for p in (50, 90, 95, 99)}
+
+def peak_rss_mb():
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)  # KB on Linux
+
+def evaluate(config, samples, model_path, warmup_batches):
+    """Runs in the child process: one variant, thread count and batch size"""
+    import torch
+    from inference import CLASS_LABELS, INPUT_SIZE, Preprocessor
+
+    torch.set_num_threads(config['threads'])
+    batch_size = config['batch_size']
+    load_started = time.perf_counter()
+    model = build_variant(config['variant'], model_path, batch_size)
+    load_seconds = time.perf_counter() - load_started
+
+    preprocess = Preprocessor()
+    batch = torch.empty(batch_size, 3, INPUT_SIZE, INPUT_SIZE)
+    if config['variant'] == 'channels_last':
+        batch = batch.contiguous(memory_format=torch.channels_last)
+
+    with torch.inference_mode():
+        for _ in range(warmup_batches):
+            model(batch)
+
+        predictions, preprocess_ms, batch_ms = [], [], []
+        started = time.perf_counter()
+        for start in range(0, len(samples), batch_size):
+            chunk = samples[start:start + batch_size]
+            step = time.perf_counter()
+            for i, (path, _) in enumerate(chunk):
+                preprocess(path, out=batch[i])
+            preprocess_ms.append((time.perf_counter() - step) * 1000 / len(chunk))
+
+            step = time.perf_counter()
+            output = model(batch[:len(chunk)])
+            batch_ms.append((time.perf_counter() - step) * 1000)
+            predictions += output.argmax(dim=1).tolist()
+        elapsed = time.perf_counter() - started
+
+    num_classes = len(CLASS_LABELS)
+    truth = np.array([index for _, index in samples])
+    predicted = np.array(predictions)
+    confusion = np.zeros((num_classes, num_classes), dtype=int)
+    np.add.at(confusion, (truth, predicted), 1)
+    support = confusion.sum(axis=1)
+
+    sizes = [len(samples[start:start + batch_size]) for start in range(0, len(samples), batch_size)]
+    return {
+        **config,
+        'images': len(samples),
+        'load_seconds': round(load_seconds, 2),
+        'throughput_images_per_s': round(len(samples) / elapsed, 2),
+        'batch_latency_ms': percentiles(batch_ms),
+        'image_latency_ms': percentiles([ms / size for ms, size in zip(batch_ms, sizes)]),
+        'preprocess_ms_per_image': percentiles(preprocess_ms),
+        'peak_rss_mb': peak_rss_mb(),
+        'accuracy': round(float((truth == predicted).mean()), 4),
+        'per_class_accuracy': {
+            CLASS_LABELS[i]: round(float(confusion[i, i] / support[i]), 4) for i in range(num_classes) if support[i]
+        },
+        'confusion_matrix': confusion.tolist(),
+    }
+
+def compare(results, baseline, max_accuracy_drop, max_slowdown):
+    """Lines describing each configuration against the baseline; (lines, regressed)"""
+    def key(result):
+        return result['variant'], result['threads'], result['batch_size']
+
+    previous = {key(result): result for result in baseline['results']}
+    lines, regressed = [], False
+    for result in results:
+        old = previous.get(key(result))
+        if old is None:
+            continue
+        speed = result['throughput_images_per_s'] / old['throughput_images_per_s'] - 1
+        accuracy = result['accuracy'] - old['accuracy']
+        bad = accuracy < -max_accuracy_drop or speed < -max_slowdown
+        regressed |= bad
+        lines.append(f"{'REGRESSION ' if bad else ''}{result['variant']} threads={result['threads']} "
+                     f"batch={result['batch_size']}: throughput {speed:+.1%}, accuracy {accuracy:+.4f}")
+    return lines, regressed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('images', help='directory with one sub-directory of images per class')
+    parser.add_argument('--model', help='checkpoint (default MODEL_PATH)')
+    parser.add_argument('--variants', nargs='+', choices=list(VARIANTS), default=['fp32'])
+    parser.add_argument('--threads', nargs='+', type=int, default=[1])
+    parser.add_argument('--batch-sizes', nargs='+', type=int, default=[1, 8])
+    parser.add_argument('--limit', type=int, help='evaluate only the first N images')
+    parser.add_argument('--warmup-batches', type=int, default=2)
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    parser.add_argument('--baseline', help='earlier JSON report to compare with')
+    parser.add_argument('--max-accuracy-drop', type=float, default=0.005)
+    parser.add_argument('--max-slowdown', type=float, default=0.10, help='fraction of baseline throughput')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # The class labels come from inference.py; it needs torch, as the model does
+    from inference import CLASS_LABELS, MODEL_PATH
+    model_path = os.path.abspath(args.model or os.path.join(APP_DIR, MODEL_PATH))
+    samples = find_images(args.images, CLASS_LABELS)[:args.limit]
+    if not samples:
+        sys.exit(f'No labelled images in {args.images}')
+
+    if args.worker:
+        print(json.dumps(evaluate(json.loads(args.worker), samples, model_path, args.warmup_batches)))
+        return
+
+    results = []
+    for variant in args.variants:
+        for threads in args.threads:
+            for batch_size in args.batch_sizes:
+                config = {'variant': variant, 'threads': threads, 'batch_size': batch_size}
+                command = [sys.executable, os.path.abspath(__file__), args.images, '--model', model_path,
+                           '--warmup-batches', str(args.warmup_batches), '--worker', json.dumps(config)]
+                if args.limit:
+                    command += ['--limit', str(args.limit)]
+                output = subprocess.run(command, cwd=APP_DIR, check=True, capture_output=True, text=True).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                results.append(result)
+                print(f"{variant:<14} threads={threads:<3} batch={batch_size:<4} "
+                      f"{result['throughput_images_per_s']:>8} img/s  p95 {result['image_latency_ms']['p95']:>7} ms/img  "
+                      f"RSS {result['peak_rss_mb']:>7} MB  accuracy {result['accuracy']:.4f}", file=sys.stderr)
+
+    report = {
+        'model': model_path,
+        'images': len(samples),
+        'class_labels': [CLASS_LABELS[i] for i in sorted(CLASS_LABELS)],
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            lines, regressed = compare(results, json.load(f), args.max_accuracy_drop, args.max_slowdown)
+        for line in lines:
+            print(line, file=sys.stderr)
+        if regressed:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Per-image preprocessing time and peak memory: the original full-decode
+``preprocess_image`` versus ``inference.Preprocessor``.
+
+Each pipeline runs in its own process so its peak RSS is not inflated by the
+other. Without ``--images`` the script writes synthetic 12 MP and 48 MP phone
+photos to a temporary directory.
+
+    python benchmarks/preprocess_benchmark.py
+    python benchmarks/preprocess_benchmark.py --images ~/leaf_photos --repeat 3
+"""
+
+import argparse
+import glob
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(APP_DIR)
+
+PIPELINES = ['baseline', 'draft']
+SYNTHETIC_SIZES = {'12mp': (4032, 3024), '48mp': (8064, 6048)}
+
+def baseline_preprocess(path):
+    """streamlit_app.preprocess_image before the reduced-scale decode"""
+    from torchvision import transforms
+    transform = transforms.Compose([
+        transforms.Resize((224, 224)),
+        transforms.ToTensor(),
+        transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
+    ])
+    img = Image.open(path).convert('RGB')
+    return transform(img).unsqueeze(0)
+
+def write_synthetic_photos(directory):
+    rng = np.random.default_rng(7)
+    paths = []
+    for name, (width, height) in SYNTHETIC_SIZES.items():
+        # Smooth gradient plus noise compresses like a photo, not like a flat colour
+        gradient = np.linspace(40, 200, width, dtype=np.float32)[None, :, None] * np.ones((height, 1, 3), np.float32)
+        pixels = (gradient + rng.integers(0, 50, (height, width, 3))).clip(0, 255).astype(np.uint8)
+        path = os.path.join(directory, f'synthetic_{name}.jpg')
+        Image.fromarray(pixels).save(path, quality=90)
+        paths.append(path)
+    return paths
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB on Linux
+
+def run_pipeline(pipeline, paths, repeat):
+    """Runs in the child process; returns the measurements"""
+    import torch
+    from inference import Preprocessor
+
+    preprocess = baseline_preprocess if pipeline == 'baseline' else Preprocessor()
+    torch.set_num_threads(1)
+    preprocess(paths[0])  # imports and first-call setup are not per-image costs
+    rss_before = peak_rss_mb()
+
+    timings = {}
+    for path in paths:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            preprocess(path)
+            timings.setdefault(os.path.basename(path), []).append((time.perf_counter() - started) * 1000)
+    return {
+        'pipeline': pipeline,
+        'per_image_ms': {name: round(float(np.median(values)), 1) for name, values in timings.items()},
+        'median_ms': round(float(np.median([v for values in timings.values() for v in values])), 1),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'peak_rss_growth_mb': round(peak_rss_mb() - rss_before, 1),
+    }
+
+def compare_outputs(paths):
+    """Largest difference between the two pipelines' inputs, in normalized units"""
+    from inference import Preprocessor
+    preprocess = Preprocessor()
+    return round(max(float((baseline_preprocess(p) - preprocess(p)).abs().max()) for p in paths), 4)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--images', help='directory of .jpg/.jpeg/.png photos')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per image')
+    parser.add_argument('--pipelines', nargs='+', choices=PIPELINES, default=PIPELINES)
+    parser.add_argument('--worker', choices=PIPELINES, help=argparse.SUPPRESS)
+    parser.add_argument('--paths', nargs='*', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_pipeline(args.worker, args.paths, args.repeat)))
+        return
+
+    if args.images:
+        paths = sorted(p for ext in ('jpg', 'jpeg', 'png') for p in glob.glob(os.path.join(args.images, f'*.{ext}')))
+        if not paths:
+            sys.exit(f'No images in {args.images}')
+    else:
+        paths = write_synthetic_photos(tempfile.mkdtemp())
+
+    results = []
+    for pipeline in args.pipelines:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--worker', pipeline, '--repeat', str(args.repeat), '--paths', *paths],
+            cwd=APP_DIR, check=True, capture_output=True, text=True
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(f"{'pipeline':<10}{'median ms':>11}{'peak RSS MB':>13}{'RSS growth MB':>15}   per image ms")
+    for r in results:
+        print(f"{r['pipeline']:<10}{r['median_ms']:>11}{r['peak_rss_mb']:>13}{r['peak_rss_growth_mb']:>15}   {r['per_image_ms']}")
+    if set(args.pipelines) == set(PIPELINES):
+        print(f"Max input difference: {compare_outputs(paths[:3])}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,234 @@
+"""
+Crop disease model loading and image preprocessing for the Streamlit app.
+
+The ``.pth`` checkpoint is converted once into a flat weights file next to it
+(``<model>.weights`` plus a ``.json`` index). Every process maps that file
+copy-on-write and builds the model's parameters as views into the mapping, so
+several app processes on one machine share a single copy of the weights in the
+page cache instead of each holding its own. ``ModelWarmer`` loads the model
+in a background thread and runs a dummy forward pass, so the first upload does
+not wait for it. ``Preprocessor`` turns phone photos into model input without
+decoding them at full resolution.
+
+    python inference.py    # convert the checkpoint before starting the app processes
+"""
+
+import json
+import mmap
+import os
+import threading
+import time
+
+import numpy as np
+import torch
+from PIL import Image
+from torchvision import models
+
+MODEL_PATH = os.environ.get('MODEL_PATH', 'Model/crop_disease_model.pth')
+NUM_CLASSES = 15
+INPUT_SIZE = 224
+WEIGHTS_ALIGNMENT = 64  # bytes; keeps every tensor's offset valid for any dtype
+PREVIEW_SIZE = 1024
+MEAN = (0.485, 0.456, 0.406)
+STD = (0.229, 0.224, 0.225)
+
+# Class labels
+CLASS_LABELS = {
+    0: 'Tomato - Healthy',
+    1: 'Tomato - Leaf Mold',
+    2: 'Tomato - Yellow Leaf Curl Virus',
+    3: 'Tomato - Septoria Leaf Spot',
+    4: 'Potato - Healthy',
+    5: 'Potato - Late Blight',
+    6: 'Potato - Early Blight',
+    7: 'Corn - Healthy',
+    8: 'Corn - Northern Leaf Blight',
+    9: 'Corn - Common Rust',
+    10: 'Corn - Gray Leaf Spot',
+    11: 'Rice - Healthy',
+    12: 'Rice - Blast',
+    13: 'Rice - Bacterial Leaf Blight',
+    14: 'Rice - Brown Spot'
+}
+
+def build_model():
+    model = models.resnet50(weights=None)
+    model.fc = torch.nn.Linear(model.fc.in_features, NUM_CLASSES)
+    return model
+
+def weights_paths(model_path):
+    return model_path + '.weights', model_path + '.weights.json'
+
+def export_weights(model_path):
+    """Write the checkpoint's tensors into one flat file plus an index of offsets"""
+    data_path, index_path = weights_paths(model_path)
+    state_dict = torch.load(model_path, map_location=torch.device('cpu'))
+    index = {}
+    offset = 0
+    # Written under temporary names, so another process never maps a half-written file
+    suffix = f'.{os.getpid()}.tmp'
+    with open(data_path + suffix, 'wb') as out:
+        for name, tensor in state_dict.items():
+            data = tensor.detach().contiguous().numpy().tobytes()
+            padding = -offset % WEIGHTS_ALIGNMENT
+            out.write(b'\0' * padding)
+            offset += padding
+            index[name] = {'offset': offset, 'nbytes': len(data), 'dtype': str(tensor.dtype).replace('torch.', ''),
+                           'shape': list(tensor.shape)}
+            out.write(data)
+            offset += len(data)
+    with open(index_path + suffix, 'w') as out:
+        json.dump(index, out)
+    os.replace(data_path + suffix, data_path)
+    os.replace(index_path + suffix, index_path)
+
+def map_weights(model_path):
+    """{name: tensor} viewing a read-only mapping of the flat weights file"""
+    data_path, index_path = weights_paths(model_path)
+    if not os.path.exists(index_path) or os.path.getmtime(index_path) < os.path.getmtime(model_path):
+        export_weights(model_path)
+    with open(index_path) as f:
+        index = json.load(f)
+
+    # Copy-on-write mapping: the pages stay shared with other processes as long as nobody writes;
+    # the tensor keeps the mapping alive
+    with open(data_path, 'rb') as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    flat = torch.frombuffer(mapping, dtype=torch.uint8)
+    tensors = {}
+    for name, entry in index.items():
+        raw = flat[entry['offset']:entry['offset'] + entry['nbytes']]
+        tensors[name] = raw.view(getattr(torch, entry['dtype'])).reshape(entry['shape'])
+    return tensors
+
+def assign_weights(model, tensors):
+    """Point the model's parameters and buffers at the given tensors without copying"""
+    expected = set(model.state_dict())
+    missing = expected - set(tensors)
+    if missing:
+        raise ValueError(f"Weights file lacks {len(missing)} tensors, e.g. {sorted(missing)[0]}")
+    for name, tensor in tensors.items():
+        module_name, _, attribute = name.rpartition('.')
+        module = model.get_submodule(module_name)
+        if attribute in module._parameters:
+            module._parameters[attribute] = torch.nn.Parameter(tensor, requires_grad=False)
+        else:
+            module._buffers[attribute] = tensor
+
+def load_model(model_path=MODEL_PATH):
+    # Built on the meta device: no memory or random init for weights that are replaced anyway
+    with torch.device('meta'):
+        model = build_model()
+    assign_weights(model, map_weights(model_path))
+    model.eval()
+    return model
+
+def warm_up(model):
+    """One forward pass, so kernels are chosen and buffers allocated before the first upload"""
+    with torch.inference_mode():
+        model(torch.zeros(1, 3, INPUT_SIZE, INPUT_SIZE))
+
+def open_image(source, size):
+    """
+    Open an image at roughly ``size`` (w, h) or larger. JPEGs are decoded at
+    1/2, 1/4 or 1/8 scale directly from the DCT coefficients, so a 50 MP phone
+    photo is never decoded at full resolution.
+    """
+    image = Image.open(source)
+    image.draft('RGB', size)  # no-op for formats other than JPEG
+    return image.convert('RGB')
+
+def load_preview(source, max_size=PREVIEW_SIZE):
+    """Image small enough to display"""
+    image = open_image(source, (max_size, max_size))
+    image.thumbnail((max_size, max_size), Image.BILINEAR)
+    return image
+
+class Preprocessor:
+    """Image file -> normalized model input, written into a reused per-thread tensor"""
+
+    def __init__(self, size=INPUT_SIZE):
+        self.size = size
+        std = torch.tensor(STD).view(3, 1, 1)
+        # (x / 255 - mean) / std as one multiply-add
+        self.scale = 1 / (255 * std)
+        self.offset = -torch.tensor(MEAN).view(3, 1, 1) / std
+        self._local = threading.local()
+
+    def decode(self, source):
+        image = open_image(source, (self.size, self.size))
+        # Same squashing resize as transforms.Resize((224, 224)); reducing_gap first shrinks
+        # large non-JPEG images by an integer factor, which is much cheaper than a full filter pass
+        return image.resize((self.size, self.size), Image.BILINEAR, reducing_gap=3.0)
+
+    def _buffer(self):
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None:
+            buffer = self._local.buffer = torch.empty(1, 3, self.size, self.size)
+        return buffer
+
+    def __call__(self, source, out=None):
+        """
+        (1, 3, size, size) input for one image. Without ``out`` it is this
+        thread's buffer, overwritten by the next call; with ``out`` (a
+        (3, size, size) slice of a batch) the image is written there.
+        """
+        pixels = torch.from_numpy(np.array(self.decode(source))).permute(2, 0, 1)
+        target = out if out is not None else self._buffer()[0]
+        target.copy_(pixels)  # uint8 -> float32 in place
+        torch.addcmul(self.offset, target, self.scale, out=target)
+        return target if out is not None else target.unsqueeze(0)
+
+class ModelWarmer:
+    """Loads and warms the model in a background thread"""
+
+    def __init__(self, model_path=MODEL_PATH):
+        self.model_path = model_path
+        self.model = None
+        self.error = None
+        self.load_seconds = None
+        self._ready = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._run, name='model-warmup', daemon=True).start()
+        return self
+
+    def _run(self):
+        started = time.perf_counter()
+        try:
+            model = load_model(self.model_path)
+            warm_up(model)
+            self.model = model
+        except Exception as e:
+            self.error = e
+        finally:
+            self.load_seconds = time.perf_counter() - started
+            self._ready.set()
+
+    @property
+    def status(self):
+        if not self._ready.is_set():
+            return 'loading'
+        return 'failed' if self.error is not None else 'ready'
+
+    def join(self, timeout=None):
+        """Wait until loading has finished or failed; True when it has"""
+        return self._ready.wait(timeout)
+
+    def wait(self, timeout=None):
+        """The warmed model; raises the load error, or TimeoutError"""
+        if not self.join(timeout):
+            raise TimeoutError('Model is still loading')
+        if self.error is not None:
+            raise self.error
+        return self.model
+
+if __name__ == '__main__':
+    # Convert the checkpoint ahead of starting several app processes, and time a cold load
+    started = time.perf_counter()
+    export_weights(MODEL_PATH)
+    exported = time.perf_counter()
+    model = load_model(MODEL_PATH)
+    warm_up(model)
+    print(f"✅ Weights written to {weights_paths(MODEL_PATH)[0]} in {exported - started:.1f}s, "
+          f"model loaded and warmed in {time.perf_counter() - exported:.1f}s")
@@ -1,9 +1,8 @@
 import streamlit as st
 import torch
-from torchvision import models, transforms
-from PIL import Image
 import json
 import os
+from inference import CLASS_LABELS, MODEL_PATH, ModelWarmer, Preprocessor, load_preview
 
 # Set page config
 st.set_page_config(
@@ -13,55 +12,27 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Load the pre-trained model
+# Load the pre-trained model in the background, once per server process
 @st.cache_resource
-def load_model():
-    model = models.resnet50(pretrained=False)
-    num_classes = 15
-    model.fc = torch.nn.Linear(model.fc.in_features, num_classes)
-    model.load_state_dict(torch.load('Model/crop_disease_model.pth', map_location=torch.device('cpu')))
-    model.eval()
-    return model
+def get_model_warmer():
+    return ModelWarmer(MODEL_PATH).start()
 
-model = load_model()
-
-# Class labels
-CLASS_LABELS = {
-    0: 'Tomato - Healthy',
-    1: 'Tomato - Leaf Mold',
-    2: 'Tomato - Yellow Leaf Curl Virus',
-    3: 'Tomato - Septoria Leaf Spot',
-    4: 'Potato - Healthy',
-    5: 'Potato - Late Blight',
-    6: 'Potato - Early Blight',
-    7: 'Corn - Healthy',
-    8: 'Corn - Northern Leaf Blight',
-    9: 'Corn - Common Rust',
-    10: 'Corn - Gray Leaf Spot',
-    11: 'Rice - Healthy',
-    12: 'Rice - Blast',
-    13: 'Rice - Bacterial Leaf Blight',
-    14: 'Rice - Brown Spot'
-}
+warmer = get_model_warmer()
 
 # Load disease info
 with open('disease_info.json', 'r') as f:
     DISEASE_INFO = json.load(f)
 
-# Image preprocessing
-def preprocess_image(image):
-    transform = transforms.Compose([
-        transforms.Resize((224, 224)),
-        transforms.ToTensor(),
-        transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
-    ])
-    img = image.convert('RGB')
-    img = transform(img).unsqueeze(0)
-    return img
+# Image preprocessing, with buffers reused across reruns
+@st.cache_resource
+def get_preprocessor():
+    return Preprocessor()
 
 # Prediction function
-def predict_disease(image):
-    img = preprocess_image(image)
+def predict_disease(image_file):
+    model = warmer.wait()
+    image_file.seek(0)
+    img = get_preprocessor()(image_file)
     with torch.no_grad():
         output = model(img)
         _, predicted = torch.max(output, 1)
@@ -70,18 +41,32 @@ def predict_disease(image):
 
 # Main app
 def main():
+    with st.sidebar:
+        if warmer.status == 'ready':
+            st.success(f"Model ready (loaded in {warmer.load_seconds:.1f}s)")
+        elif warmer.status == 'failed':
+            st.error(f"Model failed to load: {warmer.error}")
+        else:
+            st.info("Model is loading in the background...")
+
     st.title("🌱 Crop Disease Detection")
     st.markdown("Upload an image of a plant leaf to detect potential diseases and get treatment recommendations.")
 
     uploaded_file = st.file_uploader("Choose an image...", type=["jpg", "jpeg", "png"])
     
     if uploaded_file is not None:
-        image = Image.open(uploaded_file)
+        image = load_preview(uploaded_file)
         st.image(image, caption='Uploaded Image', use_column_width=True)
         
         if st.button('Analyze'):
+            if warmer.status == 'loading':
+                with st.spinner('Waiting for the model to finish loading...'):
+                    warmer.join()
+            if warmer.status == 'failed':
+                st.error(f"Model failed to load: {warmer.error}")
+                return
             with st.spinner('Analyzing the image...'):
-                prediction, disease_info = predict_disease(image)
+                prediction, disease_info = predict_disease(uploaded_file)
                 
                 st.success("Analysis Complete!")
                 